@@ -0,0 +1,145 @@
+"""
+PERSISTENCE FORMAT BENCHMARK
+============================
+Generates a dataset per scale (see generate_dataset.py), then writes and
+reads back every file save_all_data() produces in every available format
+(pickle protocols, marshal, msgpack if installed, each optionally with
+zlib/bz2/lzma). Reports save time, load time and size on disk.
+
+Usage:
+    python bench_persistence.py [--scales 0.5,1,5] [--formats pickle,marshal+zlib] [--repeat 3]
+                                [--detail] [--output persistence.json]
+
+Pick the winner with TEM_DATA_FORMAT=<format> when starting the server.
+Runs against temporary data directories, so saved data is never touched.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+import generate_dataset
+import technical_event_management as tem
+
+
+def normalize(value):
+    """Compare formats that hand tuples back as lists (msgpack) by value"""
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    return value
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def wait_for_background_save():
+    # Loading can schedule a save (e.g. for memberships that just expired); let it finish first
+    while tem._save_requested.is_set():
+        time.sleep(0.05)
+    with tem.data_lock:
+        pass
+
+
+def bench_scale(scale, formats, repeat, seed):
+    counts = {name: max(1, int(base * scale)) for name, base in generate_dataset.BASE_COUNTS.items()}
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as bench_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_dataset.DatasetGenerator(data_dir, counts, seed, date.today(), 365).run()
+            tem.DATA_DIR = data_dir
+            tem.load_all_data()
+            wait_for_background_save()
+        payloads = tem.data_file_payloads()
+
+        results = {}
+        for fmt in formats:
+            for filename, payload in payloads.items():
+                path = f'{bench_dir}/{filename}'
+
+                def save():
+                    with open(path, 'wb') as f:
+                        f.write(tem.encode_data(payload, fmt))
+
+                def load():
+                    with open(path, 'rb') as f:
+                        return tem.decode_data(f.read())
+
+                save_seconds = best_of(repeat, save)
+                load_seconds = best_of(repeat, load)
+                if normalize(load()) != normalize(payload):
+                    raise SystemExit(f"{fmt} did not round-trip {filename}")
+                results.setdefault(fmt, {})[filename] = {
+                    'save_ms': save_seconds * 1000, 'load_ms': load_seconds * 1000,
+                    'bytes': os.path.getsize(path),
+                }
+    return {'counts': counts, 'formats': results}
+
+
+def print_scale(scale, result, detail):
+    formats = result['formats']
+    totals = {fmt: {key: sum(stats[key] for stats in files.values()) for key in ('save_ms', 'load_ms', 'bytes')}
+              for fmt, files in formats.items()}
+    print(f"\nScale {scale}: {result['counts']['orders']:,} orders, {result['counts']['guests']:,} guests, "
+          f"{result['counts']['users']:,} users")
+    print(f"  {'format':16s} {'save ms':>10s} {'load ms':>10s} {'size':>12s}")
+    for fmt in sorted(totals, key=lambda fmt: totals[fmt]['load_ms']):
+        total = totals[fmt]
+        print(f"  {fmt:16s} {total['save_ms']:10.1f} {total['load_ms']:10.1f} {total['bytes']:>12,}")
+
+    print("  Per file (fastest load / fastest save / smallest):")
+    for filename in next(iter(formats.values())):
+        by_file = {fmt: files[filename] for fmt, files in formats.items()}
+        fastest_load = min(by_file, key=lambda fmt: by_file[fmt]['load_ms'])
+        fastest_save = min(by_file, key=lambda fmt: by_file[fmt]['save_ms'])
+        smallest = min(by_file, key=lambda fmt: by_file[fmt]['bytes'])
+        print(f"    {filename:26s} {fastest_load} {by_file[fastest_load]['load_ms']:.2f} ms / "
+              f"{fastest_save} {by_file[fastest_save]['save_ms']:.2f} ms / "
+              f"{smallest} {by_file[smallest]['bytes']:,} B")
+        if detail:
+            for fmt, stats in by_file.items():
+                print(f"      {fmt:16s} save {stats['save_ms']:9.2f} ms  load {stats['load_ms']:9.2f} ms  "
+                      f"{stats['bytes']:>12,} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', default='0.5,1,5', help='comma-separated generate_dataset.py scale factors')
+    parser.add_argument('--formats', help=f"comma-separated subset of: {', '.join(tem.data_formats())}")
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs per measurement')
+    parser.add_argument('--seed', type=int, default=2026)
+    parser.add_argument('--detail', action='store_true', help='print every format for every file')
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    formats = args.formats.split(',') if args.formats else tem.data_formats()
+    unknown = [fmt for fmt in formats if fmt not in tem.data_formats()]
+    if unknown:
+        parser.error(f"unknown or unavailable format(s): {', '.join(unknown)}")
+    if tem.msgpack is None and not args.formats:
+        print("(msgpack is not installed; skipping the msgpack formats)")
+
+    results = {}
+    for scale in args.scales.split(','):
+        results[scale] = bench_scale(float(scale), formats, args.repeat, args.seed)
+        print_scale(scale, results[scale], args.detail)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+PRICING ENGINE MICROBENCHMARK
+=============================
+Measures price_cart() throughput for 50-line carts against a large rule set,
+next to a naive pricer that evaluates every rule for every line.
+
+Usage:
+    python bench_pricing.py [--rules 2000] [--products 10000] [--lines 50] [--carts 2000]
+"""
+
+import argparse
+import random
+import time
+
+import technical_event_management as tem
+
+
+def setup(rules, products, seed=7):
+    rng = random.Random(seed)
+    vendors = [f'vendor{i}' for i in range(1, 51)]
+
+    tem.products_db[:] = [{
+        'id': i,
+        'name': f'Item {i}',
+        'description': '',
+        'price': round(rng.uniform(10, 5000), 2),
+        'stock': 1000,
+        'category': rng.choice(tem.PRODUCT_CATEGORIES),
+        'added_by': rng.choice(vendors),
+        'date_added': ''
+    } for i in range(1, products + 1)]
+
+    tem.price_rules_db[:] = []
+    for i in range(1, rules + 1):
+        kind = rng.choice(list(tem.PRICE_RULE_KINDS))
+        rule = {'id': i, 'kind': kind, 'percent': rng.choice([5, 10, 15, 20]),
+                'tier': None, 'vendor': None, 'category': None, 'product_id': None, 'min_qty': 1}
+        if kind == 'tier':
+            rule['tier'] = rng.choice(tem.MEMBERSHIP_TIERS)
+            rule['category'] = rng.choice([None] + tem.PRODUCT_CATEGORIES)
+        elif kind == 'vendor':
+            rule['vendor'] = rng.choice(vendors)
+            rule['category'] = rng.choice([None] + tem.PRODUCT_CATEGORIES)
+        else:
+            rule['product_id'] = rng.randint(1, products)
+            rule['min_qty'] = rng.choice([2, 5, 10])
+        tem.price_rules_db.append(rule)
+
+    tem.memberships_db[:] = [{'id': 1, 'username': 'member', 'type': 'Premium', 'duration': '1 Year',
+                              'start_date': time.strftime('%Y-%m-%d'), 'status': 'Active'}]
+    tem.rebuild_indexes()
+
+
+def naive_price_cart(username, cart):
+    """Reference pricer: checks every rule against every line"""
+    tier = tem.membership_tier(username)
+    total = 0
+    for product_id, qty in cart.items():
+        product = tem.product_index[product_id]
+        best = 0
+        for rule in tem.price_rules_db:
+            if rule['tier'] and rule['tier'] != tier:
+                continue
+            if rule['product_id'] and rule['product_id'] != product_id:
+                continue
+            if rule['vendor'] and rule['vendor'] != product['added_by']:
+                continue
+            if rule['category'] and rule['category'] != product['category']:
+                continue
+            if rule['min_qty'] <= qty and rule['percent'] > best:
+                best = rule['percent']
+        total += round(product['price'] * (100 - best) / 100, 2) * qty
+    return round(total, 2)
+
+
+def timed(label, func, carts):
+    start = time.perf_counter()
+    for cart in carts:
+        func('member', cart)
+    elapsed = time.perf_counter() - start
+    lines = sum(len(cart) for cart in carts)
+    print(f"{label:10s} {len(carts) / elapsed:>10,.0f} carts/s  {lines / elapsed:>12,.0f} lines/s  "
+          f"{elapsed / len(carts) * 1e6:>8,.1f} µs/cart")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rules', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--lines', type=int, default=50)
+    parser.add_argument('--carts', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup(args.rules, args.products)
+    rng = random.Random(11)
+    carts = [{pid: rng.randint(1, 12) for pid in rng.sample(range(1, args.products + 1), args.lines)}
+             for _ in range(args.carts)]
+
+    # Both pricers must agree before their speed is compared
+    for cart in carts[:50]:
+        assert tem.price_cart('member', cart)[2] == naive_price_cart('member', cart)
+
+    print(f"{args.rules} rules, {args.products} products, {args.lines}-line carts")
+    timed('compiled', tem.price_cart, carts)
+    timed('naive', naive_price_cart, carts[:max(1, args.carts // 20)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+BULK PRODUCT IMPORT BENCHMARK
+=============================
+Times import_products() on a generated vendor catalog (100k rows by default),
+covering streamed parsing, validation, batch insert and persistence.
+
+Usage:
+    python bench_product_import.py [--rows 100000] [--format csv|jsonl] [--batch-size N]
+
+Runs against a temporary data directory, so saved data is never touched.
+"""
+
+import argparse
+import io
+import json
+import random
+import tempfile
+import time
+
+import technical_event_management as tem
+
+
+def build_upload(rows, fmt, seed=42):
+    """Build an in-memory upload with ~1% deliberately invalid rows"""
+    rng = random.Random(seed)
+    out = io.StringIO()
+    if fmt == 'csv':
+        out.write('name,description,price,stock,category\n')
+    for i in range(rows):
+        record = {
+            'name': f'Item {i}',
+            'description': f'Bulk imported item number {i}',
+            'price': round(rng.uniform(10, 5000), 2),
+            'stock': rng.randint(0, 500),
+            'category': rng.choice(tem.PRODUCT_CATEGORIES),
+        }
+        if rng.random() < 0.01:
+            record['price'] = 'n/a'
+        if fmt == 'csv':
+            out.write(f"{record['name']},{record['description']},{record['price']},"
+                      f"{record['stock']},{record['category']}\n")
+        else:
+            out.write(json.dumps(record) + '\n')
+    return out.getvalue().encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--batch-size', type=int, default=tem.BULK_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    payload = build_upload(args.rows, args.format)
+    print(f"Upload: {args.rows} rows, {len(payload) / 1e6:.1f} MB ({args.format})")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        tem.DATA_DIR = data_dir
+        start = time.perf_counter()
+        report = tem.import_products(io.BytesIO(payload), args.format, 'vendor1',
+                                     batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+    print(f"Imported: {report['imported']}  Rejected: {report['failed']}")
+    print(f"Elapsed:  {elapsed:.2f}s  ({report['rows'] / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
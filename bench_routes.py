@@ -0,0 +1,196 @@
+"""
+END-TO-END ROUTE BENCHMARK
+==========================
+Generates a dataset per scale (see generate_dataset.py), loads it, logs in as
+admin, the busiest vendor and the busiest user, and drives the main routes
+through app.test_client(). Reports throughput and p50/p95/p99 latency per
+route and writes the numbers as JSON so runs can be compared.
+
+Usage:
+    python bench_routes.py --scales 0.5,1,5 --requests 50 --output before.json
+    python bench_routes.py --scales 0.5,1,5 --output after.json --compare before.json
+
+Each scale runs in a fresh interpreter on a temporary data directory, so one
+scale's data never leaks into the next and saved data is never touched.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+# (name, role, method, path); checkout refills the cart before every timed request
+ROUTES = [
+    ('user_dashboard', 'user', 'GET', '/user/dashboard'),
+    ('browse_products', 'user', 'GET', '/user/browse-products'),
+    ('add_to_cart', 'user', 'POST', '/user/add-to-cart'),
+    ('view_cart', 'user', 'GET', '/user/cart'),
+    ('checkout', 'user', 'POST', '/user/cart'),
+    ('user_orders', 'user', 'GET', '/user/orders'),
+    ('guest_list', 'user', 'GET', '/user/guest-list'),
+    ('user_events', 'user', 'GET', '/user/events'),
+    ('vendors_free_on_date', 'user', 'GET', '/user/vendors?date={today}&category=Catering'),
+    ('vendor_dashboard', 'vendor', 'GET', '/vendor/dashboard'),
+    ('vendor_products', 'vendor', 'GET', '/vendor/products'),
+    ('vendor_transactions', 'vendor', 'GET', '/vendor/transactions'),
+    ('vendor_notifications', 'vendor', 'GET', '/vendor/notifications'),
+    ('admin_dashboard', 'admin', 'GET', '/admin/dashboard'),
+    ('admin_all_data', 'admin', 'GET', '/admin/all-data'),
+    ('admin_memberships', 'admin', 'GET', '/admin/memberships'),
+    ('admin_notifications', 'admin', 'GET', '/admin/notifications'),
+    ('admin_maintenance', 'admin', 'GET', '/admin/maintenance'),
+]
+
+WARMUP_REQUESTS = 3
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+def run_scale(scale, requests_per_route, seed, result_path):
+    """Worker: benchmark one scale in this process and write its JSON"""
+    import generate_dataset
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        counts = {name: max(1, int(base * scale)) for name, base in generate_dataset.BASE_COUNTS.items()}
+        generate_dataset.DatasetGenerator(data_dir, counts, seed, date.today(), 365).run()
+
+        os.environ['TEM_DATA_DIR'] = data_dir
+        import technical_event_management as tem
+        tem.DATA_DIR = data_dir
+        started = time.perf_counter()
+        tem.load_all_data()
+        load_seconds = time.perf_counter() - started
+
+        # Benchmark the heaviest accounts rather than the near-empty demo ones
+        order_counts = {}
+        for order in tem.orders_db:
+            order_counts[order['username']] = order_counts.get(order['username'], 0) + 1
+        user = max(order_counts, key=order_counts.get)
+        vendor = max(tem.vendor_order_ids, key=lambda name: len(tem.vendor_order_ids[name]))
+        hot_product = tem.products_db[0]
+
+        clients = {}
+        for role, username, password, login_path in (('admin', 'admin', 'admin123', '/admin/login'),
+                                                    ('vendor', vendor, 'vendor123', '/vendor/login'),
+                                                    ('user', user, 'user123', '/user/login')):
+            clients[role] = tem.app.test_client()
+            clients[role].post(login_path, data={'username': username, 'password': password})
+
+        cart_form = {'product_id': hot_product['id'], 'quantity': 1}
+        results = {}
+        for name, role, method, path in ROUTES:
+            client = clients[role]
+            path = path.format(today=date.today().isoformat())
+            data = cart_form if name == 'add_to_cart' else {'action': 'checkout'} if name == 'checkout' else None
+            latencies, statuses = [], []
+            for i in range(WARMUP_REQUESTS + requests_per_route):
+                if name == 'checkout':
+                    hot_product['stock'] = 10 ** 6
+                    client.post('/user/add-to-cart', data=cart_form)
+                request_started = time.perf_counter()
+                response = client.open(path, method=method, data=data)
+                request_elapsed = time.perf_counter() - request_started
+                if i >= WARMUP_REQUESTS:
+                    latencies.append(request_elapsed)
+                    statuses.append(response.status_code)
+            results[name] = summarize(latencies, statuses, sum(latencies))
+            print(f"  scale {scale:<6g} {name:24s} {results[name]['throughput']:9.1f} req/s  "
+                  f"p50 {results[name]['p50_ms']:8.2f}  p95 {results[name]['p95_ms']:8.2f}  "
+                  f"p99 {results[name]['p99_ms']:8.2f} ms", file=sys.stderr)
+
+        result = {'scale': scale, 'counts': counts, 'load_seconds': load_seconds,
+                  'accounts': {'user': user, 'vendor': vendor}, 'routes': results}
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_comparison(current, baseline):
+    print(f"\nComparison with {baseline['meta'].get('revision') or 'baseline'} "
+          f"(p50 / p95, negative is faster):")
+    for scale, scale_result in current['scales'].items():
+        before = baseline['scales'].get(scale)
+        if before is None:
+            print(f"  scale {scale}: not in baseline")
+            continue
+        for name, stats in scale_result['routes'].items():
+            old = before['routes'].get(name)
+            if old is None:
+                continue
+            changes = [(stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                       for key in ('p50_ms', 'p95_ms')]
+            print(f"  scale {scale:<6s} {name:24s} p50 {old['p50_ms']:8.2f} -> {stats['p50_ms']:8.2f} ms "
+                  f"({changes[0]:+6.1f}%)   p95 {old['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms ({changes[1]:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', default='0.5,1,5', help='comma-separated generate_dataset.py scale factors')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--seed', type=int, default=2026)
+    parser.add_argument('--output', default='bench_routes.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_scale(float(args.worker.split(':')[0]), args.requests, args.seed, args.worker.split(':', 1)[1])
+        return
+
+    output = {
+        'meta': {'date': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+                 'python': platform.python_version(), 'requests_per_route': args.requests, 'seed': args.seed},
+        'scales': {},
+    }
+    for scale in args.scales.split(','):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            result_path = f.name
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', f'{float(scale)}:{result_path}',
+                            '--requests', str(args.requests), '--seed', str(args.seed)],
+                           check=True, stdout=subprocess.DEVNULL)
+            with open(result_path) as f:
+                output['scales'][scale] = json.load(f)
+        finally:
+            os.unlink(result_path)
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(output, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+INVITATION MAIL CHECK
+=====================
+Runs the invitation dispatcher against a local SMTP sink (aiosmtpd) and
+checks the outcome of every message: normal guests are delivered, a guest
+whose name breaks the Subject header and a recipient the sink refuses are
+marked failed, a temporarily refused message is retried and then delivered,
+and the workers keep going through all of it.
+
+Usage:
+    python check_invitations.py [--guests 200] [--workers 4]
+
+Exits non-zero if any check fails. Runs against a temporary data directory.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from aiosmtpd.controller import Controller
+
+os.environ.setdefault('TEM_DATA_DIR', tempfile.mkdtemp())
+import technical_event_management as tem
+
+
+class SinkHandler:
+    """Accepts everything except refused@ (550) and one deferral of tempfail@ (451)"""
+
+    def __init__(self):
+        self.delivered = []
+        self.deferred = False
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('refused@'):
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        if any(address.startswith('tempfail@') for address in envelope.rcpt_tos) and not self.deferred:
+            self.deferred = True
+            return '451 Try again later'
+        self.delivered.extend(envelope.rcpt_tos)
+        return '250 Message accepted'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def guest(guest_id, email, name='Guest'):
+    return {'id': guest_id, 'username': 'user1', 'event': 'Launch Party', 'guest_name': name,
+            'guest_email': email, 'token': f'token{guest_id}'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--guests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    handler = SinkHandler()
+    port = free_port()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    try:
+        dispatcher = tem.InvitationDispatcher(host='127.0.0.1', port=port, workers=args.workers, retry_base=0.1)
+        good = [guest(i, f'guest{i}@example.com') for i in range(args.guests)]
+        header_injection = guest(-1, 'evil@example.com\r\nBcc: everyone@example.com')
+        refused = guest(-2, 'refused@example.com')
+        tempfail = guest(-3, 'tempfail@example.com')
+        everyone = [header_injection, refused, tempfail] + good
+        dispatcher.enqueue(everyone)
+
+        deadline = time.monotonic() + 60
+        while any(g['invite_status'] == 'queued' for g in everyone) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        controller.stop()
+
+    checks = [
+        ('all ordinary guests sent', all(g['invite_status'] == 'sent' for g in good)),
+        ('ordinary guests delivered once each', sorted(handler.delivered.count(g['guest_email']) for g in good)
+         == [1] * len(good)),
+        ('header injection marked failed', header_injection['invite_status'] == 'failed'),
+        ('nothing injected reached the sink', 'everyone@example.com' not in handler.delivered),
+        ('refused recipient marked failed', refused['invite_status'] == 'failed'),
+        ('temporary refusal retried and sent', tempfail['invite_status'] == 'sent' and handler.deferred),
+        ('queue drained', dispatcher.pending() == 0),
+    ]
+    for label, ok in checks:
+        print(f"{'✅' if ok else '❌'} {label}")
+    print(f"stats: {dispatcher.stats}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""
+SYNTHETIC DATASET GENERATOR
+===========================
+Writes a reproducible dataset in the pickle files load_all_data() reads, with
+records shaped like the ones the app creates (tokens, end dates, per-vendor
+fulfillment, read flags, ...), for scale and load testing.
+
+Usage:
+    python generate_dataset.py --out data_scale --scale 10
+    python generate_dataset.py --out data_big --orders 10000000 --end-date 2026-06-30
+
+Counts default to --scale times a base size and can be overridden one by one.
+Every generated user/vendor has the password user123/vendor123, and the stock
+admin, vendor1 and user1 accounts are included. The same --seed and --end-date
+give byte-identical files.
+
+Start the app on the result with:  TEM_DATA_DIR=data_scale python technical_event_management.py
+"""
+
+import argparse
+import base64
+import os
+import pickle
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import technical_event_management as tem
+
+# Records per --scale unit
+BASE_COUNTS = {
+    'users': 1000,
+    'vendors': 50,
+    'products': 2000,
+    'orders': 5000,
+    'guests': 5000,
+    'events': 300,
+    'memberships': 200,
+    'requests': 500,
+    'price_rules': 20,
+}
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rohan', 'Isha',
+               'John', 'Maria', 'Wei', 'Fatima', 'Lucas', 'Emma', 'Noah', 'Olivia', 'Liam', 'Sofia']
+LAST_NAMES = ['Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Khan', 'Singh', 'Nair', 'Das', 'Mehta',
+              'Doe', 'Smith', 'Chen', 'Garcia', 'Silva', 'Müller', 'Rossi', 'Kim', 'Ali', 'Brown']
+PRODUCT_WORDS = ['Projector', 'Speaker', 'Chair', 'Table', 'Banner', 'Microphone', 'Catering Tray',
+                 'Lighting Kit', 'Stage Riser', 'Notebook', 'Badge Holder', 'Tent', 'LED Wall', 'Cable Set']
+EVENT_WORDS = ['Tech Conference', 'Hackathon', 'Product Launch', 'Workshop', 'Meetup', 'Gala Dinner',
+               'Alumni Reunion', 'Summit', 'Expo', 'Wedding Reception', 'Birthday Party']
+VENUE_WORDS = ['Hall', 'Auditorium', 'Convention Centre', 'Banquet', 'Lawn', 'Rooftop', 'Studio']
+
+
+class PickleStreamWriter:
+    """Write one protocol-2 pickle of a list (or dict) without holding it.
+
+    Records are pickled a chunk at a time and spliced into a single outer
+    list/dict with APPENDS/SETITEMS opcodes, so the file loads with a plain
+    pickle.load(). Objects shared between records of a chunk (status strings,
+    vendor names) stay shared after loading, as in the app's own pickles.
+    """
+
+    def __init__(self, path, mapping=False, chunk_size=1000):
+        self.file = open(path, 'wb')
+        self.mapping = mapping
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.count = 0
+        self.file.write(b'\x80\x02' + (b'}' if mapping else b']'))
+
+    def add(self, record):
+        """Add a record, or a (key, value) pair for a dict"""
+        self.chunk.append(record)
+        if len(self.chunk) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.chunk:
+            return
+        data = pickle.dumps(dict(self.chunk) if self.mapping else self.chunk, protocol=2)
+        # Drop PROTO, the chunk's own EMPTY_LIST/EMPTY_DICT + BINPUT 0, and
+        # STOP; what is left appends the records to the outer container
+        self.file.write(data[5:-1])
+        self.count += len(self.chunk)
+        self.chunk = []
+
+    def close(self, counter=None):
+        """Finish the pickle; with a counter it is (container, [counter]), the
+        layout used for the app's ID-numbered collections"""
+        self._flush()
+        if counter is not None:
+            self.file.write(b']' + pickle.dumps(counter, protocol=2)[2:-1] + b'a\x86')
+        self.file.write(b'.')
+        self.file.close()
+        return self.count
+
+
+class DatasetGenerator:
+    def __init__(self, out_dir, counts, seed, end_date, days):
+        self.out_dir = out_dir
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.end = end_date
+        self.days = days
+        # One shared string per day, so date prefixes pickle (and load) once per chunk
+        self.day_strings = [(end_date - timedelta(days=days - 1 - i)).isoformat() for i in range(days)]
+        self.user_names = ['user1'] + [f'user{i}' for i in range(2, counts['users'] + 1)]
+        self.vendor_names = ['vendor1'] + [f'vendor{i}' for i in range(2, counts['vendors'] + 1)]
+        self.product_prices = []
+        self.product_vendors = []
+        self.product_names = []
+        self.events_by_user = {}
+
+    def path(self, filename):
+        return os.path.join(self.out_dir, filename)
+
+    def timestamp(self, day_index):
+        """'YYYY-MM-DD HH:MM:SS' on the given day of the timeline"""
+        seconds = int(self.rng.random() * 86400)
+        return f"{self.day_strings[day_index]} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def person(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    # -- accounts -----------------------------------------------------------
+
+    def write_accounts(self):
+        with open(self.path('users.pkl'), 'wb') as f:
+            pickle.dump(tem.users_db, f)
+
+        writer = PickleStreamWriter(self.path('regular_users.pkl'), mapping=True)
+        for i, username in enumerate(self.user_names, start=1):
+            writer.add((username, {'password': 'user123', 'name': self.person(),
+                                   'email': f'{username}@example.com', 'phone': f'9{i:09d}'[-10:]}))
+        writer.close()
+
+        writer = PickleStreamWriter(self.path('vendors.pkl'), mapping=True)
+        for i, username in enumerate(self.vendor_names, start=1):
+            writer.add((username, {'password': 'vendor123', 'role': 'vendor',
+                                   'name': f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(['Events', 'Rentals', 'Supplies', 'AV'])} #{i}",
+                                   'email': f'{username}@vendors.example.com', 'phone': f'8{i:09d}'[-10:]}))
+        writer.close()
+
+        # Signup notifications: one per account, older ones read
+        writer = PickleStreamWriter(self.path('notifications.pkl'))
+        accounts = [('vendor', name) for name in self.vendor_names] + [('user', name) for name in self.user_names]
+        for notification_id, (kind, username) in enumerate(accounts, start=1):
+            day = notification_id * self.days // (len(accounts) + 1)
+            writer.add({'id': notification_id, 'type': kind, 'username': username, 'name': self.person(),
+                        'email': f'{username}@example.com', 'phone': f'9{notification_id:09d}'[-10:],
+                        'date': self.timestamp(day), 'read': day < self.days - 7 or self.rng.random() < 0.5})
+        return writer.close(counter=len(accounts) + 1)
+
+    # -- catalog ------------------------------------------------------------
+
+    def write_products(self):
+        writer = PickleStreamWriter(self.path('products.pkl'))
+        rng = self.rng
+        for product_id in range(1, self.counts['products'] + 1):
+            vendor = self.vendor_names[int(rng.random() * len(self.vendor_names))]
+            price = round(10 + rng.random() * 4990, 2)
+            name = f"{rng.choice(PRODUCT_WORDS)} {product_id}"
+            self.product_prices.append(price)
+            self.product_vendors.append(vendor)
+            self.product_names.append(name)
+            writer.add({'id': product_id, 'name': name, 'description': f'{name} for events',
+                        'price': price, 'stock': int(rng.random() * 500),
+                        'category': rng.choice(tem.PRODUCT_CATEGORIES), 'added_by': vendor,
+                        'date_added': self.timestamp(int(rng.random() * self.days))})
+        return writer.close(counter=self.counts['products'] + 1)
+
+    def write_price_rules(self):
+        rng = self.rng
+        rules = []
+        for rule_id in range(1, self.counts['price_rules'] + 1):
+            kind = rng.choice(list(tem.PRICE_RULE_KINDS))
+            rule = {'id': rule_id, 'kind': kind, 'percent': rng.choice([5, 10, 15, 20]),
+                    'tier': None, 'vendor': None, 'category': None, 'product_id': None, 'min_qty': 1}
+            if kind == 'tier':
+                rule['tier'] = rng.choice(tem.MEMBERSHIP_TIERS)
+                rule['category'] = rng.choice([None] + tem.PRODUCT_CATEGORIES)
+            elif kind == 'vendor':
+                rule['vendor'] = rng.choice(self.vendor_names)
+                rule['category'] = rng.choice([None] + tem.PRODUCT_CATEGORIES)
+            else:
+                rule['product_id'] = rng.randint(1, self.counts['products'])
+                rule['min_qty'] = rng.choice([2, 5, 10])
+            rules.append(rule)
+        with open(self.path('price_rules.pkl'), 'wb') as f:
+            pickle.dump((rules, [len(rules) + 1]), f)
+        return len(rules)
+
+    def write_availability(self):
+        horizon = min((self.end - tem.AVAILABILITY_EPOCH).days + 365, tem.AVAILABILITY_MAX_DAYS)
+        availability = {vendor: self.rng.getrandbits(horizon) | self.rng.getrandbits(horizon)
+                        for vendor in self.vendor_names}
+        with open(self.path('availability.pkl'), 'wb') as f:
+            pickle.dump(availability, f)
+        return len(availability)
+
+    # -- events, guests -----------------------------------------------------
+
+    def write_events(self):
+        rng = self.rng
+        venues = [f"{rng.choice(LAST_NAMES)} {rng.choice(VENUE_WORDS)} {i}"
+                  for i in range(1, max(5, self.counts['events'] // 25) + 1)]
+        first_start = datetime.combine(self.end - timedelta(days=self.days - 1), datetime.min.time())
+        next_free = {venue: first_start + timedelta(hours=rng.randint(8, 200)) for venue in venues}
+        writer = PickleStreamWriter(self.path('events.pkl'))
+        for event_id in range(1, self.counts['events'] + 1):
+            # Venue timelines only move forward, so generated bookings never overlap
+            venue = venues[event_id % len(venues)]
+            start = next_free[venue]
+            end = start + timedelta(hours=rng.randint(2, 10))
+            next_free[venue] = end + timedelta(hours=rng.randint(1, 24 * 20))
+            username = self.user_names[int(rng.random() * len(self.user_names))]
+            name = f"{rng.choice(EVENT_WORDS)} {event_id}"
+            self.events_by_user.setdefault(username, []).append((event_id, name))
+            writer.add({'id': event_id, 'username': username, 'name': name, 'venue': venue,
+                        'start': start.strftime(tem.EVENT_TIME_FORMAT), 'end': end.strftime(tem.EVENT_TIME_FORMAT),
+                        'capacity': rng.choice([50, 100, 200, 500, 1000]),
+                        'status': 'Cancelled' if rng.random() < 0.05 else 'Scheduled',
+                        'date_created': self.timestamp(int(rng.random() * self.days))})
+        return writer.close(counter=self.counts['events'] + 1)
+
+    def write_guests(self):
+        rng = self.rng
+        writer = PickleStreamWriter(self.path('guests.pkl'))
+        for guest_id in range(1, self.counts['guests'] + 1):
+            username = self.user_names[int(rng.random() * len(self.user_names))]
+            events = self.events_by_user.get(username)
+            event = rng.choice(events)[1] if events else rng.choice(EVENT_WORDS)
+            day = int(rng.random() * self.days)
+            guest = {'id': guest_id, 'username': username, 'guest_name': self.person(),
+                     'guest_email': f'guest{guest_id}@example.com', 'guest_phone': f'7{guest_id:09d}'[-10:],
+                     'event': event, 'date_added': self.timestamp(day),
+                     'token': base64.urlsafe_b64encode(rng.getrandbits(72).to_bytes(9, 'big')).decode(),
+                     'checked_in': self.timestamp(min(day + 1, self.days - 1)) if rng.random() < 0.3 else None}
+            if rng.random() < 0.6:
+                guest['invite_status'] = 'sent'
+                guest['invited_at'] = self.timestamp(min(day + 1, self.days - 1))
+            writer.add(guest)
+        return writer.close(counter=self.counts['guests'] + 1)
+
+    # -- orders and what follows from them ----------------------------------
+
+    def fulfillment_status(self, age_days):
+        if self.rng.random() < 0.04:
+            return 'Cancelled'
+        if age_days > 14:
+            return 'Delivered'
+        if age_days > 7:
+            return 'Shipped'
+        if age_days > 2:
+            return 'Packed'
+        return 'Confirmed'
+
+    def write_orders(self):
+        rng = self.rng
+        rnd = rng.random
+        n_orders = self.counts['orders']
+        n_products = len(self.product_prices)
+        n_users = len(self.user_names)
+        retention = tem.NOTIFICATION_RETENTION_DAYS
+        orders = PickleStreamWriter(self.path('orders.pkl'))
+        notifications = PickleStreamWriter(self.path('vendor_notifications.pkl'))
+        notification_id = 1
+        event_ids = {username: [event_id for event_id, _ in events]
+                     for username, events in self.events_by_user.items()}
+
+        for order_id in range(1, n_orders + 1):
+            day = order_id * self.days // (n_orders + 1)
+            age = self.days - 1 - day
+            username = self.user_names[int(rnd() * n_users)]
+            items = {}
+            for _ in range(1 + int(rnd() * rnd() * 6)):
+                items[1 + int(rnd() * n_products)] = 1 + int(rnd() * rnd() * 10)
+            items = list(items.items())
+            total = round(sum(self.product_prices[pid - 1] * qty for pid, qty in items), 2)
+            vendors = []
+            for pid, _ in items:
+                if self.product_vendors[pid - 1] not in vendors:
+                    vendors.append(self.product_vendors[pid - 1])
+            fulfillment = {vendor: self.fulfillment_status(age) for vendor in vendors}
+            order_date = self.timestamp(day)
+            user_events = event_ids.get(username)
+            orders.add({'id': order_id, 'username': username, 'items': items, 'total': total, 'discount': 0.0,
+                        'status': tem.aggregate_order_status(fulfillment), 'fulfillment': fulfillment,
+                        'event_id': user_events[int(rnd() * len(user_events))] if user_events and rnd() < 0.3 else None,
+                        'date': order_date})
+
+            # Older vendor notifications have been read and archived
+            if age < retention:
+                for vendor in vendors:
+                    lines = [(self.product_names[pid - 1], qty, self.product_prices[pid - 1] * qty)
+                             for pid, qty in items if self.product_vendors[pid - 1] == vendor]
+                    notifications.add({
+                        'id': notification_id, 'vendor_username': vendor,
+                        'message': (f"New order #{order_id} from {username}: "
+                                    f"{', '.join(f'{qty} × {name}' for name, qty, _ in lines)} "
+                                    f"(₹{sum(amount for _, _, amount in lines)})"),
+                        'date': order_date, 'read': age > 3 or rnd() < 0.3})
+                    notification_id += 1
+
+        orders.close(counter=n_orders + 1)
+        notifications.close(counter=notification_id)
+        return n_orders, notification_id - 1
+
+    def write_carts(self):
+        rng = self.rng
+        writer = PickleStreamWriter(self.path('carts.pkl'), mapping=True)
+        for username in self.user_names:
+            if rng.random() < 0.1:
+                writer.add((username, {rng.randint(1, self.counts['products']): rng.randint(1, 5)
+                                       for _ in range(rng.randint(1, 5))}))
+        return writer.close()
+
+    def write_memberships(self):
+        rng = self.rng
+        writer = PickleStreamWriter(self.path('memberships.pkl'))
+        today = self.end.isoformat()
+        durations = list(tem.MEMBERSHIP_DURATION_MONTHS)
+        members = rng.sample(self.user_names, min(self.counts['memberships'], len(self.user_names)))
+        for membership_id, username in enumerate(members, start=1):
+            duration = rng.choice(durations)
+            start_date = self.day_strings[int(rng.random() * self.days)]
+            end_date = tem.membership_end_date(start_date, duration)
+            writer.add({'id': membership_id, 'username': username, 'type': rng.choice(tem.MEMBERSHIP_TIERS),
+                        'duration': duration, 'start_date': start_date, 'end_date': end_date,
+                        'status': 'Active' if end_date >= today else 'Expired'})
+        return writer.close(counter=len(members) + 1)
+
+    def write_requests(self):
+        rng = self.rng
+        writer = PickleStreamWriter(self.path('requests.pkl'))
+        n_requests = self.counts['requests']
+        for request_id in range(1, n_requests + 1):
+            day = request_id * self.days // (n_requests + 1)
+            request = {'id': request_id, 'username': rng.choice(self.user_names),
+                       'vendor_username': rng.choice(self.vendor_names),
+                       'kind': rng.choice(['item', 'service']), 'product_name': rng.choice(PRODUCT_WORDS),
+                       'message': 'Please share availability and pricing.',
+                       'status': rng.choice(['open', 'quoted', 'closed']), 'date': self.timestamp(day)}
+            if request['status'] != 'open':
+                request['updated'] = self.timestamp(min(day + 1, self.days - 1))
+                if request['status'] == 'quoted' or rng.random() < 0.5:
+                    request['quote'] = round(50 + rng.random() * 5000, 2)
+                    request['quote_note'] = 'Includes delivery'
+            writer.add(request)
+        return writer.close(counter=n_requests + 1)
+
+    def run(self):
+        steps = [
+            ('accounts + signup notifications', self.write_accounts),
+            ('products', self.write_products),
+            ('price rules', self.write_price_rules),
+            ('vendor availability', self.write_availability),
+            ('events', self.write_events),
+            ('guests', self.write_guests),
+            ('orders + vendor notifications', self.write_orders),
+            ('carts', self.write_carts),
+            ('memberships', self.write_memberships),
+            ('requests', self.write_requests),
+        ]
+        started = time.perf_counter()
+        for label, step in steps:
+            step_started = time.perf_counter()
+            result = step()
+            print(f"  {label:34s} {str(result):>24s}  {time.perf_counter() - step_started:8.2f}s")
+        with open(self.path('notification_state.pkl'), 'wb') as f:
+            pickle.dump({}, f)
+        print(f"Done in {time.perf_counter() - started:.1f}s -> {self.out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--out', default='data_scale', help='output directory (created if missing)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for the base record counts')
+    parser.add_argument('--seed', type=int, default=2026)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='last day of the generated timeline (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=365, help='length of the timeline in days')
+    parser.add_argument('--force', action='store_true', help='overwrite a non-empty output directory')
+    for name, base in BASE_COUNTS.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=int, default=None,
+                            help=f'number of {name.replace("_", " ")} (default {base} x scale)')
+    args = parser.parse_args()
+
+    counts = {name: getattr(args, name) if getattr(args, name) is not None else max(1, int(base * args.scale))
+              for name, base in BASE_COUNTS.items()}
+    if os.path.isdir(args.out) and os.listdir(args.out) and not args.force:
+        parser.error(f"{args.out} is not empty (use --force to overwrite)")
+    os.makedirs(args.out, exist_ok=True)
+
+    print("Generating: " + ', '.join(f"{count:,} {name}" for name, count in counts.items()))
+    DatasetGenerator(args.out, counts, args.seed, args.end_date, args.days).run()
+
+
+if __name__ == '__main__':
+    main()
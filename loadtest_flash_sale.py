@@ -0,0 +1,206 @@
+"""
+FLASH SALE LOAD TEST
+====================
+Simulates a flash sale against a running server: many users log in, put one
+of a few hot products in their cart, wait for each other and then all check
+out at the same moment. Reports orders/s, rejected checkouts, the checkout
+latency distribution and whether the final stock adds up.
+
+Usage:
+    python technical_event_management.py            (in another terminal)
+    python loadtest_flash_sale.py [--url http://127.0.0.1:5000] [--users 200] [--hot 3]
+                                  [--product-ids 4,7] [--quantity 1]
+
+Simulated users are flashuser1..N (signed up on first use, password flash123).
+Stock is read from the admin product list, so the admin password must match.
+Each user buys a single line, so every accepted checkout sold exactly
+--quantity units and the stock check is exact.
+"""
+
+import argparse
+import http.client
+import re
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+PASSWORD = 'flash123'
+PRODUCT_ROW = re.compile(r'<td>(\d+)</td>\s*<td>[^<]*</td>\s*<td>[^<]*</td>\s*<td>[^<]*</td>\s*<td>(-?\d+)</td>')
+CART_LINE = re.compile(r'name="product_id" value="(\d+)"')
+HISTOGRAM_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class Client:
+    """One browser session: keeps the Flask session cookie, never follows redirects"""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            headers = {'Cookie': self.cookie} if self.cookie else {}
+            body = None
+            if form is not None:
+                body = urlencode(form)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            text = response.read().decode('utf-8', 'replace')
+            for header, value in response.getheaders():
+                if header.lower() == 'set-cookie' and value.startswith('session='):
+                    self.cookie = value.split(';', 1)[0]
+            return response.status, response.getheader('Location') or '', text
+        finally:
+            connection.close()
+
+    def login(self, path, username, password):
+        status, location, _ = self.request('POST', path, {'username': username, 'password': password})
+        return status == 302 and 'dashboard' in location
+
+
+def read_stock(admin):
+    status, _, page = admin.request('GET', '/admin/all-products')
+    if status != 200:
+        raise SystemExit(f"Could not read the product list (HTTP {status})")
+    return {int(product_id): int(stock) for product_id, stock in PRODUCT_ROW.findall(page)}
+
+
+def prepare_user(base_url, index, product_id, quantity):
+    """Log in (signing up first if needed) and leave exactly one line in the cart"""
+    client = Client(base_url)
+    username = f'flashuser{index}'
+    if not client.login('/user/login', username, PASSWORD):
+        client.request('POST', '/user/signup', {'username': username, 'password': PASSWORD,
+                                                'name': f'Flash User {index}',
+                                                'email': f'{username}@example.com', 'phone': '0000000000'})
+        if not client.login('/user/login', username, PASSWORD):
+            raise RuntimeError(f"could not log in as {username}")
+
+    # Clear whatever an earlier run left behind, then add the hot product
+    _, _, cart = client.request('GET', '/user/cart')
+    for leftover in set(CART_LINE.findall(cart)):
+        client.request('POST', '/user/cart', {'action': 'remove', 'product_id': leftover})
+    client.request('POST', '/user/add-to-cart', {'product_id': product_id, 'quantity': quantity})
+    return client
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--hot', type=int, default=3, help='number of hot products (lowest positive stock)')
+    parser.add_argument('--product-ids', help='comma-separated hot product ids instead of --hot')
+    parser.add_argument('--quantity', type=int, default=1, help='units per checkout')
+    parser.add_argument('--admin-password', default='admin123')
+    args = parser.parse_args()
+
+    admin = Client(args.url)
+    if not admin.login('/admin/login', 'admin', args.admin_password):
+        raise SystemExit("Admin login failed; pass --admin-password")
+    stock_before = read_stock(admin)
+    if args.product_ids:
+        hot = [int(product_id) for product_id in args.product_ids.split(',')]
+    else:
+        hot = sorted((pid for pid, stock in stock_before.items() if stock > 0),
+                     key=lambda pid: (stock_before[pid], pid))[:args.hot]
+    if not hot or any(pid not in stock_before for pid in hot):
+        raise SystemExit("No usable hot products")
+
+    print(f"Preparing {args.users} users on products {hot} "
+          f"(stock {[stock_before[pid] for pid in hot]}, {args.quantity} unit(s) per checkout)")
+    clients = [None] * args.users
+    setup_errors = []
+
+    def setup(index):
+        try:
+            clients[index] = prepare_user(args.url, index + 1, hot[index % len(hot)], args.quantity)
+        except Exception as e:
+            setup_errors.append(str(e))
+
+    threads = [threading.Thread(target=setup, args=(i,)) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if setup_errors:
+        raise SystemExit(f"{len(setup_errors)} users failed to set up, e.g. {setup_errors[0]}")
+    stock_before = read_stock(admin)
+
+    # Everyone checks out together once the last thread reaches the barrier
+    barrier = threading.Barrier(args.users + 1)
+    outcomes = [None] * args.users
+
+    def checkout(index):
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            status, location, _ = clients[index].request('POST', '/user/cart', {'action': 'checkout'})
+            if status == 302 and location.endswith('/user/orders'):
+                outcome = 'accepted'
+            elif status == 302 and location.endswith('/user/cart'):
+                outcome = 'rejected'
+            else:
+                outcome = f'HTTP {status}'
+        except Exception as e:
+            outcome = type(e).__name__
+        outcomes[index] = (outcome, time.perf_counter() - started)
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    sale_started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - sale_started
+
+    counts = {}
+    for outcome, _ in outcomes:
+        counts[outcome] = counts.get(outcome, 0) + 1
+    accepted = counts.get('accepted', 0)
+    latencies = sorted(latency * 1000 for _, latency in outcomes)
+
+    print(f"\nCheckouts:  {args.users} in {elapsed:.2f}s  ->  {accepted / elapsed:,.1f} orders/s")
+    print(f"Accepted:   {accepted}")
+    print(f"Rejected:   {counts.get('rejected', 0)}  (out of stock)")
+    errors = {outcome: n for outcome, n in counts.items() if outcome not in ('accepted', 'rejected')}
+    if errors:
+        print(f"Errors:     {errors}")
+    print(f"Latency ms: p50 {percentile(latencies, 0.5):.1f}  p90 {percentile(latencies, 0.9):.1f}  "
+          f"p95 {percentile(latencies, 0.95):.1f}  p99 {percentile(latencies, 0.99):.1f}  max {latencies[-1]:.1f}")
+    lower = 0
+    for bound in HISTOGRAM_MS + [float('inf')]:
+        in_bucket = sum(1 for latency in latencies if lower <= latency < bound)
+        if in_bucket:
+            label = f"{lower:g}-{bound:g}" if bound != float('inf') else f">={lower:g}"
+            print(f"  {label:>11s} ms  {in_bucket:6d}  {'#' * max(1, in_bucket * 50 // len(latencies))}")
+        lower = bound
+
+    # Every accepted checkout sold one line of --quantity units of that user's hot product
+    stock_after = read_stock(admin)
+    consistent = True
+    print("\nStock:")
+    for position, pid in enumerate(hot):
+        sold_by_orders = sum(args.quantity for index, (outcome, _) in enumerate(outcomes)
+                             if outcome == 'accepted' and index % len(hot) == position)
+        sold_by_stock = stock_before[pid] - stock_after.get(pid, 0)
+        ok = sold_by_orders == sold_by_stock and stock_after.get(pid, 0) >= 0
+        consistent = consistent and ok
+        print(f"  product {pid}: {stock_before[pid]} -> {stock_after.get(pid, 0)}  "
+              f"sold {sold_by_stock}, orders say {sold_by_orders}  {'✅' if ok else '❌'}")
+    print("✅ Stock is consistent" if consistent else "❌ Stock does not match the accepted orders")
+    if not consistent:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
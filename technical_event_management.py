@@ -8,13 +8,64 @@ Author: Student Project
 Date: February 2026
 """
 
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash
-from datetime import datetime
-import pickle
 import os
+import atexit
+
+# Optional: serve with gevent so idle SSE subscribers are greenlets, not threads.
+# Must patch before anything else imports threading/socket.
+GEVENT = os.environ.get('TEM_GEVENT') == '1'
+if GEVENT:
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, Response, render_template_string, request, redirect, url_for, session, flash, jsonify
+from flask import before_render_template, template_rendered
+from collections import deque, OrderedDict, Counter
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup
+from datetime import datetime, date, timedelta
+from email.message import EmailMessage
+import threading
+import sys
+import tempfile
+import shutil
+import secrets
+import itertools
+import smtplib
+import pickle
+import queue
+import gzip
+import calendar
+import heapq
+import math
+import bisect
+import uuid
+import time
+import json
+import cProfile
+import pstats
+import marshal
+import tracemalloc
+import csv
+import io
+import random
+import zlib
+import bz2
+import lzma
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+try:
+    import msgpack
+except ImportError:  # optional: enables TEM_DATA_FORMAT=msgpack
+    msgpack = None
 
 # Data persistence directory
-DATA_DIR = 'data'
+DATA_DIR = os.environ.get('TEM_DATA_DIR', 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
 ROLE_HOME = {
@@ -95,41 +146,465 @@ request_id_counter = [1]
 guest_list_db = []
 guest_id_counter = [1]
 
+# Events Database (venue bookings)
+events_db = []
+event_id_counter = [1]
+
+# Vendor Availability (vendor username -> day bitmap, see VENDOR AVAILABILITY)
+vendor_availability = {}
+
+# Price Rules Database (checkout discounts)
+price_rules_db = []
+price_rule_id_counter = [1]
+
+# Product categories offered on the add-item form
+PRODUCT_CATEGORIES = ['Electronics', 'Furniture', 'Stationery', 'Catering',
+                      'Decorations', 'Audio/Visual', 'Other']
+
+# Guards multi-step updates of the shared collections (dev server is threaded)
+data_lock = threading.RLock()
+
+# ============================================================================
+# LOOKUP INDEXES (rebuilt from the databases after loading)
+# ============================================================================
+
+# Product ID -> product dict (same objects as in products_db)
+product_index = {}
+
+# Category -> {vendor username: number of that vendor's products in it}
+category_vendors = {}
+
+# (username, event key) -> {normalized email/phone key -> guest ID}
+guest_contact_index = {}
+
+# Check-in token -> guest dict
+guest_token_index = {}
+
+# (username, event key) -> {'event': name, 'invited': n, 'checked_in': n}
+event_guest_counts = {}
+
+# Notification ID -> notification dict, for admin and vendor notifications
+notification_index = {}
+vendor_notification_index = {}
+
+# Vendor username -> that vendor's notifications, oldest first
+vendor_notifications_by_vendor = {}
+
+# Membership ID -> membership, and username -> that user's memberships
+membership_index = {}
+memberships_by_user = {}
+
+# Username -> the user's best active membership (highest tier, latest end)
+active_memberships = {}
+
+# Min-heap of (end_date, membership ID); stale entries are skipped on pop
+membership_expiry_heap = []
+
+# Event ID -> event; (username, event key) -> event, matching guest_event_key();
+# user -> sorted IDs of that user's events
+event_index = {}
+events_by_key = {}
+user_event_ids = {}
+
+# Normalized venue -> IntervalTree of that venue's scheduled events
+venue_schedules = {}
+
+# Event ID -> IDs of orders placed for the event
+event_order_ids = {}
+
+# Order ID -> order; vendor -> IDs of orders with that vendor's products
+order_index = {}
+vendor_order_ids = {}
+
+# (vendor, fulfillment status) -> {order ID: None} (insertion-ordered set)
+fulfillment_index = {}
+
+# Request ID -> user request; vendor / (vendor, status) / user -> sorted request IDs
+request_index = {}
+vendor_request_ids = {}
+vendor_request_status_ids = {}
+user_request_ids = {}
+
+# Recipient channel ('admin' / 'vendor:<username>') -> unread count
+notification_unread_counts = {}
+
+# Recipient channel -> highest notification ID covered by "mark all as read"
+# (persisted; a notification is read if its flag is set or its ID is at or
+# below the watermark)
+notification_read_watermarks = {}
+
+def rebuild_indexes():
+    """Rebuild all lookup indexes from the in-memory databases.
+
+    Each group of indexes is built into new objects and then swapped in, so
+    readers that do not take data_lock see the old or the new indexes, never
+    a half-built one.
+    """
+    rebuild_product_indexes()
+    rebuild_guest_indexes()
+    rebuild_notification_indexes()
+    rebuild_membership_indexes()
+    compile_price_rules()
+    rebuild_event_indexes()
+    rebuild_order_indexes()
+    rebuild_request_indexes()
+
+def rebuild_product_indexes():
+    global product_index, category_vendors
+    staged = ({}, {})
+    for product in products_db:
+        index_product(product, staged)
+    product_index, category_vendors = staged
+
+def rebuild_guest_indexes():
+    global guest_contact_index, guest_token_index, event_guest_counts
+    staged = ({}, {}, {})
+    for guest in guest_list_db:
+        index_guest(guest, staged)
+    guest_contact_index, guest_token_index, event_guest_counts = staged
+
+def rebuild_membership_indexes():
+    global membership_index, memberships_by_user, membership_expiry_heap, active_memberships
+    staged = ({}, {}, [])
+    for membership in memberships_db:
+        index_membership(membership, staged)
+    heapq.heapify(staged[2])
+    active = {}
+    for username, user_memberships in staged[1].items():
+        best = best_active_membership(user_memberships)
+        if best:
+            active[username] = best
+    membership_index, memberships_by_user, membership_expiry_heap = staged
+    active_memberships = active
+    expire_memberships()
+
+def rebuild_event_indexes():
+    global event_index, events_by_key, user_event_ids, venue_schedules
+    staged = ({}, {}, {}, {})
+    for event in events_db:
+        index_event(event, staged)
+    event_index, events_by_key, user_event_ids, venue_schedules = staged
+
+def rebuild_order_indexes():
+    global order_index, vendor_order_ids, fulfillment_index, event_order_ids
+    staged = ({}, {}, {}, {})
+    for order in orders_db:
+        index_order(order, staged)
+    order_index, vendor_order_ids, fulfillment_index, event_order_ids = staged
+
+def rebuild_request_indexes():
+    global request_index, vendor_request_ids, vendor_request_status_ids, user_request_ids
+    staged = ({}, {}, {}, {})
+    for user_request in sorted(user_requests_db, key=lambda r: r['id']):
+        index_user_request(user_request, staged)
+    request_index, vendor_request_ids, vendor_request_status_ids, user_request_ids = staged
+
+def index_product(product, indexes=None):
+    by_id, by_category = indexes or (product_index, category_vendors)
+    by_id[product['id']] = product
+    vendors = by_category.setdefault(product['category'], {})
+    vendors[product['added_by']] = vendors.get(product['added_by'], 0) + 1
+
+def unindex_product(product):
+    del product_index[product['id']]
+    vendors = category_vendors.get(product['category'], {})
+    vendors[product['added_by']] -= 1
+    if not vendors[product['added_by']]:
+        del vendors[product['added_by']]
+
+def rebuild_notification_indexes():
+    """Rebuild the notification ID indexes, per-vendor lists and unread counts"""
+    global notification_index, vendor_notification_index, vendor_notifications_by_vendor
+    global notification_unread_counts
+    admin_index, unread = {}, {}
+    staged = ({}, {}, unread)
+    for notif in notifications_db:
+        admin_index[notif['id']] = notif
+        if not is_notification_read(notif, 'admin'):
+            unread['admin'] = unread.get('admin', 0) + 1
+    for notif in vendor_notifications_db:
+        index_vendor_notification(notif, staged)
+    notification_index = admin_index
+    vendor_notification_index, vendor_notifications_by_vendor, notification_unread_counts = staged
+
+def index_vendor_notification(notif, indexes=None):
+    by_id, by_vendor, unread = indexes or (vendor_notification_index, vendor_notifications_by_vendor,
+                                           notification_unread_counts)
+    by_id[notif['id']] = notif
+    by_vendor.setdefault(notif['vendor_username'], []).append(notif)
+    channel = 'vendor:' + notif['vendor_username']
+    if not is_notification_read(notif, channel):
+        unread[channel] = unread.get(channel, 0) + 1
+
 # ============================================================================
 # DATA PERSISTENCE FUNCTIONS
 # ============================================================================
 
+# File format written by save_all_data(): a serializer with an optional
+# "+codec" suffix, e.g. pickle5, marshal+zlib or msgpack+lzma (see data_formats()).
+# Files in every format stay readable, so this can change without a migration.
+DATA_FORMAT = os.environ.get('TEM_DATA_FORMAT', 'pickle')
+
+# Files in anything but uncompressed pickle start with this, a length byte and the format name
+DATA_FILE_MAGIC = b'TEMD'
+
+def _pack_records(value):
+    """Store a list of dicts as shared key tuples plus one value tuple per record"""
+    if isinstance(value, list) and value and all(type(item) is dict for item in value):
+        shapes, shape_ids, rows = [], {}, []
+        for item in value:
+            keys = tuple(item)
+            shape = shape_ids.get(keys)
+            if shape is None:
+                shape = shape_ids[keys] = len(shapes)
+                shapes.append(keys)
+            rows.append((*item.values(), shape))
+        return {'__records__': shapes, 'rows': rows}
+    return value
+
+def _unpack_records(value):
+    if isinstance(value, dict) and '__records__' in value:
+        shapes = value['__records__']
+        # zip() stops at the end of the keys, so the trailing shape id is skipped
+        return [dict(zip(shapes[row[-1]], row)) for row in value['rows']]
+    return value
+
+def _to_plain(payload):
+    if isinstance(payload, tuple):
+        return tuple(_pack_records(part) for part in payload)
+    return _pack_records(payload)
+
+def _from_plain(payload):
+    # Top-level payloads are a collection or a (collection, counter) tuple; msgpack hands tuples back as lists
+    if isinstance(payload, (tuple, list)):
+        return tuple(_unpack_records(part) for part in payload)
+    return _unpack_records(payload)
+
+def _msgpack_default(obj):
+    # Availability bitmaps outgrow msgpack's 64-bit integers
+    if isinstance(obj, int):
+        return msgpack.ExtType(1, obj.to_bytes(obj.bit_length() // 8 + 1, 'big', signed=True))
+    raise TypeError(f"cannot serialize {type(obj).__name__}")
+
+def _msgpack_ext(code, data):
+    return int.from_bytes(data, 'big', signed=True)
+
+def _pickle_serializer(protocol):
+    return (lambda payload: pickle.dumps(payload, protocol), pickle.loads)
+
+# name -> (dumps, loads)
+SERIALIZERS = {
+    'pickle': _pickle_serializer(pickle.DEFAULT_PROTOCOL),
+    'pickle2': _pickle_serializer(2),
+    'pickle4': _pickle_serializer(4),
+    'pickle5': _pickle_serializer(5),
+    'marshal': (lambda payload: marshal.dumps(_to_plain(payload)),
+                lambda data: _from_plain(marshal.loads(data))),
+}
+if msgpack is not None:
+    SERIALIZERS['msgpack'] = (
+        lambda payload: msgpack.packb(_to_plain(payload), default=_msgpack_default),
+        lambda data: _from_plain(msgpack.unpackb(data, ext_hook=_msgpack_ext, strict_map_key=False)))
+
+# name -> (compress, decompress)
+CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+def data_formats():
+    """Every format this install can write"""
+    return list(SERIALIZERS) + [f'{name}+{codec}' for name in SERIALIZERS for codec in CODECS]
+
+if DATA_FORMAT not in data_formats():
+    print(f"⚠️ TEM_DATA_FORMAT={DATA_FORMAT!r} is unknown or needs a missing package, using pickle")
+    DATA_FORMAT = 'pickle'
+
+def encode_data(payload, fmt=None):
+    fmt = fmt or DATA_FORMAT
+    name, _, codec = fmt.partition('+')
+    data = SERIALIZERS[name][0](payload)
+    if codec:
+        data = CODECS[codec][0](data)
+    if name.startswith('pickle') and not codec:
+        # Plain pickle stays headerless so older code (and generate_dataset.py output) match
+        return data
+    tag = fmt.encode()
+    return DATA_FILE_MAGIC + bytes([len(tag)]) + tag + data
+
+def decode_data(data):
+    if not data.startswith(DATA_FILE_MAGIC):
+        return pickle.loads(data)
+    header = len(DATA_FILE_MAGIC) + 1 + data[len(DATA_FILE_MAGIC)]
+    fmt = data[len(DATA_FILE_MAGIC) + 1:header].decode()
+    name, _, codec = fmt.partition('+')
+    if name not in SERIALIZERS or (codec and codec not in CODECS):
+        raise ValueError(f"file was written as {fmt}, which this install cannot read")
+    data = memoryview(data)[header:]
+    if codec:
+        data = CODECS[codec][1](data)
+    return SERIALIZERS[name][1](data)
+
+def write_data_file(filename, payload):
+    with open(f'{DATA_DIR}/{filename}', 'wb') as f:
+        f.write(encode_data(payload))
+
+def read_data_file(filename):
+    with open(f'{DATA_DIR}/{filename}', 'rb') as f:
+        return decode_data(f.read())
+
+def data_file_payloads():
+    """What save_all_data() writes, as file name -> payload"""
+    return {
+        'users.pkl': users_db,
+        'regular_users.pkl': regular_users_db,
+        'vendors.pkl': vendors_db,
+        'products.pkl': (products_db, product_id_counter),
+        'carts.pkl': cart_db,
+        'orders.pkl': (orders_db, order_id_counter),
+        'notifications.pkl': (notifications_db, notification_id_counter),
+        'vendor_notifications.pkl': (vendor_notifications_db, vendor_notification_id_counter),
+        'memberships.pkl': (memberships_db, membership_id_counter),
+        'requests.pkl': (user_requests_db, request_id_counter),
+        'guests.pkl': (guest_list_db, guest_id_counter),
+        'notification_state.pkl': notification_read_watermarks,
+        'price_rules.pkl': (price_rules_db, price_rule_id_counter),
+        'events.pkl': (events_db, event_id_counter),
+        'availability.pkl': vendor_availability,
+    }
+
 def save_all_data():
-    """Save all databases to disk using Pickle"""
+    """Save all databases to disk in DATA_FORMAT"""
+    started = time.perf_counter()
+    # A collection that is still loading in the background cannot have changed
+    # yet, so its file is current; skip it rather than overwrite it with defaults
+    loading = {filename for name, files in LAZY_COLLECTIONS.items()
+               if not collection_ready[name].is_set() for filename in files}
     try:
-        with open(f'{DATA_DIR}/users.pkl', 'wb') as f:
-            pickle.dump(users_db, f)
-        with open(f'{DATA_DIR}/regular_users.pkl', 'wb') as f:
-            pickle.dump(regular_users_db, f)
-        with open(f'{DATA_DIR}/vendors.pkl', 'wb') as f:
-            pickle.dump(vendors_db, f)
-        with open(f'{DATA_DIR}/products.pkl', 'wb') as f:
-            pickle.dump((products_db, product_id_counter), f)
-        with open(f'{DATA_DIR}/carts.pkl', 'wb') as f:
-            pickle.dump(cart_db, f)
-        with open(f'{DATA_DIR}/orders.pkl', 'wb') as f:
-            pickle.dump((orders_db, order_id_counter), f)
-        with open(f'{DATA_DIR}/notifications.pkl', 'wb') as f:
-            pickle.dump((notifications_db, notification_id_counter), f)
-        with open(f'{DATA_DIR}/vendor_notifications.pkl', 'wb') as f:
-            pickle.dump((vendor_notifications_db, vendor_notification_id_counter), f)
-        with open(f'{DATA_DIR}/memberships.pkl', 'wb') as f:
-            pickle.dump((memberships_db, membership_id_counter), f)
-        with open(f'{DATA_DIR}/requests.pkl', 'wb') as f:
-            pickle.dump((user_requests_db, request_id_counter), f)
-        with open(f'{DATA_DIR}/guests.pkl', 'wb') as f:
-            pickle.dump((guest_list_db, guest_id_counter), f)
+        for filename, payload in data_file_payloads().items():
+            if filename not in loading:
+                write_data_file(filename, payload)
+        observe_operation('save_all_data', time.perf_counter() - started)
         print("✅ Data saved successfully!")
     except Exception as e:
         print(f"❌ Error saving data: {e}")
 
-def load_all_data():
-    """Load all databases from disk"""
+# Writes requested through request_save() are coalesced over this window
+SAVE_DEBOUNCE_SECONDS = 2.0
+
+_save_requested = threading.Event()
+_save_worker_lock = threading.Lock()
+_save_worker = [None]
+
+def _save_worker_loop():
+    while True:
+        _save_requested.wait()
+        time.sleep(SAVE_DEBOUNCE_SECONDS)
+        with data_lock:
+            if not _save_requested.is_set():
+                continue  # already flushed at exit
+            _save_requested.clear()
+            save_all_data()
+
+def request_save():
+    """Schedule a save_all_data() on the background writer.
+
+    Used by high-frequency writes (such as check-ins) so a burst of requests
+    results in one write instead of one per request.
+    """
+    if _save_worker[0] is None:
+        with _save_worker_lock:
+            if _save_worker[0] is None:
+                _save_worker[0] = threading.Thread(target=_save_worker_loop, name='save-worker', daemon=True)
+                _save_worker[0].start()
+    _save_requested.set()
+
+@atexit.register
+def flush_pending_save():
+    """Write a save still waiting out the debounce, so shutdown does not lose it"""
+    with data_lock:
+        if _save_requested.is_set():
+            _save_requested.clear()
+            save_all_data()
+
+# Heavy, rarely read collections. With lazy loading they are read on a
+# background thread after startup and each request waits only for the ones
+# its endpoint needs (ENDPOINT_DATA).
+LAZY_COLLECTIONS = {
+    'orders': ['orders.pkl'],
+    'notifications': ['notifications.pkl', 'vendor_notifications.pkl'],
+    'guests': ['guests.pkl'],
+}
+
+LAZY_INDEX_BUILDERS = {
+    'orders': rebuild_order_indexes,
+    'notifications': rebuild_notification_indexes,
+    'guests': rebuild_guest_indexes,
+}
+
+# Lazy collections read by each endpoint; endpoints not listed wait for all of them
+ENDPOINT_DATA = {
+    'static': (), 'index': (), 'smart_back': (), 'logout': (),
+    'admin_login': (), 'user_login': (), 'vendor_login': (),
+    'user_signup': ('notifications',), 'vendor_signup': ('notifications',),
+    'admin_dashboard': ('orders', 'notifications'),
+    'vendor_dashboard': ('orders', 'notifications'),
+    'user_dashboard': ('orders', 'guests'),
+    'metrics': (), 'admin_profiles': (), 'admin_profile_detail': (), 'admin_profile_download': (),
+    'admin_slow_requests': (), 'admin_collapsed_stacks': (),
+    'all_products': (), 'admin_all_data': ('orders',),
+    'admin_memberships': (), 'admin_pricing': (), 'admin_profile': (),
+    'admin_notifications': ('notifications',),
+    'vendor_products': (), 'vendor_add_item': (), 'vendor_bulk_import': (), 'vendor_bulk_stock': (),
+    'vendor_add_stock': (), 'vendor_delete_product': (), 'vendor_profile': (),
+    'vendor_transactions': ('orders',),
+    'vendor_notifications': ('notifications',),
+    'user_requests_vendor': (), 'vendor_availability_page': (),
+    'user_browse_products': (), 'user_add_to_cart': (), 'user_profile': (),
+    'view_vendors': (), 'available_vendors_api': (),
+    'view_cart': ('orders', 'notifications'),
+    'user_orders': ('orders',),
+    'user_guest_list': ('guests',), 'user_guest_import_status': (), 'user_send_invitations': ('guests',),
+    'guest_checkin': ('guests',), 'user_checkin_stats': ('guests',),
+    'user_vendor_requests': ('notifications',),
+    'user_events_page': ('orders', 'guests'),
+}
+
+# Set once a collection is in memory; only cleared while a lazy load is in progress
+collection_ready = {name: threading.Event() for name in LAZY_COLLECTIONS}
+for _ready in collection_ready.values():
+    _ready.set()
+
+# Files are read on this many threads (decompression and file I/O overlap; unpickling holds the GIL)
+LOAD_WORKERS = int(os.environ.get('TEM_LOAD_WORKERS', '4'))
+
+# Start serving before the lazy collections are in (TEM_LAZY_LOAD=0 loads everything first)
+LAZY_LOADING = os.environ.get('TEM_LAZY_LOAD', '1') == '1'
+
+# (step, seconds) for the most recent load_all_data(); file reads overlap, so they add up to more than the total
+startup_report = []
+
+def wait_for_data(names=LAZY_COLLECTIONS):
+    for name in names:
+        collection_ready[name].wait()
+
+def wait_for_endpoint_data():
+    """Hold a request until the lazy collections its endpoint reads are loaded.
+
+    Registered after the metrics and sampler hooks (see below), so the wait
+    counts towards the request's latency; it is also recorded as the
+    'data_wait' operation.
+    """
+    names = ENDPOINT_DATA.get(request.endpoint, LAZY_COLLECTIONS)
+    if all(collection_ready[name].is_set() for name in names):
+        return
+    started = time.perf_counter()
+    wait_for_data(names)
+    observe_operation('data_wait', time.perf_counter() - started)
+
+def _apply_data_file(filename, payload):
+    """Install a loaded payload as the module global(s) it belongs to"""
     global users_db, regular_users_db, vendors_db, products_db, product_id_counter
     global cart_db, orders_db, order_id_counter
     global notifications_db, notification_id_counter
@@ -137,55 +612,2303 @@ def load_all_data():
     global memberships_db, membership_id_counter
     global user_requests_db, request_id_counter
     global guest_list_db, guest_id_counter
-    
+    global price_rules_db, price_rule_id_counter
+    global events_db, event_id_counter
+    
+    if filename == 'users.pkl':
+        users_db = payload
+    elif filename == 'regular_users.pkl':
+        regular_users_db = payload
+    elif filename == 'vendors.pkl':
+        vendors_db = payload
+    elif filename == 'products.pkl':
+        products_db, product_id_counter[:] = payload
+    elif filename == 'carts.pkl':
+        cart_db = payload
+    elif filename == 'orders.pkl':
+        orders_db, order_id_counter[:] = payload
+    elif filename == 'notifications.pkl':
+        notifications_db, notification_id_counter[:] = payload
+    elif filename == 'vendor_notifications.pkl':
+        vendor_notifications_db, vendor_notification_id_counter[:] = payload
+    elif filename == 'memberships.pkl':
+        memberships_db, membership_id_counter[:] = payload
+    elif filename == 'requests.pkl':
+        user_requests_db, request_id_counter[:] = payload
+    elif filename == 'guests.pkl':
+        guest_list_db, guest_id_counter[:] = payload
+        # The mail queue is not persisted: invitations still queued at the last
+        # save were never sent, so they go back to unsent
+        for guest in guest_list_db:
+            if guest.get('invite_status') == 'queued':
+                del guest['invite_status']
+    elif filename == 'notification_state.pkl':
+        notification_read_watermarks.update(payload)
+    elif filename == 'price_rules.pkl':
+        price_rules_db, price_rule_id_counter[:] = payload
+    elif filename == 'events.pkl':
+        events_db, event_id_counter[:] = payload
+    elif filename == 'availability.pkl':
+        vendor_availability.update(payload)
+
+def _read_timed(filename):
+    started = time.perf_counter()
+    payload = read_data_file(filename)
+    return payload, time.perf_counter() - started
+
+def _timed_step(label, func):
+    started = time.perf_counter()
+    func()
+    startup_report.append((label, time.perf_counter() - started))
+
+def _rebuild_core_indexes():
+    rebuild_product_indexes()
+    rebuild_membership_indexes()
+    compile_price_rules()
+    rebuild_event_indexes()
+    rebuild_request_indexes()
+
+def _load_lazy_collections(started):
+    """Background half of load_all_data(lazy=True).
+
+    Nothing else writes these collections or their indexes until their event
+    is set (their endpoints wait, and save_all_data() skips them), so this
+    runs without data_lock. Files are decoded one at a time: unpickling holds
+    the GIL, and several decodes in a row would stall the requests being served.
+    """
+    def size(name):
+        return sum(os.path.getsize(f'{DATA_DIR}/{filename}') for filename in LAZY_COLLECTIONS[name]
+                   if os.path.exists(f'{DATA_DIR}/{filename}'))
+    
+    order = list(LAZY_COLLECTIONS)
     try:
-        if os.path.exists(f'{DATA_DIR}/users.pkl'):
-            with open(f'{DATA_DIR}/users.pkl', 'rb') as f:
-                users_db = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/regular_users.pkl'):
-            with open(f'{DATA_DIR}/regular_users.pkl', 'rb') as f:
-                regular_users_db = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/vendors.pkl'):
-            with open(f'{DATA_DIR}/vendors.pkl', 'rb') as f:
-                vendors_db = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/products.pkl'):
-            with open(f'{DATA_DIR}/products.pkl', 'rb') as f:
-                products_db, product_id_counter[:] = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/carts.pkl'):
-            with open(f'{DATA_DIR}/carts.pkl', 'rb') as f:
-                cart_db = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/orders.pkl'):
-            with open(f'{DATA_DIR}/orders.pkl', 'rb') as f:
-                orders_db, order_id_counter[:] = pickle.load(f)
-        
-        if os.path.exists(f'{DATA_DIR}/notifications.pkl'):
-            with open(f'{DATA_DIR}/notifications.pkl', 'rb') as f:
-                notifications_db, notification_id_counter[:] = pickle.load(f)
+        # Smallest collections first, so their routes are released soonest
+        order.sort(key=size)
+        for name in order:
+            try:
+                for filename in LAZY_COLLECTIONS[name]:
+                    if os.path.exists(f'{DATA_DIR}/{filename}'):
+                        payload, seconds = _read_timed(filename)
+                        _apply_data_file(filename, payload)
+                        startup_report.append((f'read {filename}', seconds))
+                _timed_step(f'index {name}', LAZY_INDEX_BUILDERS[name])
+            except Exception as e:
+                print(f"⚠️ Error loading {name} (using defaults): {e}")
+            finally:
+                collection_ready[name].set()
+    finally:
+        for ready in collection_ready.values():
+            ready.set()
+    total = time.perf_counter() - started
+    startup_report.append(('all data loaded', total))
+    observe_operation('load_all_data_background', total)
+    print(f"✅ Background data loaded ({', '.join(order)}) after {total:.2f}s")
+
+def load_all_data(lazy=False):
+    """Load all databases from disk.
+
+    Files are read in parallel. With lazy=True the LAZY_COLLECTIONS are left
+    to a background thread and this returns once everything else is ready.
+    """
+    started = time.perf_counter()
+    del startup_report[:]
+    lazy_files = [filename for files in LAZY_COLLECTIONS.values() for filename in files]
+    core_files = [filename for filename in data_file_payloads() if filename not in lazy_files]
+    files = core_files if lazy else core_files + lazy_files
+    deferred = False
+    try:
+        if lazy:
+            for ready in collection_ready.values():
+                ready.clear()
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='data-loader') as pool:
+            futures = {filename: pool.submit(_read_timed, filename)
+                       for filename in files if os.path.exists(f'{DATA_DIR}/{filename}')}
+            for filename, future in futures.items():
+                payload, seconds = future.result()
+                _apply_data_file(filename, payload)
+                startup_report.append((f'read {filename}', seconds))
         
-        if os.path.exists(f'{DATA_DIR}/vendor_notifications.pkl'):
-            with open(f'{DATA_DIR}/vendor_notifications.pkl', 'rb') as f:
-                vendor_notifications_db, vendor_notification_id_counter[:] = pickle.load(f)
+        if lazy:
+            _timed_step('index core data', _rebuild_core_indexes)
+            threading.Thread(target=_load_lazy_collections, args=(started,),
+                             name='lazy-loader', daemon=True).start()
+            deferred = True
+        else:
+            _timed_step('index all data', rebuild_indexes)
         
-        if os.path.exists(f'{DATA_DIR}/memberships.pkl'):
-            with open(f'{DATA_DIR}/memberships.pkl', 'rb') as f:
-                memberships_db, membership_id_counter[:] = pickle.load(f)
+        startup_report.append(('ready to serve', time.perf_counter() - started))
+        observe_operation('load_all_data', time.perf_counter() - started)
+        print("✅ Data loaded successfully!" + (f" ({', '.join(LAZY_COLLECTIONS)} loading in the background)"
+                                               if deferred else ""))
+    except Exception as e:
+        print(f"⚠️ Error loading data (using defaults): {e}")
+    finally:
+        if not deferred:
+            for ready in collection_ready.values():
+                ready.set()
+
+# ============================================================================
+# BULK PRODUCT IMPORT
+# ============================================================================
+
+# Valid products are inserted (and persisted) once per this many rows
+BULK_IMPORT_BATCH_SIZE = 10000
+
+# Only the first errors are shown on the report page
+BULK_IMPORT_MAX_REPORTED_ERRORS = 200
+
+def detect_import_format(filename, requested='auto'):
+    """Pick 'csv' or 'jsonl' from the requested format or the file extension"""
+    if requested in ('csv', 'jsonl'):
+        return requested
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+def iter_import_rows(stream, fmt):
+    """Yield (row_number, record, parse_error) from a CSV or JSON-lines byte stream.
+
+    Rows are decoded one at a time so the upload is never held in memory
+    as a whole.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "Each line must be a JSON object"
+                continue
+            yield line_no, record, None
+    else:
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+
+def validate_product_row(record):
+    """Validate one import row, returning (fields, errors)"""
+    errors = []
+    fields = {}
+
+    for key in ('name', 'description', 'category'):
+        value = record.get(key)
+        value = str(value).strip() if value is not None else ''
+        if not value:
+            errors.append(f"'{key}' is required")
+        fields[key] = value
+
+    if fields['category'] and fields['category'] not in PRODUCT_CATEGORIES:
+        errors.append(f"Unknown category '{fields['category']}'")
+
+    try:
+        fields['price'] = float(record.get('price'))
+        if not math.isfinite(fields['price']):
+            errors.append("'price' must be a finite number")
+        elif fields['price'] < 0:
+            errors.append("'price' must be zero or more")
+    except (TypeError, ValueError):
+        errors.append("'price' must be a number")
+
+    try:
+        fields['stock'] = int(record.get('stock'))
+        if fields['stock'] < 0:
+            errors.append("'stock' must be zero or more")
+    except (TypeError, ValueError):
+        errors.append("'stock' must be a whole number")
+
+    return fields, errors
+
+def insert_product_batch(batch, vendor_username):
+    """Insert validated rows with one index update and one save"""
+    if not batch:
+        return
+    date_added = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with data_lock:
+        first_id = product_id_counter[0]
+        products = [{
+            'id': first_id + offset,
+            'name': fields['name'],
+            'description': fields['description'],
+            'price': fields['price'],
+            'stock': fields['stock'],
+            'category': fields['category'],
+            'added_by': vendor_username,
+            'date_added': date_added
+        } for offset, fields in enumerate(batch)]
+        product_id_counter[0] = first_id + len(products)
+        products_db.extend(products)
+        for product in products:
+            index_product(product)
+        save_all_data()
+
+def import_products(stream, fmt, vendor_username, batch_size=None):
+    """Stream-import products for a vendor and return a per-row report.
+
+    If the file turns out not to be UTF-8 or valid CSV part-way through, the
+    rows before that point are still imported and report['error'] says
+    where it stopped.
+    """
+    batch_size = batch_size or BULK_IMPORT_BATCH_SIZE
+    report = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': [], 'error': None}
+    batch = []
+
+    try:
+        for row_no, record, parse_error in iter_import_rows(stream, fmt):
+            report['rows'] += 1
+            if parse_error:
+                errors = [parse_error]
+            else:
+                fields, errors = validate_product_row(record)
+
+            if errors:
+                report['failed'] += 1
+                if len(report['errors']) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                    report['errors'].append({'row': row_no, 'errors': errors})
+                continue
+
+            batch.append(fields)
+            if len(batch) >= batch_size:
+                insert_product_batch(batch, vendor_username)
+                report['imported'] += len(batch)
+                batch = []
+    except UnicodeDecodeError:
+        report['error'] = f"Stopped after {report['rows']} row(s): the file must be UTF-8 encoded text."
+    except csv.Error as e:
+        report['error'] = f"Stopped after {report['rows']} row(s): could not parse CSV: {e}"
+
+    insert_product_batch(batch, vendor_username)
+    report['imported'] += len(batch)
+    return report
+
+# ============================================================================
+# BULK STOCK ADJUSTMENT
+# ============================================================================
+
+def parse_stock_updates_text(text):
+    """Parse 'product_id,+5' / 'product_id,-3' / 'product_id,=10' lines.
+
+    Returns (updates, errors); a bare number is treated as a delta.
+    """
+    updates = []
+    errors = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        parts = [part.strip() for part in line.split(',')]
+        if len(parts) != 2:
+            errors.append(f"Line {line_no}: expected 'product_id,change'")
+            continue
+        product_id, change = parts
+        try:
+            if change.startswith('='):
+                updates.append({'product_id': int(product_id), 'stock': int(change[1:])})
+            else:
+                updates.append({'product_id': int(product_id), 'delta': int(change)})
+        except ValueError:
+            errors.append(f"Line {line_no}: '{line}' is not a valid update")
+    return updates, errors
+
+def apply_stock_updates(updates, vendor_username):
+    """Apply stock updates all-or-nothing for one vendor.
+
+    Each update is {'product_id', 'delta'} or {'product_id', 'stock'}.
+    Returns (changes, errors); nothing is changed when errors is non-empty.
+    """
+    errors = []
+    with data_lock:
+        new_stock = {}
+        for position, update in enumerate(updates, start=1):
+            try:
+                product_id = int(update['product_id'])
+            except (KeyError, TypeError, ValueError):
+                errors.append(f"Update {position}: missing or invalid product_id")
+                continue
+            product = product_index.get(product_id)
+            if not product or product['added_by'] != vendor_username:
+                errors.append(f"Update {position}: product #{product_id} is not one of your products")
+                continue
+            
+            current = new_stock.get(product_id, product['stock'])
+            try:
+                if 'stock' in update:
+                    value = int(update['stock'])
+                else:
+                    value = current + int(update['delta'])
+            except (KeyError, TypeError, ValueError):
+                errors.append(f"Update {position}: needs a whole-number 'delta' or 'stock'")
+                continue
+            if value < 0:
+                errors.append(f"Update {position}: stock for product #{product_id} would drop to {value}")
+                continue
+            new_stock[product_id] = value
         
-        if os.path.exists(f'{DATA_DIR}/requests.pkl'):
-            with open(f'{DATA_DIR}/requests.pkl', 'rb') as f:
-                user_requests_db, request_id_counter[:] = pickle.load(f)
+        if errors or not new_stock:
+            return [], errors
         
-        if os.path.exists(f'{DATA_DIR}/guests.pkl'):
-            with open(f'{DATA_DIR}/guests.pkl', 'rb') as f:
-                guest_list_db, guest_id_counter[:] = pickle.load(f)
+        changes = []
+        for product_id, value in new_stock.items():
+            product = product_index[product_id]
+            changes.append({
+                'product_id': product_id,
+                'name': product['name'],
+                'old_stock': product['stock'],
+                'new_stock': value
+            })
+            product['stock'] = value
+        save_all_data()
+    
+    return changes, errors
+
+# ============================================================================
+# GUEST LIST IMPORT & DEDUPLICATION
+# ============================================================================
+
+# Imported guests are inserted this many rows at a time, so the lock is
+# released regularly and guest pages stay responsive during an import
+GUEST_IMPORT_CHUNK_SIZE = 1000
+
+# Running and recently finished import jobs: job ID -> progress dict
+guest_import_jobs = {}
+GUEST_IMPORT_JOBS_KEPT = 50
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+def normalize_phone(phone):
+    """Keep digits only, dropping any country prefix beyond 10 digits"""
+    digits = ''.join(ch for ch in (phone or '') if ch.isdigit())
+    return digits[-10:]
+
+def guest_event_key(username, event):
+    return (username, ' '.join((event or '').lower().split()))
+
+def guest_contact_keys(email, phone):
+    """Normalized hash keys under which a guest is deduplicated"""
+    keys = []
+    email = normalize_email(email)
+    phone = normalize_phone(phone)
+    if email:
+        keys.append('email:' + email)
+    if phone:
+        keys.append('phone:' + phone)
+    return keys
+
+def new_guest_token():
+    return secrets.token_urlsafe(9)
+
+def index_guest(guest, indexes=None):
+    """Add a guest to the dedup, token and per-event count indexes (the live
+    ones, or the staged (contacts, tokens, counts) being rebuilt)"""
+    contact_index, token_index, guest_counts = indexes or (guest_contact_index, guest_token_index,
+                                                           event_guest_counts)
+    if not guest.get('token'):
+        guest['token'] = new_guest_token()
+    guest.setdefault('checked_in', None)
+    
+    event_key = guest_event_key(guest['username'], guest['event'])
+    contacts = contact_index.setdefault(event_key, {})
+    for key in guest_contact_keys(guest['guest_email'], guest['guest_phone']):
+        contacts.setdefault(key, guest['id'])
+    
+    token_index[guest['token']] = guest
+    counts = guest_counts.setdefault(event_key, {'event': guest['event'], 'invited': 0, 'checked_in': 0})
+    counts['invited'] += 1
+    if guest['checked_in']:
+        counts['checked_in'] += 1
+
+def unindex_guest(guest):
+    event_key = guest_event_key(guest['username'], guest['event'])
+    contacts = guest_contact_index.get(event_key, {})
+    for key in guest_contact_keys(guest['guest_email'], guest['guest_phone']):
+        if contacts.get(key) == guest['id']:
+            del contacts[key]
+    
+    guest_token_index.pop(guest.get('token'), None)
+    counts = event_guest_counts.get(event_key)
+    if counts:
+        counts['invited'] -= 1
+        if guest.get('checked_in'):
+            counts['checked_in'] -= 1
+
+def user_event_counts(username):
+    """Per-event invited/checked-in counts for one user's guest lists"""
+    return [dict(counts) for (owner, _), counts in event_guest_counts.items()
+            if owner == username and counts['invited'] > 0]
+
+def check_in_guest(token):
+    """Idempotently check in a guest by token.
+
+    Returns (guest, newly_checked_in), or (None, False) for an unknown token.
+    """
+    with data_lock:
+        guest = guest_token_index.get(token)
+        if guest is None:
+            return None, False
+        if guest['checked_in']:
+            return guest, False
+        guest['checked_in'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        event_guest_counts[guest_event_key(guest['username'], guest['event'])]['checked_in'] += 1
+    request_save()
+    return guest, True
+
+def find_duplicate_guest(username, event, email, phone):
+    """Return the ID of a guest on the same list with the same email or phone"""
+    contacts = guest_contact_index.get(guest_event_key(username, event))
+    if not contacts:
+        return None
+    for key in guest_contact_keys(email, phone):
+        if key in contacts:
+            return contacts[key]
+    return None
+
+def validate_guest_row(record, default_event):
+    """Validate one guest import row, returning (fields, errors)"""
+    def pick(*keys):
+        for key in keys:
+            value = record.get(key)
+            if value is not None and str(value).strip():
+                return str(value).strip()
+        return ''
+    
+    fields = {
+        'guest_name': pick('guest_name', 'name'),
+        'guest_email': pick('guest_email', 'email'),
+        'guest_phone': pick('guest_phone', 'phone'),
+        'event': pick('event') or default_event
+    }
+    errors = []
+    if not fields['guest_name']:
+        errors.append("'guest_name' is required")
+    if '@' not in fields['guest_email']:
+        errors.append("'guest_email' must be an email address")
+    if len(normalize_phone(fields['guest_phone'])) != 10:
+        errors.append("'guest_phone' must have 10 digits")
+    if not fields['event']:
+        errors.append("'event' is required (in the file or on the form)")
+    return fields, errors
+
+def insert_guest_chunk(chunk, username, job):
+    """Insert one chunk of validated guests, skipping duplicates"""
+    date_added = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with data_lock:
+        for row_no, fields in chunk:
+            duplicate_of = find_duplicate_guest(username, fields['event'],
+                                                fields['guest_email'], fields['guest_phone'])
+            if duplicate_of is not None:
+                job['duplicates'] += 1
+                if len(job['errors']) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                    job['errors'].append({'row': row_no, 'errors': [f"Duplicate of guest #{duplicate_of}"]})
+                continue
+            if not event_capacity_left(username, fields['event']):
+                job['failed'] += 1
+                if len(job['errors']) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                    job['errors'].append({'row': row_no, 'errors': [f"{fields['event']} is at full capacity"]})
+                continue
+            guest = {
+                'id': guest_id_counter[0],
+                'username': username,
+                'guest_name': fields['guest_name'],
+                'guest_email': fields['guest_email'],
+                'guest_phone': fields['guest_phone'],
+                'event': fields['event'],
+                'date_added': date_added
+            }
+            guest_list_db.append(guest)
+            index_guest(guest)
+            guest_id_counter[0] += 1
+            job['imported'] += 1
+
+def run_guest_import(job, upload_file, fmt, default_event):
+    """Background worker: stream-import guests from a spooled upload"""
+    username = job['username']
+    chunk = []
+    try:
+        for row_no, record, parse_error in iter_import_rows(upload_file, fmt):
+            job['rows'] += 1
+            if parse_error:
+                errors = [parse_error]
+            else:
+                fields, errors = validate_guest_row(record, default_event)
+            if errors:
+                job['failed'] += 1
+                if len(job['errors']) < BULK_IMPORT_MAX_REPORTED_ERRORS:
+                    job['errors'].append({'row': row_no, 'errors': errors})
+                continue
+            
+            chunk.append((row_no, fields))
+            if len(chunk) >= GUEST_IMPORT_CHUNK_SIZE:
+                insert_guest_chunk(chunk, username, job)
+                chunk = []
+                job['bytes_read'] = upload_file.tell()
         
-        print("✅ Data loaded successfully!")
+        insert_guest_chunk(chunk, username, job)
+        job['bytes_read'] = job['total_bytes']
+        save_all_data()
+        job['status'] = 'done'
+    except (UnicodeDecodeError, csv.Error) as e:
+        job['status'] = 'failed'
+        job['message'] = f"Could not read the file: {e}"
+        save_all_data()
     except Exception as e:
-        print(f"⚠️ Error loading data (using defaults): {e}")
+        # Anything else must still end the job, or the status page polls forever
+        print(f"❌ Guest import {job['id']} failed: {e}")
+        job['status'] = 'failed'
+        job['message'] = f"Import stopped after {job['rows']} rows: {e}"
+        save_all_data()
+    finally:
+        upload_file.close()
+        job['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def start_guest_import(upload, fmt, username, default_event):
+    """Spool the upload to disk and import it on a background thread"""
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(upload.stream, spool)
+    total_bytes = spool.tell()
+    spool.seek(0)
+    
+    job = {
+        'id': uuid.uuid4().hex,
+        'username': username,
+        'filename': upload.filename,
+        'status': 'running',
+        'message': '',
+        'rows': 0,
+        'imported': 0,
+        'duplicates': 0,
+        'failed': 0,
+        'errors': [],
+        'bytes_read': 0,
+        'total_bytes': total_bytes,
+        'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'finished': None
+    }
+    
+    finished = [j['id'] for j in guest_import_jobs.values() if j['status'] != 'running']
+    for job_id in finished[:max(0, len(guest_import_jobs) - GUEST_IMPORT_JOBS_KEPT + 1)]:
+        del guest_import_jobs[job_id]
+    guest_import_jobs[job['id']] = job
+    
+    threading.Thread(target=run_guest_import, args=(job, spool, fmt, default_event),
+                     daemon=True).start()
+    return job
+
+# ============================================================================
+# NOTIFICATION PUSH (Server-Sent Events)
+# ============================================================================
+
+SSE_HEARTBEAT_SECONDS = 15   # keep-alive comment interval for idle streams
+SSE_BACKLOG = 100            # recent events kept per channel for reconnects
+
+class NotificationHub:
+    """In-process pub/sub feeding the notification SSE streams.
+
+    Channels are 'admin' and 'vendor:<username>'. Every channel keeps a
+    short backlog so a reconnecting EventSource can resume from its
+    Last-Event-ID. Subscribers just wait on their channel's condition, so
+    the hub itself starts no threads and wakes only the affected channel.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._seq = 0
+    
+    def _channel(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = {'cond': threading.Condition(self._lock), 'events': deque(maxlen=SSE_BACKLOG)}
+            self._channels[name] = channel
+        return channel
+    
+    def publish(self, name, payload):
+        with self._lock:
+            self._seq += 1
+            channel = self._channel(name)
+            channel['events'].append((self._seq, json.dumps(payload)))
+            channel['cond'].notify_all()
+    
+    def subscribe(self, name, last_seq=None):
+        """Yield SSE-formatted chunks for one channel until the client leaves"""
+        with self._lock:
+            channel = self._channel(name)
+            if last_seq is None:
+                last_seq = self._seq
+        yield 'retry: 3000\n\n'
+        while True:
+            with self._lock:
+                pending = [event for event in channel['events'] if event[0] > last_seq]
+                if not pending:
+                    channel['cond'].wait(SSE_HEARTBEAT_SECONDS)
+                    pending = [event for event in channel['events'] if event[0] > last_seq]
+            if not pending:
+                yield ': keep-alive\n\n'
+                continue
+            for seq, data in pending:
+                yield f'id: {seq}\nevent: notification\ndata: {data}\n\n'
+                last_seq = seq
+
+notification_hub = NotificationHub()
+
+def add_admin_notification(notif_type, username, name, email, phone):
+    """Append an admin notification and push it to open admin pages"""
+    with data_lock:
+        notification = {
+            'id': notification_id_counter[0],
+            'type': notif_type,
+            'username': username,
+            'name': name,
+            'email': email,
+            'phone': phone,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'read': False
+        }
+        notifications_db.append(notification)
+        notification_index[notification['id']] = notification
+        notification_unread_counts['admin'] = notification_unread_counts.get('admin', 0) + 1
+        notification_id_counter[0] += 1
+    notification_hub.publish('admin', notification)
+    return notification
+
+def add_vendor_notification(vendor_username, message):
+    """Append a vendor notification and push it to the vendor's open pages"""
+    with data_lock:
+        notification = {
+            'id': vendor_notification_id_counter[0],
+            'vendor_username': vendor_username,
+            'message': message,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'read': False
+        }
+        vendor_notifications_db.append(notification)
+        index_vendor_notification(notification)
+        vendor_notification_id_counter[0] += 1
+    notification_hub.publish('vendor:' + vendor_username, notification)
+    return notification
+
+def sse_response(channel):
+    """Streaming text/event-stream response for one hub channel"""
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_seq = int(last_event_id) if last_event_id.isdigit() else None
+    return Response(notification_hub.subscribe(channel, last_seq),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ============================================================================
+# MEMBERSHIP LIFECYCLE
+# ============================================================================
+
+MEMBERSHIP_DURATION_MONTHS = {'1 Month': 1, '3 Months': 3, '6 Months': 6, '1 Year': 12}
+
+# Lowest to highest
+MEMBERSHIP_TIERS = ['Basic', 'Premium', 'Elite']
+
+def add_months(start, months):
+    """Same day N months later, clamped to the end of shorter months"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+def membership_end_date(start_date, duration):
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    return add_months(start, MEMBERSHIP_DURATION_MONTHS.get(duration, 1)).isoformat()
+
+def index_membership(membership, indexes=None):
+    """Add a membership to the lookup indexes and the expiry heap.
+
+    When building staged (by ID, by user, heap) indexes the heap is left
+    unordered and active memberships are not refreshed; the rebuild does both.
+    """
+    if not membership.get('end_date'):
+        membership['end_date'] = membership_end_date(membership['start_date'], membership['duration'])
+    by_id, by_user, expiry_heap = indexes or (membership_index, memberships_by_user, membership_expiry_heap)
+    by_id[membership['id']] = membership
+    by_user.setdefault(membership['username'], []).append(membership)
+    if membership['status'] == 'Active':
+        if indexes:
+            expiry_heap.append((membership['end_date'], membership['id']))
+        else:
+            heapq.heappush(expiry_heap, (membership['end_date'], membership['id']))
+    if not indexes:
+        refresh_active_membership(membership['username'])
+
+def unindex_membership(membership):
+    membership_index.pop(membership['id'], None)
+    user_memberships = memberships_by_user.get(membership['username'], [])
+    if membership in user_memberships:
+        user_memberships.remove(membership)
+    refresh_active_membership(membership['username'])
+
+def best_active_membership(memberships):
+    """The highest-tier, latest-ending active membership, or None"""
+    best = None
+    for membership in memberships:
+        if membership['status'] != 'Active':
+            continue
+        rank = (MEMBERSHIP_TIERS.index(membership['type']) if membership['type'] in MEMBERSHIP_TIERS else -1,
+                membership['end_date'])
+        if best is None or rank > best[0]:
+            best = (rank, membership)
+    return best[1] if best else None
+
+def refresh_active_membership(username):
+    """Recompute a user's best active membership from their own memberships"""
+    best = best_active_membership(memberships_by_user.get(username, []))
+    if best:
+        active_memberships[username] = best
+    else:
+        active_memberships.pop(username, None)
+
+def expire_memberships(today=None):
+    """Flip memberships whose end date has arrived to Expired.
+
+    Only due heap entries are touched, so this is a single peek when
+    nothing has lapsed. Returns the number of memberships expired.
+    """
+    if not membership_expiry_heap:
+        return 0
+    today = today or date.today().isoformat()
+    if membership_expiry_heap[0][0] > today:
+        return 0
+    
+    expired = 0
+    with data_lock:
+        while membership_expiry_heap and membership_expiry_heap[0][0] <= today:
+            end_date, membership_id = heapq.heappop(membership_expiry_heap)
+            membership = membership_index.get(membership_id)
+            # Skip entries left behind by renewals and deletions
+            if membership is None or membership['status'] != 'Active' or membership['end_date'] != end_date:
+                continue
+            membership['status'] = 'Expired'
+            refresh_active_membership(membership['username'])
+            expired += 1
+    if expired:
+        request_save()
+    return expired
+
+def validate_membership(form):
+    """Validate the admin's add-membership form, returning (fields, errors)"""
+    errors = []
+    fields = {
+        'username': form.get('username') or '',
+        'type': form.get('membership_type') or '',
+        'duration': form.get('duration') or '',
+    }
+    if fields['username'] not in regular_users_db:
+        errors.append(f"There is no user '{fields['username']}'." if fields['username'] else "Choose a user.")
+    if fields['type'] not in MEMBERSHIP_TIERS:
+        errors.append("Choose a membership type.")
+    if fields['duration'] not in MEMBERSHIP_DURATION_MONTHS:
+        errors.append("Choose a duration.")
+    return fields, errors
+
+def renew_membership(membership, duration=None):
+    """Extend a membership from its end date (or today, if it has lapsed)"""
+    with data_lock:
+        duration = duration or membership['duration']
+        today = date.today()
+        end = datetime.strptime(membership['end_date'], '%Y-%m-%d').date()
+        base = end if membership['status'] == 'Active' and end > today else today
+        membership['end_date'] = add_months(base, MEMBERSHIP_DURATION_MONTHS.get(duration, 1)).isoformat()
+        membership['duration'] = duration
+        membership['status'] = 'Active'
+        membership['renewed_on'] = today.isoformat()
+        heapq.heappush(membership_expiry_heap, (membership['end_date'], membership['id']))
+        refresh_active_membership(membership['username'])
+
+def is_member(username):
+    """O(1) check whether a user currently holds an active membership"""
+    expire_memberships()
+    return username in active_memberships
+
+def membership_tier(username):
+    """Tier of the user's best active membership, or None"""
+    expire_memberships()
+    membership = active_memberships.get(username)
+    return membership['type'] if membership else None
+
+# ============================================================================
+# PRICING ENGINE
+# ============================================================================
+
+# Price rules are compiled into a table keyed by (scope, tier); pricing a
+# cart line is then ten dict lookups, however many rules exist.
+#   scope: ('product', id) / ('vendor_category', (vendor, category)) /
+#          ('category', name) / ('vendor', username) / ('all', None)
+#   tier:  membership tier, or None for rules that apply to everyone
+# Each entry is (thresholds, best): sorted min_qty values and, for each, the
+# largest (percent, label) available at that quantity, so one bisect finds
+# the best rule in the entry. Discounts do not stack: the largest wins.
+compiled_price_rules = {}
+
+PRICE_RULE_KINDS = {
+    'tier': 'Membership tier discount',
+    'vendor': 'Vendor promotion',
+    'quantity': 'Quantity break'
+}
+
+def validate_price_rule(form):
+    """Validate the admin's add-rule form, returning (fields, errors).
+
+    The rule type decides what the rule must name: a tier discount needs a
+    tier, a vendor promotion a vendor and a quantity break at least 2 units.
+    """
+    errors = []
+    kind = form.get('kind')
+    if kind not in PRICE_RULE_KINDS:
+        errors.append("Choose a rule type.")
+    fields = {
+        'kind': kind,
+        'tier': form.get('tier') or None,
+        'vendor': form.get('vendor') or None,
+        'category': form.get('category') or None,
+        'product_id': None,
+        'min_qty': 1,
+    }
+    
+    try:
+        fields['percent'] = float(form.get('percent', ''))
+        if not math.isfinite(fields['percent']) or not 0 < fields['percent'] <= 100:
+            errors.append("Discount must be more than 0 and at most 100%.")
+    except ValueError:
+        errors.append("Discount must be a number.")
+    
+    product_id = (form.get('product_id') or '').strip()
+    if product_id:
+        try:
+            fields['product_id'] = int(product_id)
+            if fields['product_id'] not in product_index:
+                errors.append(f"There is no product #{fields['product_id']}.")
+        except ValueError:
+            errors.append("Product ID must be a whole number.")
+    
+    try:
+        fields['min_qty'] = int(form.get('min_qty') or 1)
+        if fields['min_qty'] < 1:
+            errors.append("Minimum quantity must be at least 1.")
+    except ValueError:
+        errors.append("Minimum quantity must be a whole number.")
+    
+    if fields['tier'] and fields['tier'] not in MEMBERSHIP_TIERS:
+        errors.append(f"Unknown membership tier '{fields['tier']}'.")
+    if fields['vendor'] and fields['vendor'] not in vendors_db:
+        errors.append(f"Unknown vendor '{fields['vendor']}'.")
+    if fields['category'] and fields['category'] not in PRODUCT_CATEGORIES:
+        errors.append(f"Unknown category '{fields['category']}'.")
+    
+    if kind == 'tier' and not fields['tier']:
+        errors.append("A membership tier discount needs a tier.")
+    elif kind == 'vendor' and not fields['vendor']:
+        errors.append("A vendor promotion needs a vendor.")
+    elif kind == 'quantity' and fields['min_qty'] < 2:
+        errors.append("A quantity break needs a minimum quantity of at least 2.")
+    return fields, errors
+
+def price_rule_scope(rule):
+    if rule.get('product_id'):
+        return ('product', rule['product_id'])
+    if rule.get('vendor') and rule.get('category'):
+        return ('vendor_category', (rule['vendor'], rule['category']))
+    if rule.get('category'):
+        return ('category', rule['category'])
+    if rule.get('vendor'):
+        return ('vendor', rule['vendor'])
+    return ('all', None)
+
+def price_rule_label(rule):
+    parts = [f"{rule['percent']:g}% off"]
+    if rule.get('tier'):
+        parts.append(f"{rule['tier']} members")
+    if rule.get('vendor'):
+        parts.append(f"from {rule['vendor']}")
+    if rule.get('category'):
+        parts.append(rule['category'])
+    if rule.get('product_id'):
+        parts.append(f"product #{rule['product_id']}")
+    if rule.get('min_qty', 1) > 1:
+        parts.append(f"{rule['min_qty']}+ units")
+    return ', '.join(parts)
+
+def compile_price_rules():
+    """Rebuild the pricing lookup table from price_rules_db"""
+    grouped = {}
+    for rule in price_rules_db:
+        key = (price_rule_scope(rule), rule.get('tier') or None)
+        grouped.setdefault(key, []).append((rule.get('min_qty', 1), rule['percent'], price_rule_label(rule)))
+    
+    table = {}
+    for key, entries in grouped.items():
+        entries.sort(key=lambda entry: entry[0])
+        thresholds, best = [], []
+        running = (0, None)
+        for min_qty, percent, label in entries:
+            if percent > running[0]:
+                running = (percent, label)
+            if thresholds and thresholds[-1] == min_qty:
+                best[-1] = running
+            else:
+                thresholds.append(min_qty)
+                best.append(running)
+        table[key] = (thresholds, best)
+    
+    global compiled_price_rules
+    compiled_price_rules = table
+
+def best_discount(product, qty, tier):
+    """Largest (percent, label) discount for a cart line, or (0, None)"""
+    table = compiled_price_rules
+    if not table:
+        return 0, None
+    vendor = product['added_by']
+    category = product['category']
+    best = (0, None)
+    for scope in (('product', product['id']), ('vendor_category', (vendor, category)),
+                  ('category', category), ('vendor', vendor), ('all', None)):
+        for rule_tier in (tier, None) if tier else (None,):
+            entry = table.get((scope, rule_tier))
+            if entry is None:
+                continue
+            position = bisect.bisect_right(entry[0], qty)
+            if position and entry[1][position - 1][0] > best[0]:
+                best = entry[1][position - 1]
+    return best
+
+def price_cart(username, cart):
+    """Price a cart ({product_id: qty}) for a user.
+
+    Returns (lines, subtotal, total); each line holds the product, quantity,
+    unit price after discount, line total and the applied discount label.
+    """
+    tier = membership_tier(username)
+    lines = []
+    subtotal = 0
+    total = 0
+    for product_id, qty in cart.items():
+        product = product_index.get(product_id)
+        if product is None:
+            continue
+        percent, label = best_discount(product, qty, tier)
+        unit_price = round(product['price'] * (100 - percent) / 100, 2)
+        lines.append({
+            'product': product,
+            'quantity': qty,
+            'unit_price': unit_price,
+            'discount': label,
+            'total': round(unit_price * qty, 2)
+        })
+        subtotal += product['price'] * qty
+        total += unit_price * qty
+    return lines, round(subtotal, 2), round(total, 2)
+
+# ============================================================================
+# ORDER FULFILLMENT WORKFLOW
+# ============================================================================
+
+# Each vendor in an order moves its own part of the order through these
+# states; the order's overall status is the least advanced active part.
+ORDER_FLOW = ['Confirmed', 'Packed', 'Shipped', 'Delivered']
+ORDER_TRANSITIONS = {
+    'Confirmed': ('Packed', 'Cancelled'),
+    'Packed': ('Shipped', 'Cancelled'),
+    'Shipped': ('Delivered',),
+    'Delivered': (),
+    'Cancelled': ()
+}
+
+def order_vendors(items):
+    """Vendors whose products appear in a list of (product_id, qty) items"""
+    vendors = []
+    for product_id, qty in items:
+        product = product_index.get(product_id)
+        if product and product['added_by'] not in vendors:
+            vendors.append(product['added_by'])
+    return vendors
+
+def aggregate_order_status(fulfillment):
+    active = [status for status in fulfillment.values() if status != 'Cancelled']
+    if not active:
+        return 'Cancelled' if fulfillment else 'Confirmed'
+    return min(active, key=ORDER_FLOW.index)
+
+def index_order(order, indexes=None):
+    """Add an order to the order, per-vendor and per-status indexes"""
+    by_id, by_vendor, by_status, by_event = indexes or (order_index, vendor_order_ids, fulfillment_index,
+                                                        event_order_ids)
+    if 'fulfillment' not in order:
+        # Orders from before per-vendor fulfillment start in the order's status
+        order['fulfillment'] = {vendor: order['status'] for vendor in order_vendors(order['items'])}
+    by_id[order['id']] = order
+    if order.get('event_id'):
+        by_event.setdefault(order['event_id'], []).append(order['id'])
+    for vendor, status in order['fulfillment'].items():
+        by_vendor.setdefault(vendor, []).append(order['id'])
+        by_status.setdefault((vendor, status), {})[order['id']] = None
+
+def set_fulfillment_status(order, vendor, status):
+    """Move one vendor's part of an order to a new status.
+
+    Cancelling returns that vendor's items to stock in the same locked step.
+    Returns False if the transition is not allowed.
+    """
+    with data_lock:
+        current = order['fulfillment'].get(vendor)
+        if status not in ORDER_TRANSITIONS.get(current, ()):
+            return False
+        if status == 'Cancelled':
+            for product_id, qty in order['items']:
+                product = product_index.get(product_id)
+                if product and product['added_by'] == vendor:
+                    product['stock'] += qty
+        fulfillment_index[(vendor, current)].pop(order['id'], None)
+        fulfillment_index.setdefault((vendor, status), {})[order['id']] = None
+        order['fulfillment'][vendor] = status
+        order['status'] = aggregate_order_status(order['fulfillment'])
+    return True
+
+def bulk_set_fulfillment_status(vendor, order_ids, status):
+    """Apply one status to many of a vendor's orders; returns (updated, skipped)"""
+    updated, skipped = [], []
+    with data_lock:
+        for order_id in order_ids:
+            order = order_index.get(order_id)
+            if order and set_fulfillment_status(order, vendor, status):
+                updated.append(order_id)
+            else:
+                skipped.append(order_id)
+        if updated:
+            save_all_data()
+    return updated, skipped
+
+# ============================================================================
+# EVENTS & VENUE BOOKING
+# ============================================================================
+
+# Event times are stored as 'YYYY-MM-DD HH:MM' strings, which sort in time
+# order, and bookings are half-open: one event may end when the next starts.
+EVENT_TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+class _IntervalNode:
+    __slots__ = ('key', 'end', 'max_end', 'priority', 'left', 'right')
+
+    def __init__(self, start, end, event_id):
+        self.key = (start, event_id)
+        self.end = end
+        self.max_end = end
+        self.priority = secrets.randbits(32)
+        self.left = None
+        self.right = None
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+class IntervalTree:
+    """Treap of (start, end) intervals ordered by start, each node also
+    tracking the latest end in its subtree, so an overlap query only visits
+    O(log n + k) nodes.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def _split(self, node, key):
+        """Split into (keys < key, keys >= key)"""
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self._split(node.right, key)
+            node.update()
+            return node, right
+        left, node.left = self._split(node.left, key)
+        node.update()
+        return left, node
+
+    def _merge(self, left, right):
+        if left is None or right is None:
+            return left or right
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+    def insert(self, start, end, event_id):
+        node = _IntervalNode(start, end, event_id)
+        left, right = self._split(self.root, node.key)
+        self.root = self._merge(self._merge(left, node), right)
+        self.size += 1
+
+    def remove(self, start, event_id):
+        left, rest = self._split(self.root, (start, event_id))
+        node, right = self._split(rest, (start, event_id + 1))
+        if node is not None:
+            self.size -= 1
+        self.root = self._merge(left, right)
+
+    def overlapping(self, start, end):
+        """IDs of intervals overlapping [start, end), in start order"""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= start:
+                continue
+            if node.key[0] < end:
+                stack.append(node.right)
+                if node.end > start:
+                    found.append(node.key)
+            stack.append(node.left)
+        return [event_id for _, event_id in sorted(found)]
+
+def normalize_venue(venue):
+    return ' '.join((venue or '').lower().split())
+
+def parse_event_time(value):
+    """Accept 'YYYY-MM-DD HH:MM' or a datetime-local 'YYYY-MM-DDTHH:MM'"""
+    try:
+        return datetime.strptime((value or '').strip().replace('T', ' ')[:16],
+                                 EVENT_TIME_FORMAT).strftime(EVENT_TIME_FORMAT)
+    except ValueError:
+        return None
+
+def index_event(event, indexes=None):
+    """Add an event to the ID, per-name and per-user indexes (IDs only grow,
+    so appending keeps each user's list sorted)"""
+    by_id, by_key, by_user, schedules = indexes or (event_index, events_by_key, user_event_ids, venue_schedules)
+    by_id[event['id']] = event
+    by_key[guest_event_key(event['username'], event['name'])] = event
+    by_user.setdefault(event['username'], []).append(event['id'])
+    if event['status'] == 'Scheduled':
+        schedules.setdefault(normalize_venue(event['venue']), IntervalTree()).insert(
+            event['start'], event['end'], event['id'])
+
+def venue_conflicts(venue, start, end):
+    """Scheduled events at a venue that overlap [start, end)"""
+    schedule = venue_schedules.get(normalize_venue(venue))
+    if schedule is None:
+        return []
+    return [event_index[event_id] for event_id in schedule.overlapping(start, end)]
+
+def book_event(username, name, venue, start, end, capacity):
+    """Create an event if its venue is free.
+
+    Returns (event, errors); on a double booking the errors name the
+    conflicting events.
+    """
+    errors = []
+    name = (name or '').strip()
+    venue = (venue or '').strip()
+    start = parse_event_time(start)
+    end = parse_event_time(end)
+    if not name:
+        errors.append("Event name is required.")
+    if not venue:
+        errors.append("Venue is required.")
+    if not start or not end:
+        errors.append("Start and end must be valid dates and times.")
+    elif end <= start:
+        errors.append("The event must end after it starts.")
+    try:
+        capacity = int(capacity)
+        if capacity < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append("Capacity must be a whole number of at least 1.")
+    if errors:
+        return None, errors
+
+    with data_lock:
+        existing = events_by_key.get(guest_event_key(username, name))
+        if existing and existing['status'] == 'Scheduled':
+            return None, [f"You already have an event called '{name}'."]
+        conflicts = venue_conflicts(venue, start, end)
+        if conflicts:
+            return None, [f"{venue} is already booked for '{other['name']}' from {other['start']} to {other['end']}."
+                          for other in conflicts]
+        event = {
+            'id': event_id_counter[0],
+            'username': username,
+            'name': name,
+            'venue': venue,
+            'start': start,
+            'end': end,
+            'capacity': capacity,
+            'status': 'Scheduled',
+            'date_created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        events_db.append(event)
+        index_event(event)
+        event_id_counter[0] += 1
+    return event, []
+
+def cancel_event(event):
+    """Cancel an event and release its venue slot"""
+    with data_lock:
+        if event['status'] == 'Scheduled':
+            venue_schedules[normalize_venue(event['venue'])].remove(event['start'], event['id'])
+            event['status'] = 'Cancelled'
+
+def event_capacity_left(username, event_name, extra=1):
+    """False if adding `extra` guests would overflow the matching event"""
+    event = events_by_key.get(guest_event_key(username, event_name))
+    if event is None or event['status'] == 'Cancelled':
+        return True
+    counts = event_guest_counts.get(guest_event_key(username, event_name), {'invited': 0})
+    return counts['invited'] + extra <= event['capacity']
+
+def user_events(username, scheduled_only=False):
+    """A user's events, newest booking of each name only (a name can be booked
+    again once its event is cancelled)"""
+    events = [event_index[event_id] for event_id in user_event_ids.get(username, [])]
+    return [event for event in events
+            if events_by_key.get(guest_event_key(username, event['name'])) is event
+            and (event['status'] == 'Scheduled' or not scheduled_only)]
+
+# ============================================================================
+# VENDOR AVAILABILITY
+# ============================================================================
+
+# A vendor's availability is one Python int: bit i is set when the vendor is
+# free on AVAILABILITY_EPOCH + i days. Ten years of dates fit in ~460 bytes,
+# and "free on every day of a range" is a single mask test.
+AVAILABILITY_EPOCH = date(2024, 1, 1)
+AVAILABILITY_MAX_DAYS = 366 * 10
+
+def day_offset(day):
+    offset = (day - AVAILABILITY_EPOCH).days
+    if not 0 <= offset < AVAILABILITY_MAX_DAYS:
+        raise ValueError(f"Dates must be between {AVAILABILITY_EPOCH} and "
+                         f"{AVAILABILITY_EPOCH + timedelta(days=AVAILABILITY_MAX_DAYS - 1)}")
+    return offset
+
+def day_range_mask(start, end, weekdays=None):
+    """Bitmap of the days from start to end inclusive, optionally only the
+    given weekdays (0 = Monday)"""
+    first, last = day_offset(start), day_offset(end)
+    if last < first:
+        return 0
+    mask = ((1 << (last - first + 1)) - 1) << first
+    if weekdays is not None and set(weekdays) != set(range(7)):
+        # Repeat one week's pattern across the range by doubling
+        week = sum(1 << i for i in range(7) if (start.weekday() + i) % 7 in weekdays)
+        pattern, width = week, 7
+        while width < last - first + 1:
+            pattern |= pattern << width
+            width *= 2
+        mask &= pattern << first
+    return mask
+
+def set_vendor_availability(vendor, start, end, available, weekdays=None):
+    mask = day_range_mask(start, end, weekdays)
+    with data_lock:
+        if available:
+            vendor_availability[vendor] = vendor_availability.get(vendor, 0) | mask
+        else:
+            vendor_availability[vendor] = vendor_availability.get(vendor, 0) & ~mask
+
+def vendor_available_days(vendor, start, end):
+    """Dates from start to end inclusive on which the vendor is free"""
+    first = day_offset(start)
+    bits = vendor_availability.get(vendor, 0) >> first
+    return [start + timedelta(days=i) for i in range((end - start).days + 1) if bits >> i & 1]
+
+def available_vendors(start, end=None, category=None):
+    """Vendors free on every day from start to end (inclusive), optionally
+    limited to vendors selling in a category"""
+    end = end or start
+    if end < start:
+        raise ValueError('end date is before start date')
+    need = day_range_mask(start, end)
+    candidates = category_vendors.get(category, {}) if category else vendors_db
+    return [vendor for vendor in candidates
+            if vendor_availability.get(vendor, 0) & need == need]
+
+# ============================================================================
+# USER REQUESTS TO VENDORS
+# ============================================================================
+
+REQUEST_PAGE_SIZE = 20
+
+# Allowed status changes: open -> quoted / closed, quoted -> closed
+REQUEST_TRANSITIONS = {'open': ('quoted', 'closed'), 'quoted': ('closed',), 'closed': ()}
+
+def index_user_request(user_request, indexes=None):
+    """Add a request to the ID, per-vendor, per-status and per-user indexes.
+
+    IDs only grow, so appending keeps every list sorted.
+    """
+    by_id, by_vendor, by_status, by_user = indexes or (request_index, vendor_request_ids,
+                                                       vendor_request_status_ids, user_request_ids)
+    user_request.setdefault('status', 'open')
+    vendor = user_request.get('vendor_username')
+    by_id[user_request['id']] = user_request
+    by_vendor.setdefault(vendor, []).append(user_request['id'])
+    by_status.setdefault((vendor, user_request['status']), []).append(user_request['id'])
+    by_user.setdefault(user_request['username'], []).append(user_request['id'])
+
+def set_request_status(user_request, status, **changes):
+    """Move a request to a new status if the transition is allowed"""
+    with data_lock:
+        if status not in REQUEST_TRANSITIONS.get(user_request['status'], ()):
+            return False
+        vendor = user_request['vendor_username']
+        old_ids = vendor_request_status_ids[(vendor, user_request['status'])]
+        del old_ids[bisect.bisect_left(old_ids, user_request['id'])]
+        bisect.insort(vendor_request_status_ids.setdefault((vendor, status), []), user_request['id'])
+        user_request['status'] = status
+        user_request['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        user_request.update(changes)
+    return True
+
+def request_page(ids, before=None, page_size=REQUEST_PAGE_SIZE):
+    """Keyset page of requests, newest first, with IDs below `before`.
+
+    Returns (requests, next_cursor); next_cursor is None on the last page.
+    """
+    end = bisect.bisect_left(ids, before) if before else len(ids)
+    start = max(0, end - page_size)
+    page = [request_index[request_id] for request_id in reversed(ids[start:end])]
+    return page, (ids[start] if start > 0 else None)
+
+# ============================================================================
+# NOTIFICATION READ STATE & RETENTION
+# ============================================================================
+
+# Read notifications older than this are moved to compressed archive segments
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '30'))
+
+def is_notification_read(notif, channel):
+    return notif['read'] or notif['id'] <= notification_read_watermarks.get(channel, 0)
+
+def mark_notification_read(notif, channel):
+    """Mark one notification read, keeping the unread count in step"""
+    with data_lock:
+        if not is_notification_read(notif, channel):
+            notification_unread_counts[channel] -= 1
+        notif['read'] = True
+
+def mark_all_notifications_read(channel):
+    """O(1) mark-all-read: move the channel's watermark to the newest ID"""
+    counter = notification_id_counter if channel == 'admin' else vendor_notification_id_counter
+    with data_lock:
+        notification_read_watermarks[channel] = counter[0] - 1
+        notification_unread_counts[channel] = 0
+
+def archive_notifications(retention_days=None):
+    """Move read notifications older than the retention period to gzip segments.
+
+    Each run writes at most one segment per collection under DATA_DIR/archive.
+    Returns the number of notifications archived from each collection.
+    """
+    if retention_days is None:
+        retention_days = NOTIFICATION_RETENTION_DAYS
+    cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    archive_dir = f'{DATA_DIR}/archive'
+    archived = {}
+    
+    with data_lock:
+        for name, collection, channel_of in (
+                ('notifications', notifications_db, lambda n: 'admin'),
+                ('vendor_notifications', vendor_notifications_db, lambda n: 'vendor:' + n['vendor_username'])):
+            old = [n for n in collection if n['date'] < cutoff and is_notification_read(n, channel_of(n))]
+            archived[name] = len(old)
+            if not old:
+                continue
+            os.makedirs(archive_dir, exist_ok=True)
+            with gzip.open(f'{archive_dir}/{name}-{stamp}.pkl.gz', 'wb') as f:
+                pickle.dump(old, f, protocol=pickle.HIGHEST_PROTOCOL)
+            old_ids = {n['id'] for n in old}
+            collection[:] = [n for n in collection if n['id'] not in old_ids]
+        
+        if any(archived.values()):
+            rebuild_notification_indexes()
+            save_all_data()
+    return archived
+
+# ============================================================================
+# ORDER EVENTS (vendor fan-out)
+# ============================================================================
+
+# Checkout publishes one event per order; a background consumer splits it
+# into one vendor notification per vendor, off the request thread
+order_event_queue = queue.Queue()
+_order_consumer_lock = threading.Lock()
+_order_consumer = [None]
+
+def publish_order_event(order, lines):
+    """Queue an order for vendor notification; lines are (product_id, qty, unit_price)"""
+    if _order_consumer[0] is None:
+        with _order_consumer_lock:
+            if _order_consumer[0] is None:
+                _order_consumer[0] = threading.Thread(target=_order_consumer_loop,
+                                                      name='order-events', daemon=True)
+                _order_consumer[0].start()
+    order_event_queue.put({'order_id': order['id'], 'username': order['username'], 'lines': lines})
+
+def notify_vendors_of_order(event):
+    """Append one notification per vendor with that vendor's lines of the order"""
+    by_vendor = {}
+    for product_id, qty, unit_price in event['lines']:
+        product = product_index.get(product_id)
+        if product is None:
+            continue
+        by_vendor.setdefault(product['added_by'], []).append((product['name'], qty, unit_price * qty))
+    
+    for vendor_username, lines in by_vendor.items():
+        items = ', '.join(f"{qty} × {name}" for name, qty, _ in lines)
+        amount = sum(line_total for _, _, line_total in lines)
+        add_vendor_notification(vendor_username,
+                                f"New order #{event['order_id']} from {event['username']}: {items} (₹{amount})")
+    return len(by_vendor)
+
+def _order_consumer_loop():
+    while True:
+        event = order_event_queue.get()
+        try:
+            if notify_vendors_of_order(event):
+                request_save()
+        except Exception as e:
+            print(f"❌ Error notifying vendors of order #{event['order_id']}: {e}")
+
+# ============================================================================
+# INVITATION MAIL DISPATCHER
+# ============================================================================
+
+# SMTP settings; the defaults match a local stand-in such as
+#   python -m aiosmtpd -n -l localhost:1025
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '1025'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '') == '1'
+MAIL_FROM = os.environ.get('MAIL_FROM', 'invitations@techevents.local')
+
+MAIL_WORKERS = 4              # background sender threads, one SMTP connection each
+MAIL_BATCH_SIZE = 50          # messages sent per connection check
+MAIL_MAX_ATTEMPTS = 5         # attempts before a message is marked failed
+MAIL_RETRY_BASE_SECONDS = 2.0 # backoff doubles after every failed attempt
+MAIL_IDLE_SECONDS = 30        # idle connections are closed after this long
+
+class InvitationDispatcher:
+    """Queues invitation emails and sends them from a pool of worker threads.
+
+    Each worker keeps its own SMTP connection open across batches, and
+    failed messages are retried with exponential backoff. enqueue() only
+    puts jobs on a queue, so callers (request threads) never wait on SMTP.
+    """
+    
+    def __init__(self, host=None, port=None, workers=MAIL_WORKERS, batch_size=MAIL_BATCH_SIZE,
+                 max_attempts=MAIL_MAX_ATTEMPTS, retry_base=MAIL_RETRY_BASE_SECONDS):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'connections': 0}
+        self._queue = queue.Queue()
+        self._retry_heap = []
+        self._in_queue = set()  # IDs of guests with a job on the queue or the retry heap
+        self._retry_cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+    
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'mail-worker-{n}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._retry_loop, name='mail-retry', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def enqueue(self, guests):
+        """Queue one invitation per guest; returns the number queued"""
+        self.start()
+        for guest in guests:
+            guest['invite_status'] = 'queued'
+            with self._stats_lock:
+                self._in_queue.add(guest['id'])
+            self._queue.put({'guest': guest, 'message': None, 'attempts': 0})
+        self._count('queued', len(guests))
+        return len(guests)
+    
+    def pending(self):
+        return self._queue.qsize() + len(self._retry_heap)
+    
+    def is_queued(self, guest):
+        """True while an invitation for this guest is waiting to be sent or retried"""
+        with self._stats_lock:
+            return guest['id'] in self._in_queue
+    
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=10)
+        if SMTP_STARTTLS:
+            conn.starttls()
+        if SMTP_USERNAME:
+            conn.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self._count('connections')
+        return conn
+    
+    def _worker_loop(self):
+        conn = None
+        while True:
+            try:
+                job = self._queue.get(timeout=MAIL_IDLE_SECONDS)
+            except queue.Empty:
+                if conn is not None:
+                    _close_smtp(conn)
+                    conn = None
+                continue
+            
+            batch = [job]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if conn is None or conn.noop()[0] != 250:
+                    _close_smtp(conn)
+                    conn = self._connect()
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"❌ SMTP connection failed: {e}")
+                conn = None
+                for job in batch:
+                    self._schedule_retry(job)
+                continue
+            
+            for position, job in enumerate(batch):
+                try:
+                    if job['message'] is None:
+                        job['message'] = build_invitation(job['guest'])
+                    conn.send_message(job['message'])
+                except (ValueError, TypeError) as e:
+                    # Unbuildable message (e.g. CR/LF in a header): no point retrying
+                    print(f"❌ Invitation for guest #{job['guest'].get('id')} rejected: {e}")
+                    self._finish(job, 'failed')
+                except smtplib.SMTPResponseException as e:
+                    # Refused by the server for this message only; the connection is still usable
+                    if 400 <= e.smtp_code < 500:
+                        self._schedule_retry(job)
+                    else:
+                        self._finish(job, 'failed')
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError):
+                    self._finish(job, 'failed')
+                except OSError as e:
+                    # Connection dropped (SMTPServerDisconnected, socket errors; SMTPException
+                    # is itself an OSError, hence the order): retry this and the rest later
+                    print(f"⚠️ SMTP connection lost, retrying: {e}")
+                    _close_smtp(conn)
+                    conn = None
+                    for failed_job in batch[position:]:
+                        self._schedule_retry(failed_job)
+                    break
+                else:
+                    self._finish(job, 'sent')
+    
+    def _schedule_retry(self, job):
+        job['attempts'] += 1
+        if job['attempts'] >= self.max_attempts:
+            self._finish(job, 'failed')
+            return
+        self._count('retried')
+        due = time.monotonic() + self.retry_base * 2 ** (job['attempts'] - 1)
+        with self._retry_cond:
+            heapq.heappush(self._retry_heap, (due, id(job), job))
+            self._retry_cond.notify()
+    
+    def _retry_loop(self):
+        with self._retry_cond:
+            while True:
+                if not self._retry_heap:
+                    self._retry_cond.wait()
+                    continue
+                delay = self._retry_heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._retry_cond.wait(delay)
+                    continue
+                self._queue.put(heapq.heappop(self._retry_heap)[2])
+    
+    def _finish(self, job, status):
+        self._count(status)
+        guest = job['guest']
+        with self._stats_lock:
+            self._in_queue.discard(guest['id'])
+        guest['invite_status'] = status
+        if status == 'sent':
+            guest['invited_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        request_save()
+    
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+def _close_smtp(conn):
+    if conn is None:
+        return
+    try:
+        conn.quit()
+    except (smtplib.SMTPException, OSError):
+        conn.close()
+
+def build_invitation(guest):
+    """Build the invitation email for one guest"""
+    host_name = regular_users_db.get(guest['username'], {}).get('name', guest['username'])
+    message = EmailMessage()
+    message['From'] = MAIL_FROM
+    message['To'] = guest['guest_email']
+    message['Subject'] = f"You're invited: {guest['event']}"
+    message.set_content(
+        f"Dear {guest['guest_name']},\n\n"
+        f"{host_name} has invited you to {guest['event']}.\n\n"
+        f"Please show this check-in code at the entrance: {guest['token']}\n\n"
+        f"See you there!\n"
+    )
+    return message
+
+invitation_dispatcher = InvitationDispatcher()
+
+# ============================================================================
+# IDEMPOTENCY KEYS
+# ============================================================================
+
+# Outcomes of keyed POSTs are kept this long, for at most this many keys
+IDEMPOTENCY_TTL_SECONDS = 600
+IDEMPOTENCY_MAX_KEYS = 10000
+
+# (client, endpoint, key) -> (expires_at, status, headers, body), oldest first
+idempotency_cache = OrderedDict()
+
+# (client, endpoint, key) -> Event set when the first request finishes
+idempotency_in_flight = {}
+idempotency_lock = threading.Lock()
+
+def _expire_idempotency_keys(now):
+    """Drop expired and overflowing entries; caller holds idempotency_lock"""
+    while idempotency_cache:
+        cache_key, entry = next(iter(idempotency_cache.items()))
+        if entry[0] > now and len(idempotency_cache) <= IDEMPOTENCY_MAX_KEYS:
+            break
+        del idempotency_cache[cache_key]
+
+def _replay(entry):
+    expires_at, status, headers, body = entry
+    response = Response(body, status=status, headers=headers)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """Run a POST view at most once per idempotency key.
+
+    The key comes from the Idempotency-Key header or the hidden form field
+    added by idempotency_field(). Repeats of a finished request get the
+    stored response; a repeat that arrives while the first one is still
+    running waits for it. Requests without a key run as before.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+        if request.method != 'POST' or not key:
+            return view(*args, **kwargs)
+
+        cache_key = (session.get('username') or request.remote_addr, request.endpoint, key[:128])
+        while True:
+            with idempotency_lock:
+                _expire_idempotency_keys(time.time())
+                entry = idempotency_cache.get(cache_key)
+                if entry:
+                    return _replay(entry)
+                done = idempotency_in_flight.get(cache_key)
+                if done is None:
+                    done = idempotency_in_flight[cache_key] = threading.Event()
+                    break
+            done.wait()
+
+        entry = None
+        try:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code < 500 and not response.is_streamed:
+                entry = (time.time() + IDEMPOTENCY_TTL_SECONDS, response.status_code,
+                         list(response.headers.items()), response.get_data())
+            return response
+        finally:
+            with idempotency_lock:
+                if entry:
+                    idempotency_cache[cache_key] = entry
+                    _expire_idempotency_keys(time.time())
+                del idempotency_in_flight[cache_key]
+            done.set()
+
+    return wrapper
+
+@app.context_processor
+def inject_idempotency_field():
+    """Forms guarded by @idempotent render {{ idempotency_field() }}"""
+    # One random prefix per page plus a counter keeps every form's key unique
+    # without calling the CSPRNG for each of hundreds of forms
+    prefix = secrets.token_urlsafe(12)
+    form_numbers = itertools.count(1)
+    def idempotency_field():
+        return Markup('<input type="hidden" name="idempotency_key" value="%s-%d">' % (prefix, next(form_numbers)))
+    return dict(idempotency_field=idempotency_field)
+
+# ============================================================================
+# REQUEST METRICS (Prometheus text format at /metrics)
+# ============================================================================
+
+# Histogram bucket upper bounds in seconds (the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Scrapers can send "Authorization: Bearer <token>" instead of an admin session
+METRICS_TOKEN = os.environ.get('TEM_METRICS_TOKEN', '')
+
+# Endpoint -> [per-bucket counts (last is +Inf), sum, count]; (endpoint,
+# status) -> count; endpoint -> requests currently being handled
+request_latency = {}
+request_status_counts = {}
+requests_in_flight = {}
+
+# Operation name -> [per-bucket counts, sum, count, last duration]
+operation_latency = {}
+
+metrics_lock = threading.Lock()
+
+def _observe(histograms, name, seconds):
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0, 0.0]
+    histogram[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    histogram[1] += seconds
+    histogram[2] += 1
+    histogram[3] = seconds
+
+def observe_operation(name, seconds):
+    """Record the duration of a non-request operation such as a save"""
+    with metrics_lock:
+        _observe(operation_latency, name, seconds)
+    timing = active_requests.get(threading.get_ident())
+    if timing is not None:
+        timing['persist'] += seconds
+
+# Each hook looks up the request proxy once; the timings live on the request
+@app.before_request
+def _start_request_timer():
+    current = request._get_current_object()
+    current.metrics_endpoint = current.endpoint or 'unmatched'
+    current.metrics_start = time.perf_counter()
+    with metrics_lock:
+        requests_in_flight[current.metrics_endpoint] = requests_in_flight.get(current.metrics_endpoint, 0) + 1
+
+@app.after_request
+def _record_request_metrics(response):
+    current = request._get_current_object()
+    started = getattr(current, 'metrics_start', None)
+    if started is None:
+        return response
+    _record_request(current, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    # Always runs, unlike after_request, which is skipped when an exception propagates (debug mode)
+    current = request._get_current_object()
+    started = getattr(current, 'metrics_start', None)
+    if started is None:
+        return
+    if not getattr(current, 'metrics_recorded', False):
+        _record_request(current, 500, time.perf_counter() - started)
+    with metrics_lock:
+        requests_in_flight[current.metrics_endpoint] -= 1
+
+def _record_request(current, status, elapsed):
+    current.metrics_recorded = True
+    status_key = (current.metrics_endpoint, status)
+    with metrics_lock:
+        request_status_counts[status_key] = request_status_counts.get(status_key, 0) + 1
+        _observe(request_latency, current.metrics_endpoint, elapsed)
+
+def _histogram_lines(metric, label, histograms):
+    lines = []
+    for name, (buckets, total, count, _) in sorted(histograms.items(), key=lambda item: str(item[0])):
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {total:.6f}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {count}')
+    return lines
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    with metrics_lock:
+        lines = ['# HELP tem_http_request_duration_seconds Request handling time by endpoint.',
+                 '# TYPE tem_http_request_duration_seconds histogram']
+        lines += _histogram_lines('tem_http_request_duration_seconds', 'endpoint', request_latency)
+        lines += ['# HELP tem_http_requests_total Finished requests by endpoint and status.',
+                  '# TYPE tem_http_requests_total counter']
+        lines += [f'tem_http_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                  for (endpoint, status), count in sorted(request_status_counts.items(), key=str)]
+        lines += ['# HELP tem_http_requests_in_flight Requests currently being handled by endpoint.',
+                  '# TYPE tem_http_requests_in_flight gauge']
+        lines += [f'tem_http_requests_in_flight{{endpoint="{endpoint}"}} {count}'
+                  for endpoint, count in sorted(requests_in_flight.items(), key=str)]
+        lines += ['# HELP tem_operation_duration_seconds Duration of persistence operations.',
+                  '# TYPE tem_operation_duration_seconds histogram']
+        lines += _histogram_lines('tem_operation_duration_seconds', 'operation', operation_latency)
+    return '\n'.join(lines) + '\n'
+
+# ============================================================================
+# REQUEST PROFILING (on demand, for admins)
+# ============================================================================
+
+# An admin profiles one request by adding ?_profile=1 or an "X-Profile: 1"
+# header, or arms an endpoint so its next requests (from anyone) are profiled.
+PROFILE_KEEP = 20
+PROFILE_SUMMARY_LINES = 40
+
+# Most recent profiles, newest last: dicts with the pstats data in 'stats'
+request_profiles = deque(maxlen=PROFILE_KEEP)
+profile_id_counter = [1]
+
+# Endpoint -> number of upcoming requests to profile
+armed_profiles = {}
+
+# cProfile cannot run in two threads at once on newer Pythons, so requests
+# that arrive while one is being profiled simply run unprofiled
+_profiler_busy = threading.Lock()
+
+def arm_profile(endpoint, count=1):
+    with metrics_lock:
+        if count > 0:
+            armed_profiles[endpoint] = count
+        else:
+            armed_profiles.pop(endpoint, None)
+
+@app.before_request
+def _start_profiling():
+    current = request._get_current_object()
+    if current.endpoint in armed_profiles:
+        with metrics_lock:
+            remaining = armed_profiles.get(current.endpoint, 0)
+            if remaining <= 0:
+                return
+            if remaining == 1:
+                del armed_profiles[current.endpoint]
+            else:
+                armed_profiles[current.endpoint] = remaining - 1
+    elif not (current.args.get('_profile') or current.headers.get('X-Profile')) or session.get('role') != 'admin':
+        return
+    if not _profiler_busy.acquire(blocking=False):
+        return
+    current.profiler = cProfile.Profile()
+    current.profile_start = time.perf_counter()
+    current.profiler.enable()
+
+def _stop_profiling(current, status):
+    """Disable the request's profiler, free the slot and store the result; returns the profile ID"""
+    profiler = current.profiler
+    current.profiler = None
+    try:
+        profiler.disable()
+        duration = time.perf_counter() - current.profile_start
+    finally:
+        _profiler_busy.release()
+    
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+    profiler.create_stats()
+    with metrics_lock:
+        profile_id = profile_id_counter[0]
+        request_profiles.append({
+            'id': profile_id,
+            'endpoint': current.endpoint,
+            'method': current.method,
+            'path': current.full_path.rstrip('?'),
+            'status': status,
+            'duration': duration,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'summary': summary.getvalue(),
+            'stats': marshal.dumps(profiler.stats)
+        })
+        profile_id_counter[0] += 1
+    return profile_id
+
+@app.after_request
+def _finish_profiling(response):
+    current = request._get_current_object()
+    if getattr(current, 'profiler', None) is None:
+        return response
+    response.headers['X-Profile-Id'] = str(_stop_profiling(current, response.status_code))
+    return response
+
+@app.teardown_request
+def _abandon_profiling(exc):
+    # after_request is skipped when an exception propagates (debug mode); never leave the profiler running
+    current = request._get_current_object()
+    if getattr(current, 'profiler', None) is not None:
+        _stop_profiling(current, 500)
+
+def find_profile(profile_id):
+    return next((p for p in request_profiles if p['id'] == profile_id), None)
+
+# ============================================================================
+# SAMPLING PROFILER & SLOW REQUEST LOG
+# ============================================================================
+
+# The sampler wakes every SAMPLE_INTERVAL seconds and records the stack of
+# each thread that is handling a request (idle threads are never walked).
+SAMPLE_INTERVAL = float(os.environ.get('TEM_SAMPLE_INTERVAL', '0.01'))
+SAMPLER_ENABLED = os.environ.get('TEM_SAMPLER', '1') == '1'
+SLOW_REQUEST_SECONDS = float(os.environ.get('TEM_SLOW_REQUEST_MS', '500')) / 1000
+SLOW_LOG_KEEP = 100
+SLOW_LOG_STACKS = 10
+MAX_STACK_DEPTH = 80
+# Distinct stacks kept in collapsed_stacks; when full, the rarer half is dropped
+COLLAPSED_STACKS_KEEP = 5000
+
+# Thread ID -> timing of the request that thread is handling
+active_requests = {}
+
+# Collapsed stack ("outer;...;inner") -> samples, across all requests
+collapsed_stacks = Counter()
+
+# Requests slower than SLOW_REQUEST_SECONDS, newest last
+slow_requests = deque(maxlen=SLOW_LOG_KEEP)
+
+_sampler = [None]
+_sampler_lock = threading.Lock()
+
+# Under gevent every request is a greenlet on one OS thread: threading would
+# give the sampler a greenlet that never runs while a request holds the CPU,
+# and sys._current_frames() only shows whichever greenlet is running. So the
+# sampler runs on a real OS thread and reads each request greenlet's frame.
+if GEVENT:
+    from greenlet import getcurrent
+    _os_thread_ident = monkey.get_original('_thread', 'get_ident')
+    _os_sleep = monkey.get_original('time', 'sleep')
+    _start_os_thread = monkey.get_original('_thread', 'start_new_thread')
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def _request_frame(timing, frames):
+    """The innermost frame of the request behind a timing entry"""
+    glet = timing['greenlet']
+    if glet is None or (glet.gr_frame is None and not glet.dead):
+        # A thread, or the greenlet that is running on its thread right now
+        return frames.get(timing['thread'])
+    return glet.gr_frame
+
+def _sampler_loop():
+    sleep = _os_sleep if GEVENT else time.sleep
+    while True:
+        sleep(SAMPLE_INTERVAL)
+        if not active_requests:
+            continue
+        frames = sys._current_frames()
+        for timing in list(active_requests.values()):
+            frame = _request_frame(timing, frames)
+            if frame is not None:
+                stack = collapse_stack(frame)
+                timing['samples'][stack] += 1
+                if stack not in collapsed_stacks and len(collapsed_stacks) >= COLLAPSED_STACKS_KEEP:
+                    kept = collapsed_stacks.most_common(COLLAPSED_STACKS_KEEP // 2)
+                    collapsed_stacks.clear()
+                    collapsed_stacks.update(dict(kept))
+                collapsed_stacks[stack] += 1
+
+def start_sampler():
+    if _sampler[0] is None:
+        with _sampler_lock:
+            if _sampler[0] is None:
+                if GEVENT:
+                    _sampler[0] = _start_os_thread(_sampler_loop, ())
+                else:
+                    _sampler[0] = threading.Thread(target=_sampler_loop, name='stack-sampler', daemon=True)
+                    _sampler[0].start()
+
+def collapsed_stack_text():
+    """All samples in collapsed-stack format (input for flamegraph.pl / speedscope)"""
+    return ''.join(f"{stack} {count}\n" for stack, count in collapsed_stacks.most_common())
+
+@app.before_request
+def _start_request_timing():
+    if SAMPLER_ENABLED:
+        start_sampler()
+    active_requests[threading.get_ident()] = {
+        'start': time.perf_counter(), 'render': 0.0, 'persist': 0.0,
+        'render_start': None, 'samples': Counter(),
+        'thread': _os_thread_ident() if GEVENT else threading.get_ident(),
+        'greenlet': getcurrent() if GEVENT else None
+    }
+
+# Before-request hooks run in registration order; waiting for lazy data must
+# come after the timers above start
+app.before_request(wait_for_endpoint_data)
+
+@app.after_request
+def _note_response_status(response):
+    timing = active_requests.get(threading.get_ident())
+    if timing is not None:
+        timing['status'] = response.status_code
+    return response
+
+@app.teardown_request
+def _log_slow_request(exc):
+    # Runs even when the view raised, so the thread never stays in active_requests
+    timing = active_requests.pop(threading.get_ident(), None)
+    if timing is None:
+        return
+    total = time.perf_counter() - timing['start']
+    if total >= SLOW_REQUEST_SECONDS:
+        current = request._get_current_object()
+        slow_requests.append({
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'method': current.method,
+            'path': current.full_path.rstrip('?'),
+            'endpoint': current.endpoint,
+            'role': session.get('role', 'anonymous'),
+            'status': timing.get('status', 500),
+            'total': total,
+            'render': timing['render'],
+            'persist': timing['persist'],
+            'handler': max(total - timing['render'] - timing['persist'], 0.0),
+            'samples': sum(timing['samples'].values()),
+            'stacks': timing['samples'].most_common(SLOW_LOG_STACKS)
+        })
+
+def _template_started(sender, template, context, **extra):
+    timing = active_requests.get(threading.get_ident())
+    if timing is not None:
+        timing['render_start'] = time.perf_counter()
+
+def _template_finished(sender, template, context, **extra):
+    timing = active_requests.get(threading.get_ident())
+    if timing is not None and timing['render_start'] is not None:
+        timing['render'] += time.perf_counter() - timing['render_start']
+        timing['render_start'] = None
+
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+# ============================================================================
+# SYSTEM HEALTH & MAINTENANCE
+# ============================================================================
+
+# (label, module global, pickle file) for each persisted collection
+DATA_COLLECTIONS = [
+    ('Admins', 'users_db', 'users.pkl'),
+    ('Users', 'regular_users_db', 'regular_users.pkl'),
+    ('Vendors', 'vendors_db', 'vendors.pkl'),
+    ('Products', 'products_db', 'products.pkl'),
+    ('Carts', 'cart_db', 'carts.pkl'),
+    ('Orders', 'orders_db', 'orders.pkl'),
+    ('Admin notifications', 'notifications_db', 'notifications.pkl'),
+    ('Vendor notifications', 'vendor_notifications_db', 'vendor_notifications.pkl'),
+    ('Memberships', 'memberships_db', 'memberships.pkl'),
+    ('User requests', 'user_requests_db', 'requests.pkl'),
+    ('Guests', 'guest_list_db', 'guests.pkl'),
+    ('Price rules', 'price_rules_db', 'price_rules.pkl'),
+    ('Events', 'events_db', 'events.pkl'),
+    ('Vendor availability', 'vendor_availability', 'availability.pkl'),
+]
+
+# Collections larger than this are sized from a random sample of records
+SIZE_SAMPLE = 200
+SNAPSHOT_KEEP = 5
+
+# Results of recent maintenance actions, newest last
+maintenance_log = deque(maxlen=20)
+
+def deep_sizeof(obj, seen=None):
+    """Bytes used by obj and everything it references (shared objects once)"""
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+    return size
+
+def estimate_deep_size(collection):
+    """deep_sizeof(), extrapolated from a sample for large collections"""
+    records = list(collection.values()) if isinstance(collection, dict) else collection
+    if len(records) <= SIZE_SAMPLE:
+        return deep_sizeof(collection)
+    sample = random.sample(records, SIZE_SAMPLE)
+    per_record = deep_sizeof(sample) - sys.getsizeof(sample)
+    keys = deep_sizeof(list(collection.keys())) if isinstance(collection, dict) else 0
+    return sys.getsizeof(collection) + keys + per_record * len(records) // SIZE_SAMPLE
+
+def process_rss():
+    """Current resident set size in bytes, or peak RSS where /proc is missing"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+def collection_stats():
+    stats = []
+    for label, name, filename in DATA_COLLECTIONS:
+        collection = globals()[name]
+        path = f'{DATA_DIR}/{filename}'
+        try:
+            info = os.stat(path)
+            file_size, modified = info.st_size, datetime.fromtimestamp(info.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+        except OSError:
+            file_size, modified = None, None
+        stats.append({'label': label, 'records': len(collection), 'memory': estimate_deep_size(collection),
+                      'file': filename, 'file_size': file_size, 'modified': modified})
+    return stats
+
+def run_maintenance(action):
+    """Run a maintenance action and log how long it took"""
+    started = time.perf_counter()
+    if action == 'snapshot':
+        # Microseconds keep two snapshots taken in the same second apart
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        snapshot_dir = f'{DATA_DIR}/snapshots/{stamp}'
+        with data_lock:
+            save_all_data()
+            os.makedirs(snapshot_dir)
+            for _, _, filename in DATA_COLLECTIONS + [(None, None, 'notification_state.pkl')]:
+                if os.path.exists(f'{DATA_DIR}/{filename}'):
+                    shutil.copy2(f'{DATA_DIR}/{filename}', snapshot_dir)
+        snapshots = sorted(os.listdir(f'{DATA_DIR}/snapshots'))
+        for old in snapshots[:-SNAPSHOT_KEEP]:
+            shutil.rmtree(f'{DATA_DIR}/snapshots/{old}', ignore_errors=True)
+        detail = f"Saved to snapshots/{stamp} (keeping the last {SNAPSHOT_KEEP})"
+    elif action == 'compact':
+        archived = archive_notifications()
+        with data_lock:
+            empty_carts = [username for username, cart in cart_db.items() if not cart]
+            for username in empty_carts:
+                del cart_db[username]
+            save_all_data()
+        with idempotency_lock:
+            _expire_idempotency_keys(time.time())
+        detail = (f"Archived {archived['notifications']} admin and {archived['vendor_notifications']} vendor "
+                  f"notification(s), dropped {len(empty_carts)} empty cart(s)")
+    elif action == 'reindex':
+        with data_lock:
+            rebuild_indexes()
+        detail = f"Rebuilt indexes for {len(products_db)} products, {len(orders_db)} orders, {len(guest_list_db)} guests"
+    else:
+        return None
+    entry = {'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'action': action,
+             'seconds': time.perf_counter() - started, 'detail': detail}
+    maintenance_log.append(entry)
+    observe_operation(action, entry['seconds'])
+    return entry
+
+# ============================================================================
+# MEMORY ACCOUNTING (tracemalloc)
+# ============================================================================
+
+# Start with TEM_TRACEMALLOC=1 to attribute allocations made while loading;
+# otherwise an admin can start tracing from the memory page.
+TRACEMALLOC_FRAMES = 10
+MEMORY_CAPTURES_KEEP = 4
+MEMORY_TOP_SITES = 25
+
+# In-memory lookup structures sized alongside the collections
+MEMORY_INDEXES = [
+    'product_index', 'category_vendors', 'guest_contact_index', 'guest_token_index',
+    'event_guest_counts', 'notification_index', 'vendor_notification_index',
+    'vendor_notifications_by_vendor', 'membership_index', 'memberships_by_user',
+    'order_index', 'vendor_order_ids', 'fulfillment_index', 'event_index', 'user_event_ids',
+    'request_index', 'vendor_request_ids', 'user_request_ids',
+    'idempotency_cache', 'collapsed_stacks', 'request_profiles',
+]
+
+# Recent captures, oldest first: {'id', 'date', 'rss', 'sizes', 'snapshot'}
+memory_captures = deque(maxlen=MEMORY_CAPTURES_KEEP)
+memory_capture_id_counter = [1]
+
+if os.environ.get('TEM_TRACEMALLOC') == '1':
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+def _filtered(snapshot):
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+
+def capture_memory():
+    """Record the deep size of every collection and index, plus a tracemalloc
+    snapshot when tracing is on"""
+    sizes = {}
+    for label, name, _ in DATA_COLLECTIONS:
+        sizes[name] = (label, len(globals()[name]), estimate_deep_size(globals()[name]))
+    for name in MEMORY_INDEXES:
+        sizes[name] = ('index', len(globals()[name]), estimate_deep_size(globals()[name]))
+    capture = {
+        'id': memory_capture_id_counter[0],
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'rss': process_rss(),
+        'sizes': sizes,
+        'snapshot': _filtered(tracemalloc.take_snapshot()) if tracemalloc.is_tracing() else None
+    }
+    memory_capture_id_counter[0] += 1
+    memory_captures.append(capture)
+    return capture
+
+def find_capture(capture_id):
+    return next((c for c in memory_captures if c['id'] == capture_id), None)
+
+def top_allocation_sites(capture, baseline=None, limit=MEMORY_TOP_SITES):
+    """Largest allocation sites of a capture, or the biggest changes since a
+    baseline capture; rows are (site, size, size_diff, count, count_diff)"""
+    if capture['snapshot'] is None:
+        return []
+    if baseline is not None and baseline['snapshot'] is not None:
+        stats = capture['snapshot'].compare_to(baseline['snapshot'], 'lineno')[:limit]
+        return [(str(stat.traceback[0]), stat.size, stat.size_diff, stat.count, stat.count_diff)
+                for stat in stats]
+    stats = capture['snapshot'].statistics('lineno')[:limit]
+    return [(str(stat.traceback[0]), stat.size, None, stat.count, None) for stat in stats]
 
 # ============================================================================
 # HTML TEMPLATES
@@ -635,6 +3358,7 @@ USER_SIGNUP_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endblock %}'
             <label>Password:</label>
             <input type="password" name="password" required>
         </div>
+        {{ idempotency_field() }}
         <button type="submit">Create Account</button>
     </form>
 """)
@@ -695,6 +3419,7 @@ VENDOR_SIGNUP_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endblock %
             <label>Password:</label>
             <input type="password" name="password" required>
         </div>
+        {{ idempotency_field() }}
         <button type="submit">Create Vendor Account</button>
     </form>
 """)
@@ -712,6 +3437,7 @@ ADMIN_DASHBOARD_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endblock
                     <a href="{{ url_for('admin_maintenance_menu') }}">🔧 Maintenance Menu</a>
                     <a href="{{ url_for('admin_all_data') }}">📊 All Data</a>
                     <a href="{{ url_for('admin_memberships') }}">👥 Memberships</a>
+                    <a href="{{ url_for('admin_pricing') }}">🏷️ Pricing Rules</a>
                     <a href="{{ url_for('admin_notifications') }}">🔔 Notifications</a>
                     <a href="{{ url_for('admin_profile') }}">👤 My Profile</a>
                 </div>
@@ -784,6 +3510,7 @@ VENDOR_DASHBOARD_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endbloc
                     <a href="{{ url_for('vendor_transactions') }}">💰 Transactions</a>
                     <a href="{{ url_for('vendor_notifications') }}">🔔 Notifications {% if unread_notifications > 0 %}<span class="badge">{{ unread_notifications }}</span>{% endif %}</a>
                     <a href="{{ url_for('user_requests_vendor') }}">📋 User Requests</a>
+                    <a href="{{ url_for('vendor_availability_page') }}">📅 Availability</a>
                     <a href="{{ url_for('vendor_profile') }}">👤 My Profile</a>
                 </div>
             </div>
@@ -855,7 +3582,9 @@ USER_DASHBOARD_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endblock
                     <a href="{{ url_for('view_vendors') }}">🏪 View Vendors</a>
                     <a href="{{ url_for('view_cart') }}">🛒 My Cart {% if cart_count > 0 %}<span class="badge">{{ cart_count }}</span>{% endif %}</a>
                     <a href="{{ url_for('user_orders') }}">📦 My Orders</a>
+                    <a href="{{ url_for('user_events_page') }}">📅 My Events</a>
                     <a href="{{ url_for('user_guest_list') }}">👥 Guest List</a>
+                    <a href="{{ url_for('user_vendor_requests') }}">📋 Vendor Requests</a>
                     <a href="{{ url_for('user_profile') }}">👤 My Profile</a>
                 </div>
             </div>
@@ -906,6 +3635,33 @@ USER_DASHBOARD_TEMPLATE = BASE_TEMPLATE.replace('{% block content %}{% endblock
     </div>
 """)
 
+# Live updates for the notification pages; STREAM_URL is replaced per page
+LIVE_NOTIFICATIONS_SCRIPT = """
+    <script>
+    (function () {
+        if (!window.EventSource) { return; }
+        var source = new EventSource('STREAM_URL');
+        source.addEventListener('notification', function (e) {
+            var notif = JSON.parse(e.data);
+            var item = document.createElement('div');
+            item.className = 'notification-item unread';
+            var title = document.createElement('h3');
+            title.textContent = '🆕 ' + (notif.message || ('New ' + notif.type + ' signup: ' + notif.name + ' (' + notif.username + ')'));
+            var date = document.createElement('p');
+            date.style.color = '#999';
+            date.textContent = '📅 ' + notif.date + ' — refresh to manage';
+            item.appendChild(title);
+            item.appendChild(date);
+            document.getElementById('live-notifications').prepend(item);
+            ['total-count', 'unread-count'].forEach(function (id) {
+                var el = document.getElementById(id);
+                el.textContent = parseInt(el.textContent, 10) + 1;
+            });
+        });
+    })();
+    </script>
+"""
+
 # ============================================================================
 # ROUTES - Authentication
 # ============================================================================
@@ -958,6 +3714,7 @@ def user_login():
     return render_template_string(USER_LOGIN_TEMPLATE)
 
 @app.route('/user/signup', methods=['GET', 'POST'])
+@idempotent
 def user_signup():
     """User registration"""
     if request.method == 'POST':
@@ -978,18 +3735,7 @@ def user_signup():
         }
         
         # Notify admin
-        notification = {
-            'id': notification_id_counter[0],
-            'type': 'user',
-            'username': username,
-            'name': name,
-            'email': email,
-            'phone': phone,
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'read': False
-        }
-        notifications_db.append(notification)
-        notification_id_counter[0] += 1
+        add_admin_notification('user', username, name, email, phone)
         
         # Save data
         save_all_data()
@@ -1019,6 +3765,7 @@ def vendor_login():
     return render_template_string(VENDOR_LOGIN_TEMPLATE)
 
 @app.route('/vendor/signup', methods=['GET', 'POST'])
+@idempotent
 def vendor_signup():
     """Vendor registration"""
     if request.method == 'POST':
@@ -1040,18 +3787,7 @@ def vendor_signup():
         }
         
         # Notify admin
-        notification = {
-            'id': notification_id_counter[0],
-            'type': 'vendor',
-            'username': username,
-            'name': name,
-            'email': email,
-            'phone': phone,
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'read': False
-        }
-        notifications_db.append(notification)
-        notification_id_counter[0] += 1
+        add_admin_notification('vendor', username, name, email, phone)
         
         # Save data
         save_all_data()
@@ -1078,7 +3814,7 @@ def admin_dashboard():
     vendors_count = len(vendors_db)
     products_count = len(products_db)
     orders_count = len(orders_db)
-    unread_count = sum(1 for n in notifications_db if not n['read'])
+    unread_count = notification_unread_counts.get('admin', 0)
     
     return render_template_string(ADMIN_DASHBOARD_TEMPLATE,
                                  users_count=users_count,
@@ -1101,25 +3837,11 @@ def vendor_dashboard():
     my_products_count = sum(1 for p in products_db if p['added_by'] == username)
     
     # Count orders containing this vendor's products
-    my_orders_count = 0
-    try:
-        for order in orders_db:
-            for product_id, qty in order['items']:
-                product = next(
-                    (p for p in products_db if p['id'] == product_id),
-                    None
-                )
-                if product and product['added_by'] == username:
-                    my_orders_count += 1
-                    break
-    except Exception as e:
-        print("Error counting vendor orders:", e)
+    my_orders_count = len(vendor_order_ids.get(username, []))
     
-    unread_notifications = sum(1 for n in vendor_notifications_db 
-                              if n['vendor_username'] == username and not n['read'])
+    unread_notifications = notification_unread_counts.get('vendor:' + username, 0)
     
-    user_requests_count = sum(1 for r in user_requests_db 
-                             if r.get('vendor_username') == username)
+    user_requests_count = len(vendor_request_ids.get(username, []))
     
     return render_template_string(VENDOR_DASHBOARD_TEMPLATE,
                                  my_products_count=my_products_count,
@@ -1164,12 +3886,22 @@ def user_dashboard():
 # from flask import Flask, render_template_string, request, redirect, url_for, session
 # from datetime import datetime
 
-@app.route('/admin/maintenance')
+@app.route('/admin/maintenance', methods=['GET', 'POST'])
 def admin_maintenance_menu():
-    """Admin maintenance menu - FULLY FUNCTIONAL"""
+    """Admin maintenance menu - live system health and maintenance actions"""
     if 'username' not in session or session.get('role') != 'admin':
         return redirect(url_for('admin_login'))
     
+    if request.method == 'POST':
+        run_maintenance(request.form.get('action'))
+        return redirect(url_for('admin_maintenance_menu'))
+    
+    collections = collection_stats()
+    save_stats = operation_latency.get('save_all_data')
+    load_stats = operation_latency.get('load_all_data')
+    archive_dir = f'{DATA_DIR}/archive'
+    archive_size = sum(entry.stat().st_size for entry in os.scandir(archive_dir)) if os.path.isdir(archive_dir) else 0
+    
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
         <div><a href="/admin/dashboard">🏠 Dashboard</a></div>
@@ -1179,36 +3911,420 @@ def admin_maintenance_menu():
     <h1>🔧 System Maintenance</h1>
     
     <div class="cards">
-        <div class="card"><h3>Database Status</h3><p>✅</p><small>All systems operational</small></div>
-        <div class="card"><h3>Total Users</h3><p>{{ total_users }}</p></div>
-        <div class="card"><h3>Total Products</h3><p>{{ total_products }}</p></div>
-        <div class="card"><h3>Total Orders</h3><p>{{ total_orders }}</p></div>
+        <div class="card"><h3>Process RSS</h3><p>{{ rss|filesizeformat if rss else 'n/a' }}</p></div>
+        <div class="card"><h3>Data in Memory (est.)</h3><p>{{ total_memory|filesizeformat }}</p></div>
+        <div class="card"><h3>Data on Disk</h3><p>{{ total_disk|filesizeformat }}</p><small>+ {{ archive_size|filesizeformat }} archived</small></div>
+        <div class="card"><h3>Last Save</h3>
+            <p>{% if save_stats %}{{ '%.1f'|format(save_stats[3] * 1000) }} ms{% else %}-{% endif %}</p>
+            <small>{% if save_stats %}{{ save_stats[2] }} saves, avg {{ '%.1f'|format(save_stats[1] / save_stats[2] * 1000) }} ms{% endif %}
+            {% if load_stats %}· load {{ '%.1f'|format(load_stats[3] * 1000) }} ms{% endif %}</small>
+        </div>
     </div>
     
-    <h2 style="margin-top: 30px;">System Information</h2>
+    <h2 style="margin-top: 30px;">Collections</h2>
+    <p>Saved as <code>{{ data_format }}</code> (set <code>TEM_DATA_FORMAT</code> to change; compare formats with bench_persistence.py)</p>
+    <table>
+        <tr><th>Collection</th><th>Records</th><th>Memory (est.)</th><th>File</th><th>File Size</th><th>Last Written</th></tr>
+        {% for item in collections %}
+        <tr>
+            <td>{{ item.label }}</td><td>{{ item.records }}</td><td>{{ item.memory|filesizeformat }}</td>
+            <td><code>{{ item.file }}</code></td>
+            <td>{{ item.file_size|filesizeformat if item.file_size is not none else 'not saved yet' }}</td>
+            <td>{{ item.modified or '-' }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    
+    {% if startup %}
+    <h2 style="margin-top: 30px;">Startup</h2>
+    <p>Last load, {{ load_workers }} reader thread(s){% if lazy_loading %}; orders, notifications and guests load in the background{% endif %}. File reads overlap.</p>
     <table>
-        <tr><th>Component</th><th>Status</th><th>Details</th></tr>
-        <tr><td>User Database</td><td>✅ Active</td><td>{{ total_users }} registered users</td></tr>
-        <tr><td>Vendor Database</td><td>✅ Active</td><td>{{ total_vendors }} active vendors</td></tr>
-        <tr><td>Product Catalog</td><td>✅ Active</td><td>{{ total_products }} products listed</td></tr>
-        <tr><td>Order System</td><td>✅ Active</td><td>{{ total_orders }} orders processed</td></tr>
-        <tr><td>Notification System</td><td>✅ Active</td><td>{{ total_notifications }} notifications</td></tr>
+        <tr><th>Step</th><th>Time</th></tr>
+        {% for step, seconds in startup %}
+        <tr><td>{{ step }}</td><td>{{ '%.1f'|format(seconds * 1000) }} ms</td></tr>
+        {% endfor %}
     </table>
+    {% endif %}
     
     <div style="margin-top: 30px;">
         <h3>Maintenance Actions</h3>
-        <button onclick="alert('Cache cleared successfully!')" class="btn btn-info">🗑️ Clear Cache</button>
-        <button onclick="alert('System logs exported!')" class="btn btn-success">📄 Export Logs</button>
-        <button onclick="if(confirm('This will reset all notification read status. Continue?')) alert('Notifications reset!')" class="btn btn-warning">🔔 Reset Notifications</button>
+        <a href="{{ url_for('admin_profiles') }}" class="btn btn-info">⏱️ Request Profiles</a>
+        <a href="{{ url_for('admin_slow_requests') }}" class="btn btn-info">🐢 Slow Requests</a>
+        <a href="{{ url_for('admin_memory') }}" class="btn btn-info">🧠 Memory</a>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="snapshot">
+            <button type="submit" class="btn btn-success">💾 Snapshot Data</button>
+        </form>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="compact">
+            <button type="submit" class="btn btn-warning" onclick="return confirm('Archive old read notifications and drop empty carts?')">🗜️ Compact</button>
+        </form>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="reindex">
+            <button type="submit" class="btn btn-info">🔄 Rebuild Indexes</button>
+        </form>
     </div>
+    
+    {% if log %}
+    <h3 style="margin-top: 30px;">Recent Actions</h3>
+    <table>
+        <tr><th>Date</th><th>Action</th><th>Took</th><th>Result</th></tr>
+        {% for entry in log|reverse %}
+        <tr><td>{{ entry.date }}</td><td>{{ entry.action }}</td><td>{{ '%.1f'|format(entry.seconds * 1000) }} ms</td><td>{{ entry.detail }}</td></tr>
+        {% endfor %}
+    </table>
+    {% endif %}
     """)
     
     return render_template_string(template,
-                                 total_users=len(regular_users_db),
-                                 total_vendors=len(vendors_db),
-                                 total_products=len(products_db),
-                                 total_orders=len(orders_db),
-                                 total_notifications=len(notifications_db))
+                                  collections=collections,
+                                  total_memory=sum(item['memory'] for item in collections),
+                                  total_disk=sum(item['file_size'] or 0 for item in collections),
+                                  archive_size=archive_size,
+                                  rss=process_rss(),
+                                  save_stats=save_stats,
+                                  load_stats=load_stats,
+                                  data_format=DATA_FORMAT,
+                                  startup=list(startup_report),
+                                  load_workers=LOAD_WORKERS,
+                                  lazy_loading=LAZY_LOADING,
+                                  log=list(maintenance_log))
+
+
+@app.route('/admin/memory', methods=['GET', 'POST'])
+def admin_memory():
+    """tracemalloc captures: top allocation sites, collection sizes and diffs"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'start' and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        elif action == 'stop':
+            tracemalloc.stop()
+        elif action == 'capture':
+            capture = capture_memory()
+            return redirect(url_for('admin_memory', capture=capture['id']))
+        elif action == 'clear':
+            memory_captures.clear()
+        return redirect(url_for('admin_memory'))
+    
+    captures = list(memory_captures)
+    capture = find_capture(request.args.get('capture', type=int)) or (captures[-1] if captures else None)
+    baseline = find_capture(request.args.get('baseline', type=int))
+    if baseline is capture:
+        baseline = None
+    
+    sizes = []
+    if capture:
+        for name, (label, records, size) in capture['sizes'].items():
+            before = baseline['sizes'].get(name) if baseline else None
+            sizes.append({'name': name, 'label': label, 'records': records, 'size': size,
+                          'diff': size - before[2] if before else None})
+        sizes.sort(key=lambda item: item['size'], reverse=True)
+    
+    traced, peak = tracemalloc.get_traced_memory()
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/admin/dashboard">🏠 Dashboard</a><a href="/admin/maintenance">🔧 Maintenance</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>🧠 Memory</h1>
+    
+    <div class="cards">
+        <div class="card"><h3>Process RSS</h3><p>{{ rss|filesizeformat if rss else 'n/a' }}</p></div>
+        <div class="card"><h3>tracemalloc</h3><p>{{ 'On' if tracing else 'Off' }}</p>
+            {% if tracing %}<small>{{ traced|filesizeformat }} traced, peak {{ peak|filesizeformat }}</small>{% endif %}</div>
+    </div>
+    
+    <div style="margin: 20px 0;">
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="capture">
+            <button type="submit" class="btn btn-success">📸 Capture</button>
+        </form>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="{{ 'stop' if tracing else 'start' }}">
+            <button type="submit" class="btn {{ 'btn-danger' if tracing else 'btn-info' }}">{{ '⏹ Stop Tracing' if tracing else '▶ Start Tracing' }}</button>
+        </form>
+        {% if captures %}
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="clear">
+            <button type="submit" class="btn btn-warning">🗑️ Clear Captures</button>
+        </form>
+        {% endif %}
+    </div>
+    {% if not tracing %}
+    <p style="color: #666;">Allocation sites are recorded only while tracing. Start tracing (or run with
+    TEM_TRACEMALLOC=1 to include startup), use the app for a while, then capture.</p>
+    {% endif %}
+    
+    {% if captures %}
+    <form method="GET" style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+        <label style="display: inline;">Show capture</label>
+        <select name="capture" style="width: auto; padding: 8px;">
+            {% for item in captures %}<option value="{{ item.id }}" {% if item is sameas capture %}selected{% endif %}>#{{ item.id }} ({{ item.date }})</option>{% endfor %}
+        </select>
+        <label style="display: inline;">compared with</label>
+        <select name="baseline" style="width: auto; padding: 8px;">
+            <option value="">nothing</option>
+            {% for item in captures %}<option value="{{ item.id }}" {% if item is sameas baseline %}selected{% endif %}>#{{ item.id }} ({{ item.date }})</option>{% endfor %}
+        </select>
+        <button type="submit" class="btn btn-info">Show</button>
+    </form>
+    {% endif %}
+    
+    {% if capture %}
+    <h2>Capture #{{ capture.id }}{% if baseline %} vs. #{{ baseline.id }}{% endif %}</h2>
+    <p style="color: #666;">{{ capture.date }} · RSS {{ capture.rss|filesizeformat if capture.rss else 'n/a' }}
+    {% if baseline and baseline.rss and capture.rss %}({{ '%+.1f'|format((capture.rss - baseline.rss) / 1048576) }} MB){% endif %}</p>
+    
+    <h3>Collections and Indexes (estimated deep size)</h3>
+    <table>
+        <tr><th>Name</th><th>Kind</th><th>Entries</th><th>Size</th>{% if baseline %}<th>Change</th>{% endif %}</tr>
+        {% for item in sizes %}
+        <tr>
+            <td><code>{{ item.name }}</code></td><td>{{ item.label }}</td><td>{{ item.records }}</td>
+            <td>{{ item.size|filesizeformat }}</td>
+            {% if baseline %}<td>{% if item.diff is not none %}{{ '%+d'|format(item.diff // 1024) }} KiB{% else %}new{% endif %}</td>{% endif %}
+        </tr>
+        {% endfor %}
+    </table>
+    
+    <h3 style="margin-top: 30px;">{{ 'Largest Changes by Allocation Site' if compared else 'Top Allocation Sites' }}</h3>
+    {% if sites %}
+    <table style="font-size: 13px;">
+        <tr><th>Site</th><th>Size</th>{% if compared %}<th>Change</th>{% endif %}<th>Blocks</th>{% if compared %}<th>Change</th>{% endif %}</tr>
+        {% for site, size, size_diff, count, count_diff in sites %}
+        <tr>
+            <td><code>{{ site }}</code></td><td>{{ size|filesizeformat }}</td>
+            {% if compared %}<td>{{ '%+d'|format(size_diff // 1024) }} KiB</td>{% endif %}
+            <td>{{ count }}</td>
+            {% if compared %}<td>{{ '%+d'|format(count_diff) }}</td>{% endif %}
+        </tr>
+        {% endfor %}
+    </table>
+    {% else %}
+    <p style="color: #999;">No allocation data: tracing was off when this capture was taken.</p>
+    {% endif %}
+    {% endif %}
+    """)
+    
+    return render_template_string(template, captures=captures, capture=capture, baseline=baseline,
+                                  sizes=sizes, sites=top_allocation_sites(capture, baseline) if capture else [],
+                                  compared=bool(capture and baseline and capture['snapshot'] and baseline['snapshot']),
+                                  tracing=tracemalloc.is_tracing(), traced=traced, peak=peak,
+                                  rss=process_rss())
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (admin session or bearer token)"""
+    authorized = session.get('role') == 'admin' or (
+        METRICS_TOKEN and secrets.compare_digest(request.headers.get('Authorization', ''),
+                                                 'Bearer ' + METRICS_TOKEN))
+    if not authorized:
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin/profiles', methods=['GET', 'POST'])
+def admin_profiles():
+    """Arm endpoints for profiling and list recent request profiles"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'arm' and request.form.get('endpoint') in app.view_functions:
+            arm_profile(request.form.get('endpoint'), request.form.get('count', 1, type=int))
+        elif action == 'disarm':
+            arm_profile(request.form.get('endpoint'), 0)
+        elif action == 'clear':
+            request_profiles.clear()
+        return redirect(url_for('admin_profiles'))
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/admin/dashboard">🏠 Dashboard</a><a href="/admin/maintenance">🔧 Maintenance</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>⏱️ Request Profiles</h1>
+    <p style="color: #666;">Add <code>?_profile=1</code> (or an <code>X-Profile: 1</code> header) to any request while logged in
+    as admin, or arm an endpoint below to profile its next requests from any user.</p>
+    
+    <form method="POST" style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+        <input type="hidden" name="action" value="arm">
+        <select name="endpoint" style="width: auto; padding: 8px;">
+            {% for endpoint in endpoints %}<option value="{{ endpoint }}">{{ endpoint }}</option>{% endfor %}
+        </select>
+        <label style="display: inline;">next</label>
+        <input type="number" name="count" value="1" min="1" max="100" style="width: 80px; padding: 8px;">
+        <label style="display: inline;">request(s)</label>
+        <button type="submit" class="btn btn-info">🎯 Arm</button>
+    </form>
+    
+    {% if armed %}
+    <h3>Armed</h3>
+    <table>
+        <tr><th>Endpoint</th><th>Remaining</th><th></th></tr>
+        {% for endpoint, remaining in armed.items() %}
+        <tr>
+            <td>{{ endpoint }}</td><td>{{ remaining }}</td>
+            <td>
+                <form method="POST" style="display: inline;">
+                    <input type="hidden" name="action" value="disarm">
+                    <input type="hidden" name="endpoint" value="{{ endpoint }}">
+                    <button type="submit" class="btn btn-danger">✖ Disarm</button>
+                </form>
+            </td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
+    <h2 style="margin-top: 30px;">Recent Profiles</h2>
+    {% if profiles %}
+    <table>
+        <tr><th>#</th><th>Date</th><th>Request</th><th>Status</th><th>Time</th><th></th></tr>
+        {% for profile in profiles|reverse %}
+        <tr>
+            <td>{{ profile.id }}</td><td>{{ profile.date }}</td>
+            <td>{{ profile.method }} {{ profile.path }}</td><td>{{ profile.status }}</td>
+            <td>{{ '%.1f'|format(profile.duration * 1000) }} ms</td>
+            <td>
+                <a href="{{ url_for('admin_profile_detail', profile_id=profile.id) }}" class="btn btn-info">View</a>
+                <a href="{{ url_for('admin_profile_download', profile_id=profile.id) }}" class="btn btn-success">⬇ .pstats</a>
+            </td>
+        </tr>
+        {% endfor %}
+    </table>
+    <form method="POST" style="margin-top: 20px;">
+        <input type="hidden" name="action" value="clear">
+        <button type="submit" class="btn btn-danger">🗑️ Clear Profiles</button>
+    </form>
+    {% else %}
+    <p style="color: #999; text-align: center; padding: 40px;">No profiles captured yet.</p>
+    {% endif %}
+    """)
+    
+    return render_template_string(template, profiles=list(request_profiles), armed=dict(armed_profiles),
+                                  endpoints=sorted(e for e in app.view_functions if e != 'static'))
+
+
+@app.route('/admin/profiles/<int:profile_id>')
+def admin_profile_detail(profile_id):
+    """Top functions of one profile, by cumulative time"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    profile = find_profile(profile_id)
+    if profile is None:
+        return redirect(url_for('admin_profiles'))
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/admin/profiles">⏱️ Profiles</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>⏱️ Profile #{{ profile.id }}</h1>
+    <p>{{ profile.method }} {{ profile.path }} → {{ profile.status }} in {{ '%.1f'|format(profile.duration * 1000) }} ms ({{ profile.date }})</p>
+    <a href="{{ url_for('admin_profile_download', profile_id=profile.id) }}" class="btn btn-success">⬇ Download .pstats</a>
+    <pre style="background: #f8f9fa; padding: 15px; margin-top: 20px; overflow-x: auto; font-size: 12px;">{{ profile.summary }}</pre>
+    """)
+    
+    return render_template_string(template, profile=profile)
+
+
+@app.route('/admin/profiles/<int:profile_id>/download')
+def admin_profile_download(profile_id):
+    """The raw profile, loadable with pstats.Stats(path) or snakeviz"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    profile = find_profile(profile_id)
+    if profile is None:
+        return redirect(url_for('admin_profiles'))
+    
+    return Response(profile['stats'], mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f"attachment; filename=profile-{profile['id']}-{profile['endpoint']}.pstats"})
+
+
+@app.route('/admin/slow-requests', methods=['GET', 'POST'])
+def admin_slow_requests():
+    """Slow request log with timing breakdown and sampled stacks"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    if request.method == 'POST':
+        if request.form.get('action') == 'clear_log':
+            slow_requests.clear()
+        elif request.form.get('action') == 'reset_samples':
+            collapsed_stacks.clear()
+        return redirect(url_for('admin_slow_requests'))
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/admin/dashboard">🏠 Dashboard</a><a href="/admin/maintenance">🔧 Maintenance</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>🐢 Slow Requests</h1>
+    <p style="color: #666;">Requests taking {{ threshold_ms }} ms or more (TEM_SLOW_REQUEST_MS).
+    Stacks are sampled every {{ interval_ms }} ms{% if not sampler_enabled %} — the sampler is off (TEM_SAMPLER=0){% endif %}.</p>
+    
+    <div style="margin: 20px 0;">
+        <a href="{{ url_for('admin_collapsed_stacks') }}" class="btn btn-success">⬇ Collapsed stacks ({{ stack_count }} distinct)</a>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="reset_samples">
+            <button type="submit" class="btn btn-warning">↺ Reset Samples</button>
+        </form>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="clear_log">
+            <button type="submit" class="btn btn-danger">🗑️ Clear Log</button>
+        </form>
+    </div>
+    
+    {% if slow %}
+    {% for entry in slow|reverse %}
+    <div style="background: #f8f9fa; padding: 15px; margin-bottom: 15px; border-radius: 5px; border-left: 4px solid #e67e22;">
+        <h3>{{ entry.method }} {{ entry.path }} <small style="color: #666;">→ {{ entry.status }}</small></h3>
+        <p>{{ entry.date }} &nbsp; {{ entry.endpoint }} &nbsp; role: {{ entry.role }}</p>
+        <p><strong>{{ '%.1f'|format(entry.total * 1000) }} ms</strong> =
+           handler {{ '%.1f'|format(entry.handler * 1000) }} ms +
+           render {{ '%.1f'|format(entry.render * 1000) }} ms +
+           persistence {{ '%.1f'|format(entry.persist * 1000) }} ms</p>
+        {% if entry.stacks %}
+        <details><summary>{{ entry.samples }} stack sample(s)</summary>
+            <pre style="font-size: 11px; overflow-x: auto;">{% for stack, count in entry.stacks %}{{ count }}  {{ stack.split(';')[-6:]|join(' ← ') }}
+{% endfor %}</pre>
+        </details>
+        {% endif %}
+    </div>
+    {% endfor %}
+    {% else %}
+    <p style="color: #999; text-align: center; padding: 40px;">No slow requests recorded.</p>
+    {% endif %}
+    """)
+    
+    return render_template_string(template, slow=list(slow_requests), stack_count=len(collapsed_stacks),
+                                  threshold_ms=round(SLOW_REQUEST_SECONDS * 1000),
+                                  interval_ms=round(SAMPLE_INTERVAL * 1000, 1),
+                                  sampler_enabled=SAMPLER_ENABLED)
+
+
+@app.route('/admin/slow-requests/stacks.txt')
+def admin_collapsed_stacks():
+    """Sampled request stacks, one "frame;frame;frame count" line each"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    return Response(collapsed_stack_text(), mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=stacks.collapsed.txt'})
 
 
 @app.route('/admin/all-products')
@@ -1332,23 +4448,48 @@ def admin_memberships():
         action = request.form.get('action')
         
         if action == 'add':
-            membership = {
-                'id': membership_id_counter[0],
-                'username': request.form.get('username'),
-                'type': request.form.get('membership_type'),
-                'duration': request.form.get('duration'),
-                'start_date': datetime.now().strftime('%Y-%m-%d'),
-                'status': 'Active'
-            }
-            memberships_db.append(membership)
-            membership_id_counter[0] += 1
+            fields, errors = validate_membership(request.form)
+            if errors:
+                for error in errors:
+                    flash(error, 'error')
+                return redirect(url_for('admin_memberships'))
+            with data_lock:
+                membership = {
+                    'id': membership_id_counter[0],
+                    'username': fields['username'],
+                    'type': fields['type'],
+                    'duration': fields['duration'],
+                    'start_date': datetime.now().strftime('%Y-%m-%d'),
+                    'status': 'Active'
+                }
+                memberships_db.append(membership)
+                index_membership(membership)
+                membership_id_counter[0] += 1
+        
+        elif action == 'renew':
+            membership = membership_index.get(request.form.get('membership_id', type=int))
+            duration = request.form.get('duration') or None
+            if membership is None:
+                flash("Unknown membership.", 'error')
+                return redirect(url_for('admin_memberships'))
+            if duration is not None and duration not in MEMBERSHIP_DURATION_MONTHS:
+                flash("Choose a duration.", 'error')
+                return redirect(url_for('admin_memberships'))
+            renew_membership(membership, duration)
         
         elif action == 'delete':
-            membership_id = int(request.form.get('membership_id'))
-            memberships_db[:] = [m for m in memberships_db if m['id'] != membership_id]
+            membership_id = request.form.get('membership_id', type=int)
+            with data_lock:
+                membership = membership_index.get(membership_id)
+                if membership:
+                    unindex_membership(membership)
+                memberships_db[:] = [m for m in memberships_db if m['id'] != membership_id]
         
+        save_all_data()
         return redirect(url_for('admin_memberships'))
     
+    expire_memberships()
+    
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
         <div><a href="/admin/dashboard">🏠 Dashboard</a></div>
@@ -1357,6 +4498,10 @@ def admin_memberships():
     
     <h1>👥 Membership Management</h1>
     
+    {% for category, message in get_flashed_messages(with_categories=true) %}
+    <div class="alert alert-{{ category }}">{{ message }}</div>
+    {% endfor %}
+    
     <h2>Add New Membership</h2>
     <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px;">
         <input type="hidden" name="action" value="add">
@@ -1389,16 +4534,26 @@ def admin_memberships():
         <button type="submit" class="btn btn-success">➕ Add Membership</button>
     </form>
     
-    <h2 style="margin-top: 30px;">Current Memberships ({{ memberships|length }})</h2>
+    <h2 style="margin-top: 30px;">Current Memberships ({{ memberships|length }}, {{ active_count }} active members)</h2>
     {% if memberships %}
     <table>
-        <tr><th>ID</th><th>Username</th><th>Type</th><th>Duration</th><th>Start Date</th><th>Status</th><th>Actions</th></tr>
+        <tr><th>ID</th><th>Username</th><th>Type</th><th>Duration</th><th>Start Date</th><th>End Date</th><th>Status</th><th>Actions</th></tr>
         {% for membership in memberships %}
         <tr>
             <td>#{{ membership.id }}</td><td>{{ membership.username }}</td><td>{{ membership.type }}</td>
-            <td>{{ membership.duration }}</td><td>{{ membership.start_date }}</td>
-            <td><span style="color: #27ae60; font-weight: bold;">{{ membership.status }}</span></td>
+            <td>{{ membership.duration }}</td><td>{{ membership.start_date }}</td><td>{{ membership.end_date }}</td>
+            <td><span style="color: {% if membership.status == 'Active' %}#27ae60{% else %}#e74c3c{% endif %}; font-weight: bold;">{{ membership.status }}</span></td>
             <td>
+                <form method="POST" style="display: inline;">
+                    <input type="hidden" name="action" value="renew">
+                    <input type="hidden" name="membership_id" value="{{ membership.id }}">
+                    <select name="duration" style="width: auto; padding: 8px;">
+                        {% for duration in durations %}
+                        <option value="{{ duration }}" {% if duration == membership.duration %}selected{% endif %}>{{ duration }}</option>
+                        {% endfor %}
+                    </select>
+                    <button type="submit" class="btn btn-success">🔄 Renew</button>
+                </form>
                 <form method="POST" style="display: inline;">
                     <input type="hidden" name="action" value="delete">
                     <input type="hidden" name="membership_id" value="{{ membership.id }}">
@@ -1413,7 +4568,116 @@ def admin_memberships():
     {% endif %}
     """)
     
-    return render_template_string(template, users=regular_users_db, memberships=memberships_db)
+    return render_template_string(template, users=regular_users_db, memberships=memberships_db,
+                                  active_count=len(active_memberships), durations=list(MEMBERSHIP_DURATION_MONTHS))
+
+
+@app.route('/admin/pricing', methods=['GET', 'POST'])
+def admin_pricing():
+    """Manage checkout price rules"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('admin_login'))
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+        
+        if action == 'add':
+            fields, errors = validate_price_rule(request.form)
+            if errors:
+                for error in errors:
+                    flash(error, 'error')
+                return redirect(url_for('admin_pricing'))
+            with data_lock:
+                rule = {'id': price_rule_id_counter[0], **fields}
+                price_rules_db.append(rule)
+                price_rule_id_counter[0] += 1
+                compile_price_rules()
+        
+        elif action == 'delete':
+            rule_id = request.form.get('rule_id', type=int)
+            if rule_id is None:
+                flash("Invalid rule ID.", 'error')
+                return redirect(url_for('admin_pricing'))
+            with data_lock:
+                price_rules_db[:] = [r for r in price_rules_db if r['id'] != rule_id]
+                compile_price_rules()
+        
+        save_all_data()
+        return redirect(url_for('admin_pricing'))
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/admin/dashboard">🏠 Dashboard</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>🏷️ Pricing Rules</h1>
+    <p style="color: #666;">Rules are applied at checkout. When several rules match a cart line, the largest discount wins.</p>
+    
+    {% for category, message in get_flashed_messages(with_categories=true) %}
+    <div class="alert alert-{{ category }}">{{ message }}</div>
+    {% endfor %}
+    
+    <h2 style="margin-top: 20px;">Add Rule</h2>
+    <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px;">
+        <input type="hidden" name="action" value="add">
+        <div class="form-group">
+            <label>Rule Type</label>
+            <select name="kind" required>
+                {% for kind, label in kinds.items() %}<option value="{{ kind }}">{{ label }}</option>{% endfor %}
+            </select>
+        </div>
+        <div class="form-group"><label>Discount (%) *</label><input type="number" name="percent" step="0.01" min="0" max="100" required></div>
+        <div class="form-group">
+            <label>Membership Tier (blank = everyone)</label>
+            <select name="tier">
+                <option value="">-- Any --</option>
+                {% for tier in tiers %}<option value="{{ tier }}">{{ tier }}</option>{% endfor %}
+            </select>
+        </div>
+        <div class="form-group">
+            <label>Vendor (blank = all vendors)</label>
+            <select name="vendor">
+                <option value="">-- Any --</option>
+                {% for username, vendor in vendors.items() %}<option value="{{ username }}">{{ vendor.name }} ({{ username }})</option>{% endfor %}
+            </select>
+        </div>
+        <div class="form-group">
+            <label>Category (blank = all categories)</label>
+            <select name="category">
+                <option value="">-- Any --</option>
+                {% for category in categories %}<option value="{{ category }}">{{ category }}</option>{% endfor %}
+            </select>
+        </div>
+        <div class="form-group"><label>Product ID (optional, overrides vendor/category)</label><input type="number" name="product_id" min="1"></div>
+        <div class="form-group"><label>Minimum Quantity</label><input type="number" name="min_qty" value="1" min="1"></div>
+        <button type="submit" class="btn btn-success">➕ Add Rule</button>
+    </form>
+    
+    <h2 style="margin-top: 30px;">Current Rules ({{ rules|length }})</h2>
+    {% if rules %}
+    <table>
+        <tr><th>ID</th><th>Type</th><th>Rule</th><th>Actions</th></tr>
+        {% for rule in rules %}
+        <tr>
+            <td>#{{ rule.id }}</td><td>{{ kinds.get(rule.kind, rule.kind) }}</td><td>{{ label(rule) }}</td>
+            <td>
+                <form method="POST" style="display: inline;">
+                    <input type="hidden" name="action" value="delete">
+                    <input type="hidden" name="rule_id" value="{{ rule.id }}">
+                    <button type="submit" class="btn btn-danger" onclick="return confirm('Delete this rule?')">🗑️ Delete</button>
+                </form>
+            </td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% else %}
+    <p style="color: #999;">No pricing rules yet.</p>
+    {% endif %}
+    """)
+    
+    return render_template_string(template, rules=price_rules_db, kinds=PRICE_RULE_KINDS, tiers=MEMBERSHIP_TIERS,
+                                  vendors=vendors_db, categories=PRODUCT_CATEGORIES, label=price_rule_label)
 
 
 @app.route('/admin/notifications', methods=['GET', 'POST'])
@@ -1424,31 +4688,31 @@ def admin_notifications():
     
     if request.method == 'POST':
         action = request.form.get('action')
-        notification_id = int(request.form.get('notification_id'))
         
-        if action == 'mark_read':
-            for notif in notifications_db:
-                if notif['id'] == notification_id:
-                    notif['read'] = True
-                    break
+        if action == 'mark_all_read':
+            mark_all_notifications_read('admin')
+            save_all_data()
+            return redirect(url_for('admin_notifications'))
         
-        elif action == 'approve_vendor':
-            notif = next((n for n in notifications_db if n['id'] == notification_id), None)
-            if notif:
-                vendors_db[notif['username']] = {
-                    'password': 'vendor123',
-                    'role': 'vendor',
-                    'name': notif['name'],
-                    'email': notif['email'],
-                    'phone': notif['phone']
-                }
-                notif['read'] = True
+        if action == 'archive':
+            archive_notifications()
+            return redirect(url_for('admin_notifications'))
         
-        elif action == 'reject_vendor':
-            for notif in notifications_db:
-                if notif['id'] == notification_id:
-                    notif['read'] = True
-                    break
+        notification_id = int(request.form.get('notification_id'))
+        notif = notification_index.get(notification_id)
+        
+        if notif and action in ('mark_read', 'reject_vendor'):
+            mark_notification_read(notif, 'admin')
+        
+        elif notif and action == 'approve_vendor':
+            vendors_db[notif['username']] = {
+                'password': 'vendor123',
+                'role': 'vendor',
+                'name': notif['name'],
+                'email': notif['email'],
+                'phone': notif['phone']
+            }
+            mark_notification_read(notif, 'admin')
         
         return redirect(url_for('admin_notifications'))
     
@@ -1462,13 +4726,27 @@ def admin_notifications():
     
     <div style="margin-bottom: 20px;">
         <span style="padding: 10px 20px; background: #e3f2fd; border-radius: 5px;">
-            📊 Total: {{ notifications|length }} | ✉️ Unread: {{ unread_count }}
+            📊 Total: <span id="total-count">{{ notifications|length }}</span> | ✉️ Unread: <span id="unread-count">{{ unread_count }}</span>
         </span>
     </div>
     
+    <div style="margin-bottom: 20px;">
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="mark_all_read">
+            <button type="submit" class="btn btn-info">📖 Mark All as Read</button>
+        </form>
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="archive">
+            <button type="submit" class="btn btn-warning">🗄️ Archive Read (older than {{ retention_days }} days)</button>
+        </form>
+    </div>
+    
+    <div id="live-notifications"></div>
+    
     {% if notifications %}
         {% for notif in notifications %}
-        <div class="notification-item {% if not notif.read %}unread{% endif %}">
+        {% set is_read = notif.read or notif.id <= read_watermark %}
+        <div class="notification-item {% if not is_read %}unread{% endif %}">
             <div style="display: flex; justify-content: space-between; align-items: start;">
                 <div>
                     <h3 style="margin-bottom: 10px;">
@@ -1481,7 +4759,7 @@ def admin_notifications():
                     <p style="color: #999; font-size: 14px; margin-top: 10px;">📅 {{ notif.date }}</p>
                 </div>
                 <div>
-                    {% if notif.type == 'vendor_registration' and not notif.read %}
+                    {% if notif.type == 'vendor_registration' and not is_read %}
                     <form method="POST" style="display: inline;">
                         <input type="hidden" name="action" value="approve_vendor">
                         <input type="hidden" name="notification_id" value="{{ notif.id }}">
@@ -1493,7 +4771,7 @@ def admin_notifications():
                         <button type="submit" class="btn btn-danger">❌ Reject</button>
                     </form>
                     {% endif %}
-                    {% if not notif.read %}
+                    {% if not is_read %}
                     <form method="POST" style="display: inline;">
                         <input type="hidden" name="action" value="mark_read">
                         <input type="hidden" name="notification_id" value="{{ notif.id }}">
@@ -1509,10 +4787,20 @@ def admin_notifications():
     {% else %}
     <p style="color: #999; text-align: center; padding: 40px;">No notifications yet.</p>
     {% endif %}
-    """)
+    """ + LIVE_NOTIFICATIONS_SCRIPT.replace('STREAM_URL', '/admin/notifications/stream'))
     
-    unread_count = sum(1 for n in notifications_db if not n['read'])
-    return render_template_string(template, notifications=notifications_db, unread_count=unread_count)
+    return render_template_string(template, notifications=notifications_db,
+                                  unread_count=notification_unread_counts.get('admin', 0),
+                                  read_watermark=notification_read_watermarks.get('admin', 0),
+                                  retention_days=NOTIFICATION_RETENTION_DAYS)
+
+
+@app.route('/admin/notifications/stream')
+def admin_notifications_stream():
+    """Live admin notifications (Server-Sent Events)"""
+    if 'username' not in session or session.get('role') != 'admin':
+        return Response(status=401)
+    return sse_response('admin')
 
 
 @app.route('/admin/profile', methods=['GET', 'POST'])
@@ -1568,13 +4856,20 @@ def vendor_products():
     
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
-        <div><a href="/vendor/dashboard">🏠 Dashboard</a><a href="/vendor/add-item">➕ Add Item</a></div>
+        <div><a href="/vendor/dashboard">🏠 Dashboard</a><a href="/vendor/add-item">➕ Add Item</a><a href="/vendor/bulk-import">📥 Bulk Import</a></div>
         <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
     </div>
     
     <h1>📦 My Products</h1>
     
     {% if products %}
+    <form method="POST" action="/vendor/bulk-stock" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px;">
+        <div class="form-group">
+            <label>Bulk Stock Update (one per line: product_id,+5 &nbsp;or&nbsp; product_id,-2 &nbsp;or&nbsp; product_id,=40)</label>
+            <textarea name="updates" rows="4" placeholder="{{ products[0].id }},+10"></textarea>
+        </div>
+        <button type="submit" class="btn btn-success">📦 Apply All</button>
+    </form>
     <div class="cards">
         {% for product in products %}
         <div class="product-card">
@@ -1585,6 +4880,7 @@ def vendor_products():
             <form method="POST" action="/vendor/add-stock" style="margin-top: 10px;">
                 <input type="hidden" name="product_id" value="{{ product.id }}">
                 <input type="number" name="add_qty" placeholder="+ Add items" min="1" style="width: 90px; padding: 8px; margin-right: 5px;">
+                {{ idempotency_field() }}
                 <button type="submit" class="btn btn-success">➕ Add Item</button>
             </form>
             <form method="POST" action="/vendor/delete-product" style="display: inline;">
@@ -1622,6 +4918,7 @@ def vendor_add_item():
             'date_added': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         products_db.append(product)
+        index_product(product)
         product_id_counter[0] += 1
         return redirect(url_for('vendor_products'))
     
@@ -1656,11 +4953,140 @@ def vendor_add_item():
     </form>
     """)
     
-    return render_template_string(template)
+    return render_template_string(template)
+
+
+@app.route('/vendor/bulk-import', methods=['GET', 'POST'])
+def vendor_bulk_import():
+    """Bulk product import from a CSV or JSON-lines upload"""
+    if 'username' not in session or session.get('role') != 'vendor':
+        return redirect(url_for('vendor_login'))
+    
+    report = None
+    error = None
+    
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            error = "Please choose a CSV or JSON-lines file to upload."
+        else:
+            fmt = detect_import_format(upload.filename, request.form.get('format', 'auto'))
+            report = import_products(upload.stream, fmt, session['username'])
+            error = report['error']
+        
+        if request.accept_mimetypes.best == 'application/json':
+            if report is None:
+                return jsonify({'error': error}), 400
+            return jsonify(report), 400 if error else 200
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/vendor/dashboard">🏠 Dashboard</a><a href="/vendor/products">📦 My Products</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>📥 Bulk Import Products</h1>
+    
+    {% if error %}
+    <div class="alert alert-error">{{ error }}</div>
+    {% endif %}
+    
+    {% if report %}
+    <div class="alert {% if report.failed %}alert-warning{% endif %}">
+        Processed {{ report.rows }} row(s): {{ report.imported }} imported, {{ report.failed }} rejected.
+    </div>
+    {% if report.errors %}
+    <table>
+        <tr><th>Row</th><th>Problems</th></tr>
+        {% for item in report.errors %}
+        <tr><td>{{ item.row }}</td><td>{{ item.errors|join('; ') }}</td></tr>
+        {% endfor %}
+    </table>
+    {% if report.failed > report.errors|length %}
+    <p style="color: #999; margin-top: 10px;">Showing the first {{ report.errors|length }} of {{ report.failed }} rejected rows.</p>
+    {% endif %}
+    {% endif %}
+    {% endif %}
+    
+    <form method="POST" enctype="multipart/form-data" style="max-width: 600px; margin-top: 20px;">
+        <div class="form-group"><label>File (CSV or JSON lines) *</label><input type="file" name="file" accept=".csv,.jsonl,.ndjson,.json" required></div>
+        <div class="form-group">
+            <label>Format</label>
+            <select name="format">
+                <option value="auto">Detect from file name</option>
+                <option value="csv">CSV</option>
+                <option value="jsonl">JSON lines</option>
+            </select>
+        </div>
+        <button type="submit" class="btn btn-success">📥 Import</button>
+        <a href="/vendor/products" class="btn btn-danger">Cancel</a>
+    </form>
+    
+    <div class="alert alert-warning" style="margin-top: 30px; max-width: 600px;">
+        Each row needs <strong>name</strong>, <strong>description</strong>, <strong>price</strong>,
+        <strong>stock</strong> and <strong>category</strong> (one of: {{ categories|join(', ') }}).
+        CSV files need a header row.
+    </div>
+    """)
+    
+    return render_template_string(template, report=report, error=error, categories=PRODUCT_CATEGORIES)
+
+
+@app.route('/vendor/bulk-stock', methods=['POST'])
+def vendor_bulk_stock():
+    """Apply many stock changes in one request"""
+    if 'username' not in session or session.get('role') != 'vendor':
+        return redirect(url_for('vendor_login'))
+    
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        updates = payload.get('updates') if isinstance(payload, dict) else payload
+        if not isinstance(updates, list) or not all(isinstance(u, dict) for u in updates):
+            return jsonify({'error': "Expected a list of updates"}), 400
+        changes, errors = apply_stock_updates(updates, session['username'])
+    else:
+        updates, errors = parse_stock_updates_text(request.form.get('updates', ''))
+        changes = []
+        if not errors:
+            changes, errors = apply_stock_updates(updates, session['username'])
+    
+    if payload is not None or request.accept_mimetypes.best == 'application/json':
+        summary = {'applied': not errors, 'changed': changes, 'errors': errors}
+        return jsonify(summary), (400 if errors else 200)
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/vendor/dashboard">🏠 Dashboard</a><a href="/vendor/products">📦 My Products</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>📦 Bulk Stock Update</h1>
+    
+    {% if errors %}
+    <div class="alert alert-error">No changes were applied:
+        <ul style="margin: 10px 0 0 20px;">{% for error in errors %}<li>{{ error }}</li>{% endfor %}</ul>
+    </div>
+    {% elif changes %}
+    <div class="alert">Updated stock for {{ changes|length }} product(s).</div>
+    <table>
+        <tr><th>ID</th><th>Product</th><th>Old Stock</th><th>New Stock</th></tr>
+        {% for change in changes %}
+        <tr><td>{{ change.product_id }}</td><td>{{ change.name }}</td><td>{{ change.old_stock }}</td><td>{{ change.new_stock }}</td></tr>
+        {% endfor %}
+    </table>
+    {% else %}
+    <div class="alert alert-warning">No updates were submitted.</div>
+    {% endif %}
+    
+    <a href="/vendor/products" class="btn" style="margin-top: 20px;">← Back to My Products</a>
+    """)
+    
+    return render_template_string(template, changes=changes, errors=errors)
 
 
 @app.route('/vendor/update-product', methods=['POST'])
 @app.route('/vendor/add-stock', methods=['POST'])
+@idempotent
 def vendor_add_stock():
     """Add items to existing product stock"""
     if 'username' not in session or session.get('role') != 'vendor':
@@ -1700,29 +5126,43 @@ def vendor_delete_product():
     
     product_id = int(request.form.get('product_id'))
     products_db[:] = [p for p in products_db if not (p['id'] == product_id and p['added_by'] == session['username'])]
+    product = product_index.get(product_id)
+    if product and product['added_by'] == session['username']:
+        unindex_product(product)
     
     return redirect(url_for('vendor_products'))
 
 
-@app.route('/vendor/transactions')
+@app.route('/vendor/transactions', methods=['GET', 'POST'])
 def vendor_transactions():
-    """View vendor transactions - FULLY FUNCTIONAL"""
+    """View vendor transactions and drive order fulfillment - FULLY FUNCTIONAL"""
     if 'username' not in session or session.get('role') != 'vendor':
         return redirect(url_for('vendor_login'))
 
     username = session['username']
+    status = request.args.get('status', '')
+
+    if request.method == 'POST':
+        order_ids = [int(order_id) for order_id in request.form.getlist('order_ids') if order_id.isdigit()]
+        bulk_set_fulfillment_status(username, order_ids, request.form.get('new_status'))
+        return redirect(url_for('vendor_transactions', status=status or None))
+
+    if status in ORDER_TRANSITIONS:
+        order_ids = list(fulfillment_index.get((username, status), {}))
+    else:
+        status = ''
+        order_ids = vendor_order_ids.get(username, [])
+
     vendor_orders = []
 
     try:
-        for order in orders_db:
+        for order_id in order_ids:
+            order = order_index[order_id]
             order_items = []
             order_total = 0
 
             for product_id, qty in order['items']:
-                product = next(
-                    (p for p in products_db if p['id'] == product_id),
-                    None
-                )
+                product = product_index.get(product_id)
 
                 if product and product['added_by'] == username:
                     item_total = product['price'] * qty
@@ -1734,15 +5174,15 @@ def vendor_transactions():
                     })
                     order_total += item_total
 
-            if order_items:
-                vendor_orders.append({
-                    'order_id': order['id'],
-                    'username': order['username'],
-                    'items': order_items,
-                    'total': order_total,
-                    'date': order['date'],
-                    'status': order['status']
-                })
+            vendor_orders.append({
+                'order_id': order['id'],
+                'username': order['username'],
+                'items': order_items,
+                'total': order_total,
+                'date': order['date'],
+                'status': order['fulfillment'].get(username, order['status']),
+                'next_statuses': ORDER_TRANSITIONS.get(order['fulfillment'].get(username), ())
+            })
 
         template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
         <div class="nav">
@@ -1752,15 +5192,33 @@ def vendor_transactions():
 
         <h1>💰 My Transactions</h1>
 
+        <div style="margin-bottom: 20px;">
+            <a href="{{ url_for('vendor_transactions') }}" class="btn {% if not status %}btn-info{% endif %}">All ({{ total_orders }})</a>
+            {% for name, count in counts.items() %}
+            <a href="{{ url_for('vendor_transactions', status=name) }}" class="btn {% if status == name %}btn-info{% endif %}">{{ name }} ({{ count }})</a>
+            {% endfor %}
+        </div>
+
         {% if orders %}
+            <form method="POST" id="bulk-status" style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+                <label style="display: inline;">Set selected orders to</label>
+                <select name="new_status" style="width: auto; padding: 8px;">
+                    {% for name in statuses %}<option value="{{ name }}">{{ name }}</option>{% endfor %}
+                </select>
+                <button type="submit" class="btn btn-success" onclick="return confirm('Update the selected orders? Cancelling returns their stock.')">✔ Apply</button>
+            </form>
+
             {% for order in orders %}
             <div style="background: #f8f9fa; padding: 20px; margin-bottom: 20px; border-radius: 5px; border-left: 4px solid #667eea;">
-                <h3>Order #{{ order.order_id }}</h3>
-                <p>Customer: {{ order.username }}</p>
+                <h3>
+                    {% if order.next_statuses %}<input type="checkbox" name="order_ids" value="{{ order.order_id }}" form="bulk-status" style="width: auto;">{% endif %}
+                    Order #{{ order.order_id }} <small style="color: #666;">({{ order.status }})</small>
+                </h3>
+                <p>Customer: {{ order.username }} &nbsp; 📅 {{ order.date }}</p>
 
                 <table style="width: 100%;">
                     <tr><th>Product</th><th>Qty</th><th>Price</th><th>Total</th></tr>
-                    {% for item in order.items %}
+                    {% for item in order['items'] %}
                     <tr>
                         <td>{{ item.product_name }}</td>
                         <td>{{ item.quantity }}</td>
@@ -1771,6 +5229,13 @@ def vendor_transactions():
                 </table>
 
                 <p><strong>Your Earnings: ₹{{ order.total }}</strong></p>
+                {% for next_status in order.next_statuses %}
+                <form method="POST" style="display: inline;">
+                    <input type="hidden" name="order_ids" value="{{ order.order_id }}">
+                    <input type="hidden" name="new_status" value="{{ next_status }}">
+                    <button type="submit" class="btn {% if next_status == 'Cancelled' %}btn-danger{% else %}btn-info{% endif %}">{{ next_status }}</button>
+                </form>
+                {% endfor %}
             </div>
             {% endfor %}
 
@@ -1780,12 +5245,17 @@ def vendor_transactions():
         {% endif %}
         """)
 
-        total_earnings = sum(order['total'] for order in vendor_orders)
+        total_earnings = sum(order['total'] for order in vendor_orders if order['status'] != 'Cancelled')
+        counts = {name: len(fulfillment_index.get((username, name), {})) for name in ORDER_TRANSITIONS}
 
         return render_template_string(
             template,
             orders=vendor_orders,
-            total_earnings=total_earnings
+            total_earnings=total_earnings,
+            status=status,
+            counts=counts,
+            statuses=list(ORDER_TRANSITIONS),
+            total_orders=len(vendor_order_ids.get(username, []))
         )
 
     except Exception as e:
@@ -1801,16 +5271,20 @@ def vendor_notifications():
     
     username = session['username']
     
+    channel = 'vendor:' + username
+    
     if request.method == 'POST':
-        notification_id = int(request.form.get('notification_id'))
-        for notif in vendor_notifications_db:
-            if notif['id'] == notification_id and notif['vendor_username'] == username:
-                notif['read'] = True
-                break
+        if request.form.get('action') == 'mark_all_read':
+            mark_all_notifications_read(channel)
+            save_all_data()
+        else:
+            notif = vendor_notification_index.get(int(request.form.get('notification_id')))
+            if notif and notif['vendor_username'] == username:
+                mark_notification_read(notif, channel)
         return redirect(url_for('vendor_notifications'))
     
-    my_notifications = [n for n in vendor_notifications_db if n['vendor_username'] == username]
-    unread_count = sum(1 for n in my_notifications if not n['read'])
+    my_notifications = vendor_notifications_by_vendor.get(username, [])
+    unread_count = notification_unread_counts.get(channel, 0)
     
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
@@ -1822,20 +5296,30 @@ def vendor_notifications():
     
     <div style="margin-bottom: 20px;">
         <span style="padding: 10px 20px; background: #e3f2fd; border-radius: 5px;">
-            📊 Total: {{ notifications|length }} | ✉️ Unread: {{ unread_count }}
+            📊 Total: <span id="total-count">{{ notifications|length }}</span> | ✉️ Unread: <span id="unread-count">{{ unread_count }}</span>
         </span>
     </div>
     
+    {% if unread_count %}
+    <form method="POST" style="margin-bottom: 20px;">
+        <input type="hidden" name="action" value="mark_all_read">
+        <button type="submit" class="btn btn-info">📖 Mark All as Read</button>
+    </form>
+    {% endif %}
+    
+    <div id="live-notifications"></div>
+    
     {% if notifications %}
         {% for notif in notifications %}
-        <div class="notification-item {% if not notif.read %}unread{% endif %}">
+        {% set is_read = notif.read or notif.id <= read_watermark %}
+        <div class="notification-item {% if not is_read %}unread{% endif %}">
             <div style="display: flex; justify-content: space-between; align-items: center;">
                 <div>
                     <h3>📢 {{ notif.message }}</h3>
                     <p style="color: #666; margin-top: 10px;">{{ notif.date }}</p>
                 </div>
                 <div>
-                    {% if not notif.read %}
+                    {% if not is_read %}
                     <form method="POST">
                         <input type="hidden" name="notification_id" value="{{ notif.id }}">
                         <button type="submit" class="btn btn-info">📖 Mark as Read</button>
@@ -1850,19 +5334,53 @@ def vendor_notifications():
     {% else %}
     <p style="color: #999; text-align: center; padding: 40px;">No notifications yet.</p>
     {% endif %}
-    """)
+    """ + LIVE_NOTIFICATIONS_SCRIPT.replace('STREAM_URL', '/vendor/notifications/stream'))
     
-    return render_template_string(template, notifications=my_notifications, unread_count=unread_count)
+    return render_template_string(template, notifications=my_notifications, unread_count=unread_count,
+                                  read_watermark=notification_read_watermarks.get(channel, 0))
+
+
+@app.route('/vendor/notifications/stream')
+def vendor_notifications_stream():
+    """Live notifications for the logged-in vendor (Server-Sent Events)"""
+    if 'username' not in session or session.get('role') != 'vendor':
+        return Response(status=401)
+    return sse_response('vendor:' + session['username'])
 
 
-@app.route('/vendor/user-requests')
+@app.route('/vendor/user-requests', methods=['GET', 'POST'])
 def user_requests_vendor():
-    """View user requests - FULLY FUNCTIONAL"""
+    """View and answer user requests - FULLY FUNCTIONAL"""
     if 'username' not in session or session.get('role') != 'vendor':
         return redirect(url_for('vendor_login'))
     
     username = session['username']
-    my_requests = [r for r in user_requests_db if r.get('vendor_username') == username]
+    status = request.args.get('status', '')
+    
+    if request.method == 'POST':
+        user_request = request_index.get(int(request.form.get('request_id')))
+        if user_request and user_request['vendor_username'] == username:
+            if request.form.get('action') == 'quote':
+                try:
+                    quote = round(float(request.form.get('quote')), 2)
+                except (TypeError, ValueError):
+                    quote = None
+                if quote is not None and quote >= 0:
+                    set_request_status(user_request, 'quoted', quote=quote,
+                                       quote_note=request.form.get('quote_note', ''))
+            elif request.form.get('action') == 'close':
+                set_request_status(user_request, 'closed')
+            save_all_data()
+        return redirect(url_for('user_requests_vendor', status=status or None, before=request.args.get('before')))
+    
+    if status in REQUEST_TRANSITIONS:
+        ids = vendor_request_status_ids.get((username, status), [])
+    else:
+        status = ''
+        ids = vendor_request_ids.get(username, [])
+    before = request.args.get('before', type=int)
+    my_requests, next_cursor = request_page(ids, before)
+    counts = {name: len(vendor_request_status_ids.get((username, name), [])) for name in REQUEST_TRANSITIONS}
     
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
@@ -1872,21 +5390,144 @@ def user_requests_vendor():
     
     <h1>📨 User Requests</h1>
     
+    <div style="margin-bottom: 20px;">
+        <a href="{{ url_for('user_requests_vendor') }}" class="btn {% if not status %}btn-info{% endif %}">All ({{ total }})</a>
+        {% for name, count in counts.items() %}
+        <a href="{{ url_for('user_requests_vendor', status=name) }}" class="btn {% if status == name %}btn-info{% endif %}">{{ name|capitalize }} ({{ count }})</a>
+        {% endfor %}
+    </div>
+    
     {% if requests %}
         {% for req in requests %}
-        <div class="notification-item">
-            <h3>Request from: {{ req.username }}</h3>
+        <div class="notification-item {% if req.status == 'open' %}unread{% endif %}">
+            <h3>#{{ req.id }} Request from: {{ req.username }} <small style="color: #666;">({{ req.kind|default('item') }}, {{ req.status }})</small></h3>
             <p><strong>Product:</strong> {{ req.product_name }}</p>
             <p><strong>Message:</strong> {{ req.message }}</p>
+            {% if req.quote is defined %}<p><strong>Your quote:</strong> ₹{{ req.quote }} {{ req.quote_note }}</p>{% endif %}
             <p style="color: #666; margin-top: 10px;">📅 {{ req.date }}</p>
+            {% if req.status == 'open' %}
+            <form method="POST" style="margin-top: 10px;">
+                <input type="hidden" name="action" value="quote">
+                <input type="hidden" name="request_id" value="{{ req.id }}">
+                <input type="number" name="quote" step="0.01" min="0" placeholder="Quote (₹)" required style="width: 140px; padding: 8px;">
+                <input type="text" name="quote_note" placeholder="Note (optional)" style="width: 250px; padding: 8px;">
+                <button type="submit" class="btn btn-success">💬 Send Quote</button>
+            </form>
+            {% endif %}
+            {% if req.status != 'closed' %}
+            <form method="POST" style="display: inline;">
+                <input type="hidden" name="action" value="close">
+                <input type="hidden" name="request_id" value="{{ req.id }}">
+                <button type="submit" class="btn btn-danger">✖ Close</button>
+            </form>
+            {% endif %}
         </div>
         {% endfor %}
+        {% if next_cursor %}
+        <a href="{{ url_for('user_requests_vendor', status=status or None, before=next_cursor) }}" class="btn">Older requests →</a>
+        {% endif %}
     {% else %}
     <p style="color: #999; text-align: center; padding: 40px;">No user requests yet.</p>
     {% endif %}
     """)
     
-    return render_template_string(template, requests=my_requests)
+    return render_template_string(template, requests=my_requests, next_cursor=next_cursor, status=status,
+                                  counts=counts, total=len(vendor_request_ids.get(username, [])))
+
+
+@app.route('/vendor/availability', methods=['GET', 'POST'])
+def vendor_availability_page():
+    """Publish the days on which the vendor can take bookings"""
+    if 'username' not in session or session.get('role') != 'vendor':
+        return redirect(url_for('vendor_login'))
+    
+    username = session['username']
+    error = None
+    
+    if request.method == 'POST':
+        try:
+            start = date.fromisoformat(request.form.get('start', ''))
+            end = date.fromisoformat(request.form.get('end') or request.form.get('start', ''))
+            weekdays = [int(day) for day in request.form.getlist('weekdays')] or None
+            set_vendor_availability(username, start, end, request.form.get('status') == 'available', weekdays)
+            save_all_data()
+            return redirect(url_for('vendor_availability_page', month=start.strftime('%Y-%m')))
+        except ValueError as e:
+            error = str(e) or "Please enter valid dates."
+    
+    try:
+        first = datetime.strptime(request.args.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        first = date.today().replace(day=1)
+    
+    months = []
+    for i in range(3):
+        month_start = add_months(first, i)
+        weeks = calendar.Calendar().monthdatescalendar(month_start.year, month_start.month)
+        try:
+            free = set(vendor_available_days(username, weeks[0][0], weeks[-1][-1]))
+        except ValueError:
+            free = set()
+        months.append({'title': month_start.strftime('%B %Y'), 'month': month_start.month,
+                       'weeks': weeks, 'free': free})
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/vendor/dashboard">🏠 Dashboard</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>📅 My Availability</h1>
+    
+    {% if error %}
+    <div class="alert alert-error">{{ error }}</div>
+    {% endif %}
+    
+    <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
+        <div class="form-group"><label>From *</label><input type="date" name="start" required></div>
+        <div class="form-group"><label>To (leave empty for a single day)</label><input type="date" name="end"></div>
+        <div class="form-group">
+            <label>Only on (leave all unchecked for every day)</label>
+            {% for name in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'] %}
+            <label style="display: inline; margin-right: 10px;"><input type="checkbox" name="weekdays" value="{{ loop.index0 }}" style="width: auto;"> {{ name }}</label>
+            {% endfor %}
+        </div>
+        <div class="form-group">
+            <label>Mark as</label>
+            <select name="status"><option value="available">Available</option><option value="unavailable">Unavailable</option></select>
+        </div>
+        <button type="submit" class="btn btn-success">💾 Save</button>
+    </form>
+    
+    <div style="margin-bottom: 20px;">
+        <a href="{{ url_for('vendor_availability_page', month=prev_month) }}" class="btn">← Earlier</a>
+        <a href="{{ url_for('vendor_availability_page', month=next_month) }}" class="btn">Later →</a>
+    </div>
+    
+    <div class="cards">
+    {% for month in months %}
+        <div>
+            <h3>{{ month.title }}</h3>
+            <table>
+                <tr>{% for name in ['Mo', 'Tu', 'We', 'Th', 'Fr', 'Sa', 'Su'] %}<th>{{ name }}</th>{% endfor %}</tr>
+                {% for week in month.weeks %}
+                <tr>
+                    {% for day in week %}
+                    {% if day.month != month.month %}<td></td>
+                    {% elif day in month.free %}<td style="background: #27ae60; color: white; text-align: center;">{{ day.day }}</td>
+                    {% else %}<td style="color: #999; text-align: center;">{{ day.day }}</td>{% endif %}
+                    {% endfor %}
+                </tr>
+                {% endfor %}
+            </table>
+        </div>
+    {% endfor %}
+    </div>
+    """)
+    
+    return render_template_string(template, months=months, error=error,
+                                  prev_month=add_months(first, -3).strftime('%Y-%m'),
+                                  next_month=add_months(first, 3).strftime('%Y-%m'))
 
 
 @app.route('/vendor/profile', methods=['GET', 'POST'])
@@ -1972,6 +5613,7 @@ def user_browse_products():
                 <input type="hidden" name="product_id" value="{{ product.id }}">
                 <input type="number" name="quantity" value="1" min="1" max="{{ product.stock }}" 
                        style="width: 80px; padding: 8px; margin-right: 10px;">
+                {{ idempotency_field() }}
                 <button type="submit" class="btn btn-success">🛒 Add to Cart</button>
             </form>
             {% else %}
@@ -1989,6 +5631,7 @@ def user_browse_products():
 
 
 @app.route('/user/add-to-cart', methods=['POST'])
+@idempotent
 def user_add_to_cart():
     """Add product to cart - FULLY FUNCTIONAL"""
     if 'username' not in session or session.get('role') != 'user':
@@ -2021,9 +5664,20 @@ def view_vendors():
 
 
     product_counts = {}
-    for product in products_db:
-        vendor = product['added_by']
-        product_counts[vendor] = product_counts.get(vendor, 0) + 1
+    for vendors in category_vendors.values():
+        for vendor, count in vendors.items():
+            product_counts[vendor] = product_counts.get(vendor, 0) + count
+
+    category = request.args.get('category') or None
+    error = None
+    vendors = vendors_db
+    try:
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else None
+        if day or category:
+            names = available_vendors(day, category=category) if day else category_vendors.get(category, {})
+            vendors = {name: vendors_db[name] for name in names if name in vendors_db}
+    except ValueError as e:
+        error = str(e) or "Please enter a valid date."
 
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
@@ -2033,6 +5687,21 @@ def view_vendors():
 
     <h1>🏪 Available Vendors</h1>
 
+    {% if error %}
+    <div class="alert alert-error">{{ error }}</div>
+    {% endif %}
+
+    <form method="GET" style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+        <label style="display: inline;">Free on</label>
+        <input type="date" name="date" value="{{ request.args.get('date', '') }}" style="width: auto; padding: 8px;">
+        <label style="display: inline;">Category</label>
+        <select name="category" style="width: auto; padding: 8px;">
+            <option value="">Any</option>
+            {% for name in categories %}<option value="{{ name }}" {% if request.args.get('category') == name %}selected{% endif %}>{{ name }}</option>{% endfor %}
+        </select>
+        <button type="submit" class="btn btn-info">🔍 Find</button>
+    </form>
+
     <table>
         <tr><th>Name</th><th>Email</th><th>Phone</th><th>Products</th></tr>
         {% for username, v in vendors.items() %}
@@ -2048,11 +5717,33 @@ def view_vendors():
 
     return render_template_string(
         template,
-        vendors=vendors_db,
-        product_counts=product_counts
+        vendors=vendors,
+        product_counts=product_counts,
+        categories=PRODUCT_CATEGORIES,
+        error=error
     )
 
+
+@app.route('/user/vendors/available')
+def available_vendors_api():
+    """JSON: vendors free on ?date=YYYY-MM-DD (through optional ?end=), optionally in ?category="""
+    if 'username' not in session:
+        return jsonify({'error': 'login required'}), 401
+    
+    try:
+        start = date.fromisoformat(request.args.get('date', ''))
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else start
+        names = available_vendors(start, end, request.args.get('category') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e) or 'invalid date'}), 400
+    
+    return jsonify({'date': start.isoformat(), 'end': end.isoformat(),
+                    'category': request.args.get('category') or None,
+                    'vendors': [{'username': name, 'name': vendors_db[name]['name']}
+                                for name in names if name in vendors_db]})
+
 @app.route('/user/cart', methods=['GET', 'POST'])
+@idempotent
 def view_cart():
     """View shopping cart - FULLY FUNCTIONAL"""
     global cart_db, orders_db, order_id_counter
@@ -2085,31 +5776,42 @@ def view_cart():
         elif action == 'checkout':
             try:
                 if username in cart_db and cart_db[username]:
-                    order_items = []
-                    total = 0
-
-                    for product_id, qty in cart_db[username].items():
-                        product = next((p for p in products_db if p['id'] == product_id), None)
-                        if product and product['stock'] >= qty:
-                            order_items.append((product_id, qty))
-                            total += product['price'] * qty
-                            product['stock'] -= qty
-
-                    if order_items:
-                        order = {
-                            'id': order_id_counter[0],
-                            'username': username,
-                            'items': order_items,
-                            'total': total,
-                            'status': 'Confirmed',
-                            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-
-                        orders_db.append(order)
-                        order_id_counter[0] += 1
-                        cart_db[username] = {}
-
-                        save_all_data()
+                    order = None
+                    event = event_index.get(request.form.get('event_id', type=int))
+                    if event and (event['username'] != username or event['status'] != 'Scheduled'):
+                        event = None
+                    with data_lock:
+                        fillable = {}
+                        for product_id, qty in cart_db[username].items():
+                            product = product_index.get(product_id)
+                            if product and product['stock'] >= qty:
+                                fillable[product_id] = qty
+                                product['stock'] -= qty
+
+                        if fillable:
+                            lines, subtotal, total = price_cart(username, fillable)
+                            order = {
+                                'id': order_id_counter[0],
+                                'username': username,
+                                'items': list(fillable.items()),
+                                'total': total,
+                                'discount': round(subtotal - total, 2),
+                                'status': 'Confirmed',
+                                'fulfillment': {vendor: 'Confirmed' for vendor in order_vendors(fillable.items())},
+                                'event_id': event['id'] if event else None,
+                                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                            }
+
+                            orders_db.append(order)
+                            index_order(order)
+                            order_id_counter[0] += 1
+                            cart_db[username] = {}
+
+                            save_all_data()
+
+                    if order:
+                        publish_order_event(order, [(line['product']['id'], line['quantity'], line['unit_price'])
+                                                    for line in lines])
                         return redirect(url_for('user_orders'))
 
             except Exception as e:
@@ -2119,19 +5821,7 @@ def view_cart():
 
     
     # Calculate cart details
-    cart_items = []
-    total = 0
-    if username in cart_db:
-        for product_id, qty in cart_db[username].items():
-            product = next((p for p in products_db if p['id'] == product_id), None)
-            if product:
-                item_total = product['price'] * qty
-                cart_items.append({
-                    'product': product,
-                    'quantity': qty,
-                    'total': item_total
-                })
-                total += item_total
+    cart_items, subtotal, total = price_cart(username, cart_db.get(username, {}))
     
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
@@ -2147,7 +5837,14 @@ def view_cart():
         {% for item in cart_items %}
         <tr>
             <td>{{ item.product.name }}</td>
-            <td>₹{{ item.product.price }}</td>
+            <td>
+                {% if item.discount %}
+                <s style="color: #999;">₹{{ item.product.price }}</s> ₹{{ item.unit_price }}
+                <br><small style="color: #27ae60;">🏷️ {{ item.discount }}</small>
+                {% else %}
+                ₹{{ item.product.price }}
+                {% endif %}
+            </td>
             <td>
                 <form method="POST" style="display: inline;">
                     <input type="hidden" name="action" value="update">
@@ -2168,6 +5865,12 @@ def view_cart():
             </td>
         </tr>
         {% endfor %}
+        {% if subtotal > total %}
+        <tr>
+            <td colspan="3" style="text-align: right; color: #27ae60;">You save:</td>
+            <td colspan="2" style="color: #27ae60;">₹{{ (subtotal - total)|round(2) }}</td>
+        </tr>
+        {% endif %}
         <tr style="background: #667eea; color: white; font-weight: bold;">
             <td colspan="3" style="text-align: right;">Grand Total:</td>
             <td colspan="2">₹{{ total }}</td>
@@ -2177,6 +5880,14 @@ def view_cart():
     <div style="margin-top: 30px; text-align: right;">
         <form method="POST" style="display: inline;">
             <input type="hidden" name="action" value="checkout">
+            {{ idempotency_field() }}
+            {% if events %}
+            <label style="display: inline;">For event</label>
+            <select name="event_id" style="width: auto; padding: 8px; margin-right: 10px;">
+                <option value="">-- None --</option>
+                {% for event in events %}<option value="{{ event.id }}">{{ event.name }} ({{ event.start }})</option>{% endfor %}
+            </select>
+            {% endif %}
             <button type="submit" class="btn btn-success" style="font-size: 18px; padding: 15px 40px;">
                 🎉 Proceed to Checkout
             </button>
@@ -2189,7 +5900,8 @@ def view_cart():
     {% endif %}
     """)
     
-    return render_template_string(template, cart_items=cart_items, total=total)
+    return render_template_string(template, cart_items=cart_items, subtotal=subtotal, total=total,
+                                  events=user_events(username, scheduled_only=True))
 
 
 @app.route('/user/orders')
@@ -2224,6 +5936,7 @@ def user_orders():
             'items': items,
             'total': order['total'],
             'status': order['status'],
+            'event': event_index.get(order.get('event_id')),
             'date': order['date']
         })
     
@@ -2242,6 +5955,7 @@ def user_orders():
                 <div>
                     <h3>Order #{{ order.id }}</h3>
                     <p style="color: #666; font-size: 14px;">{{ order.date }}</p>
+                    {% if order.event %}<p style="color: #667eea; font-size: 14px;">📅 {{ order.event.name }}</p>{% endif %}
                 </div>
                 <div>
                     <span style="padding: 8px 15px; background: #27ae60; color: white; border-radius: 5px; font-weight: bold;">
@@ -2252,7 +5966,7 @@ def user_orders():
             
             <table style="width: 100%; background: white;">
                 <tr><th>Product</th><th>Quantity</th><th>Price</th><th>Total</th></tr>
-                {% for item in order.items %}
+                {% for item in order['items'] %}
                 <tr><td>{{ item.name }}</td><td>{{ item.quantity }}</td><td>₹{{ item.price }}</td><td>₹{{ item.total }}</td></tr>
                 {% endfor %}
                 <tr style="background: #667eea; color: white; font-weight: bold;">
@@ -2281,31 +5995,57 @@ def user_guest_list():
 
     
     username = session['username']
+    error = None
     
     if request.method == 'POST':
         action = request.form.get('action')
         
         if action == 'add':
-            guest = {
-                'id': guest_id_counter[0],
-                'username': username,
-                'guest_name': request.form.get('guest_name'),
-                'guest_email': request.form.get('guest_email'),
-                'guest_phone': request.form.get('guest_phone'),
-                'event': request.form.get('event'),
-                'date_added': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            guest_list_db.append(guest)
-            guest_id_counter[0] += 1
+            with data_lock:
+                duplicate_of = find_duplicate_guest(username, request.form.get('event'),
+                                                    request.form.get('guest_email'),
+                                                    request.form.get('guest_phone'))
+                has_room = event_capacity_left(username, request.form.get('event'))
+                if duplicate_of is None and has_room:
+                    guest = {
+                        'id': guest_id_counter[0],
+                        'username': username,
+                        'guest_name': request.form.get('guest_name'),
+                        'guest_email': request.form.get('guest_email'),
+                        'guest_phone': request.form.get('guest_phone'),
+                        'event': request.form.get('event'),
+                        'date_added': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                    guest_list_db.append(guest)
+                    index_guest(guest)
+                    guest_id_counter[0] += 1
+            if duplicate_of is not None:
+                error = f"A guest with this email or phone is already on the list for this event (guest #{duplicate_of})."
+            elif not has_room:
+                error = "This event is already at full capacity."
         
         elif action == 'delete':
             guest_id = int(request.form.get('guest_id'))
-            guest_list_db[:] = [g for g in guest_list_db 
-                                if not (g['id'] == guest_id and g['username'] == username)]
+            with data_lock:
+                for guest in guest_list_db:
+                    if guest['id'] == guest_id and guest['username'] == username:
+                        unindex_guest(guest)
+                guest_list_db[:] = [g for g in guest_list_db 
+                                    if not (g['id'] == guest_id and g['username'] == username)]
         
-        return redirect(url_for('user_guest_list'))
+        elif action == 'import':
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                error = "Please choose a CSV or JSON-lines file to import."
+            else:
+                fmt = detect_import_format(upload.filename, request.form.get('format', 'auto'))
+                start_guest_import(upload, fmt, username, (request.form.get('event') or '').strip())
+        
+        if not error:
+            return redirect(url_for('user_guest_list'))
     
     my_guests = [g for g in guest_list_db if g['username'] == username]
+    my_imports = [j for j in guest_import_jobs.values() if j['username'] == username][-3:]
     
     template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
     <div class="nav">
@@ -2315,16 +6055,77 @@ def user_guest_list():
     
     <h1>👥 Guest List Management</h1>
     
+    {% if error %}
+    <div class="alert alert-error">{{ error }}</div>
+    {% endif %}
+    
+    {% for job in imports|reverse %}
+    <div class="alert {% if job.status == 'failed' %}alert-error{% elif job.status == 'running' %}alert-warning{% endif %} import-job"
+         data-job-id="{{ job.id }}" data-status="{{ job.status }}">
+        📥 Import of <strong>{{ job.filename }}</strong>:
+        <span class="import-progress">{{ job.status }} — {{ job.rows }} row(s) read, {{ job.imported }} added,
+        {{ job.duplicates }} duplicate(s), {{ job.failed }} rejected</span>
+        {% if job.message %}<br>{{ job.message }}{% endif %}
+        {% if job.errors and job.status != 'running' %}
+        <details style="margin-top: 10px;"><summary>Skipped rows ({{ job.errors|length }} shown)</summary>
+            <ul style="margin: 10px 0 0 20px;">{% for item in job.errors %}<li>Row {{ item.row }}: {{ item.errors|join('; ') }}</li>{% endfor %}</ul>
+        </details>
+        {% endif %}
+    </div>
+    {% endfor %}
+    
     <h2>Add New Guest</h2>
     <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
         <input type="hidden" name="action" value="add">
         <div class="form-group"><label>Guest Name *</label><input type="text" name="guest_name" required></div>
         <div class="form-group"><label>Guest Email *</label><input type="email" name="guest_email" required></div>
         <div class="form-group"><label>Guest Phone *</label><input type="tel" name="guest_phone" required pattern="[0-9]{10}"></div>
-        <div class="form-group"><label>Event/Occasion *</label><input type="text" name="event" placeholder="e.g., Tech Conference 2026" required></div>
+        <div class="form-group"><label>Event/Occasion *</label><input type="text" name="event" list="my-events" placeholder="e.g., Tech Conference 2026" required></div>
         <button type="submit" class="btn btn-success">➕ Add Guest</button>
     </form>
     
+    <h2>Import Guests</h2>
+    <form method="POST" enctype="multipart/form-data" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
+        <input type="hidden" name="action" value="import">
+        <div class="form-group">
+            <label>File (CSV or JSON lines with guest_name, guest_email, guest_phone and optional event) *</label>
+            <input type="file" name="file" accept=".csv,.jsonl,.ndjson,.json" required>
+        </div>
+        <div class="form-group"><label>Event/Occasion (used when a row has none)</label><input type="text" name="event" list="my-events" placeholder="e.g., Tech Conference 2026"></div>
+        <button type="submit" class="btn btn-success">📥 Import Guests</button>
+    </form>
+    <datalist id="my-events">{% for event in events %}<option value="{{ event.name }}">{% endfor %}</datalist>
+    
+    {% if event_counts %}
+    <h2>Check-in Status</h2>
+    <table style="margin-bottom: 30px;">
+        <tr><th>Event</th><th>Checked In</th><th>Invited</th></tr>
+        {% for counts in event_counts %}
+        <tr><td>{{ counts.event }}</td><td>{{ counts.checked_in }}</td><td>{{ counts.invited }}</td></tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
+    {% if guests %}
+    <h2>Send Invitations</h2>
+    <form method="POST" action="/user/guest-list/invite" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
+        <div class="form-group">
+            <label>Event</label>
+            <select name="event">
+                <option value="">All events</option>
+                {% for counts in event_counts %}
+                <option value="{{ counts.event }}">{{ counts.event }}</option>
+                {% endfor %}
+            </select>
+        </div>
+        <div class="form-group">
+            <label><input type="checkbox" name="resend" value="1" style="width: auto;"> Also resend to guests already invited</label>
+        </div>
+        <button type="submit" class="btn btn-success">✉️ Send Invitations</button>
+        {% if mail_pending %}<span style="color: #999;">{{ mail_pending }} invitation(s) waiting to be sent</span>{% endif %}
+    </form>
+    {% endif %}
+    
     <h2>My Guest List ({{ guests|length }})</h2>
     {% if guests %}
         {% for guest in guests %}
@@ -2335,8 +6136,20 @@ def user_guest_list():
                 <p>📞 {{ guest.guest_phone }}</p>
                 <p style="color: #667eea; font-weight: bold;">🎫 {{ guest.event }}</p>
                 <p style="color: #999; font-size: 14px;">Added: {{ guest.date_added }}</p>
+                <p style="color: #999; font-size: 14px;">Check-in token: <code>{{ guest.token }}</code></p>
+                {% if guest.invite_status %}
+                <p style="color: #999; font-size: 14px;">✉️ Invitation: {{ guest.invite_status }}{% if guest.invited_at %} ({{ guest.invited_at }}){% endif %}</p>
+                {% endif %}
             </div>
             <div>
+                {% if guest.checked_in %}
+                <span style="color: #27ae60; font-weight: bold;">✓ Checked in {{ guest.checked_in }}</span>
+                {% else %}
+                <form method="POST" action="/checkin/{{ guest.token }}" style="display: inline;">
+                    <input type="hidden" name="next" value="guest_list">
+                    <button type="submit" class="btn btn-info">🎟️ Check In</button>
+                </form>
+                {% endif %}
                 <form method="POST" style="display: inline;">
                     <input type="hidden" name="action" value="delete">
                     <input type="hidden" name="guest_id" value="{{ guest.id }}">
@@ -2350,9 +6163,301 @@ def user_guest_list():
     {% else %}
     <p style="color: #999; text-align: center; padding: 40px;">No guests added yet.</p>
     {% endif %}
+    
+    <script>
+    document.querySelectorAll('.import-job[data-status="running"]').forEach(function (box) {
+        var timer = setInterval(function () {
+            fetch('/user/guest-list/import/' + box.dataset.jobId).then(function (r) { return r.json(); }).then(function (job) {
+                var percent = job.total_bytes ? Math.round(100 * job.bytes_read / job.total_bytes) : 100;
+                box.querySelector('.import-progress').textContent = job.status + ' — ' + percent + '% — ' +
+                    job.rows + ' row(s) read, ' + job.imported + ' added, ' +
+                    job.duplicates + ' duplicate(s), ' + job.failed + ' rejected';
+                if (job.status !== 'running') {
+                    clearInterval(timer);
+                    window.location.reload();
+                }
+            });
+        }, 1000);
+    });
+    </script>
+    """)
+    
+    return render_template_string(template, guests=my_guests, imports=my_imports, error=error,
+                                  event_counts=user_event_counts(username),
+                                  events=user_events(username, scheduled_only=True),
+                                  mail_pending=invitation_dispatcher.pending())
+
+
+@app.route('/user/guest-list/import/<job_id>')
+def user_guest_import_status(job_id):
+    """Progress of a background guest import (polled by the guest page)"""
+    if 'username' not in session or session.get('role') != 'user':
+        return jsonify({'error': 'Login required'}), 401
+    
+    job = guest_import_jobs.get(job_id)
+    if not job or job['username'] != session['username']:
+        return jsonify({'error': 'Unknown import'}), 404
+    
+    return jsonify({key: job[key] for key in ('status', 'message', 'rows', 'imported', 'duplicates',
+                                              'failed', 'bytes_read', 'total_bytes', 'started', 'finished')})
+
+
+@app.route('/user/guest-list/invite', methods=['POST'])
+def user_send_invitations():
+    """Queue invitation emails for a user's guests"""
+    if 'username' not in session or session.get('role') != 'user':
+        if 'role' in session:
+            return redirect(url_for(ROLE_HOME[session['role']]))
+        return redirect(url_for('index'))
+    
+    username = session['username']
+    event = request.form.get('event', '')
+    resend = request.form.get('resend') == '1'
+    
+    # A guest marked 'queued' that is not on the live queue (e.g. after a
+    # restart) is sent again rather than skipped forever
+    event_key = guest_event_key(username, event)
+    guests = [g for g in guest_list_db
+              if g['username'] == username
+              and (not event or guest_event_key(username, g['event']) == event_key)
+              and not invitation_dispatcher.is_queued(g)
+              and (resend or g.get('invite_status') != 'sent')]
+    invitation_dispatcher.enqueue(guests)
+    
+    return redirect(url_for('user_guest_list'))
+
+
+@app.route('/checkin/<token>', methods=['POST'])
+def guest_checkin(token):
+    """Check a guest in at the door by token (idempotent)"""
+    role = session.get('role')
+    if role not in ('user', 'admin'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    # One lock for the lookup, the check-in and the counts, so a concurrent
+    # delete or import cannot change the guest in between
+    with data_lock:
+        guest = guest_token_index.get(token)
+        if guest is None or (role == 'user' and guest['username'] != session['username']):
+            return jsonify({'error': 'Unknown guest token'}), 404
+        guest, newly_checked_in = check_in_guest(token)
+        counts = dict(event_guest_counts[guest_event_key(guest['username'], guest['event'])])
+    
+    if request.form.get('next') == 'guest_list':
+        return redirect(url_for('user_guest_list'))
+    
+    return jsonify({
+        'status': 'checked_in' if newly_checked_in else 'already_checked_in',
+        'guest_id': guest['id'],
+        'guest_name': guest['guest_name'],
+        'event': guest['event'],
+        'checked_in_at': guest['checked_in'],
+        'invited': counts['invited'],
+        'checked_in': counts['checked_in']
+    })
+
+
+@app.route('/user/guest-list/checkin-stats')
+def user_checkin_stats():
+    """Live checked-in vs. invited counts for each of the user's events"""
+    if 'username' not in session or session.get('role') != 'user':
+        return jsonify({'error': 'Login required'}), 401
+    
+    return jsonify(user_event_counts(session['username']))
+
+
+@app.route('/user/requests', methods=['GET', 'POST'])
+def user_vendor_requests():
+    """Send item/service requests to vendors and follow their status"""
+    if 'username' not in session or session.get('role') != 'user':
+        if 'role' in session:
+            return redirect(url_for(ROLE_HOME[session['role']]))
+        return redirect(url_for('index'))
+    
+    username = session['username']
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+        
+        if action == 'submit' and request.form.get('vendor_username') in vendors_db:
+            with data_lock:
+                user_request = {
+                    'id': request_id_counter[0],
+                    'username': username,
+                    'vendor_username': request.form.get('vendor_username'),
+                    'kind': 'service' if request.form.get('kind') == 'service' else 'item',
+                    'product_name': request.form.get('product_name'),
+                    'message': request.form.get('message'),
+                    'status': 'open',
+                    'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+                user_requests_db.append(user_request)
+                index_user_request(user_request)
+                request_id_counter[0] += 1
+            add_vendor_notification(user_request['vendor_username'],
+                                    f"New {user_request['kind']} request #{user_request['id']} from {username}: "
+                                    f"{user_request['product_name']}")
+            save_all_data()
+        
+        elif action == 'close':
+            user_request = request_index.get(int(request.form.get('request_id')))
+            if user_request and user_request['username'] == username:
+                set_request_status(user_request, 'closed')
+                save_all_data()
+        
+        return redirect(url_for('user_vendor_requests'))
+    
+    my_requests, next_cursor = request_page(user_request_ids.get(username, []),
+                                            request.args.get('before', type=int))
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/user/dashboard">🏠 Dashboard</a><a href="/user/vendors">🏪 Vendors</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>📋 Requests to Vendors</h1>
+    
+    <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
+        <input type="hidden" name="action" value="submit">
+        <div class="form-group">
+            <label>Vendor *</label>
+            <select name="vendor_username" required>
+                <option value="">-- Select Vendor --</option>
+                {% for vendor_username, vendor in vendors.items() %}
+                <option value="{{ vendor_username }}">{{ vendor.name }}</option>
+                {% endfor %}
+            </select>
+        </div>
+        <div class="form-group">
+            <label>Request Type *</label>
+            <select name="kind"><option value="item">Item</option><option value="service">Service</option></select>
+        </div>
+        <div class="form-group"><label>Item / Service *</label><input type="text" name="product_name" required></div>
+        <div class="form-group"><label>Details *</label><textarea name="message" rows="3" required></textarea></div>
+        <button type="submit" class="btn btn-success">📨 Send Request</button>
+    </form>
+    
+    <h2>My Requests</h2>
+    {% if requests %}
+    <table>
+        <tr><th>ID</th><th>Vendor</th><th>Request</th><th>Status</th><th>Quote</th><th>Date</th><th>Actions</th></tr>
+        {% for req in requests %}
+        <tr>
+            <td>#{{ req.id }}</td><td>{{ req.vendor_username }}</td>
+            <td>{{ req.product_name }} <small style="color: #999;">({{ req.kind|default('item') }})</small></td>
+            <td>{{ req.status }}</td>
+            <td>{% if req.quote is defined %}₹{{ req.quote }} {{ req.quote_note }}{% else %}-{% endif %}</td>
+            <td>{{ req.date }}</td>
+            <td>
+                {% if req.status != 'closed' %}
+                <form method="POST" style="display: inline;">
+                    <input type="hidden" name="action" value="close">
+                    <input type="hidden" name="request_id" value="{{ req.id }}">
+                    <button type="submit" class="btn btn-danger">✖ Close</button>
+                </form>
+                {% endif %}
+            </td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% if next_cursor %}
+    <a href="{{ url_for('user_vendor_requests', before=next_cursor) }}" class="btn" style="margin-top: 20px;">Older requests →</a>
+    {% endif %}
+    {% else %}
+    <p style="color: #999; text-align: center; padding: 40px;">You haven't sent any requests yet.</p>
+    {% endif %}
+    """)
+    
+    return render_template_string(template, requests=my_requests, next_cursor=next_cursor, vendors=vendors_db)
+
+
+@app.route('/user/events', methods=['GET', 'POST'])
+def user_events_page():
+    """Book events at venues and see their guests and orders"""
+    if 'username' not in session or session.get('role') != 'user':
+        if 'role' in session:
+            return redirect(url_for(ROLE_HOME[session['role']]))
+        return redirect(url_for('index'))
+    
+    username = session['username']
+    errors = []
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+        
+        if action == 'create':
+            event, errors = book_event(username, request.form.get('name'), request.form.get('venue'),
+                                       request.form.get('start'), request.form.get('end'),
+                                       request.form.get('capacity'))
+            if event:
+                save_all_data()
+        
+        elif action == 'cancel':
+            event = event_index.get(request.form.get('event_id', type=int))
+            if event and event['username'] == username:
+                cancel_event(event)
+                save_all_data()
+        
+        if not errors:
+            return redirect(url_for('user_events_page'))
+    
+    my_events = []
+    for event in sorted(user_events(username), key=lambda e: e['start']):
+        counts = event_guest_counts.get(guest_event_key(username, event['name']), {})
+        my_events.append({
+            'event': event,
+            'invited': counts.get('invited', 0),
+            'checked_in': counts.get('checked_in', 0),
+            'orders': [order_index[order_id] for order_id in event_order_ids.get(event['id'], [])]
+        })
+    
+    template = BASE_TEMPLATE.replace('{% block content %}{% endblock %}', """
+    <div class="nav">
+        <div><a href="/user/dashboard">🏠 Dashboard</a><a href="/user/guest-list">👥 Guest List</a></div>
+        <div><a href="/logout" class="btn btn-danger">🚪 Logout</a></div>
+    </div>
+    
+    <h1>📅 My Events</h1>
+    
+    {% for error in errors %}
+    <div class="alert alert-error">{{ error }}</div>
+    {% endfor %}
+    
+    <form method="POST" style="max-width: 600px; background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px;">
+        <input type="hidden" name="action" value="create">
+        <div class="form-group"><label>Event Name *</label><input type="text" name="name" value="{{ form.name }}" required></div>
+        <div class="form-group"><label>Venue *</label><input type="text" name="venue" value="{{ form.venue }}" required></div>
+        <div class="form-group"><label>Starts *</label><input type="datetime-local" name="start" value="{{ form.start }}" required></div>
+        <div class="form-group"><label>Ends *</label><input type="datetime-local" name="end" value="{{ form.end }}" required></div>
+        <div class="form-group"><label>Capacity (guests) *</label><input type="number" name="capacity" min="1" value="{{ form.capacity }}" required></div>
+        <button type="submit" class="btn btn-success">📅 Book Event</button>
+    </form>
+    
+    {% if events %}
+    {% for item in events %}
+    <div style="background: #f8f9fa; padding: 20px; margin-bottom: 20px; border-radius: 5px; border-left: 4px solid {% if item.event.status == 'Cancelled' %}#e74c3c{% else %}#667eea{% endif %};">
+        <h3>{{ item.event.name }} <small style="color: #666;">({{ item.event.status }})</small></h3>
+        <p>📍 {{ item.event.venue }} &nbsp; 🕒 {{ item.event.start }} – {{ item.event.end }}</p>
+        <p>👥 {{ item.invited }} / {{ item.event.capacity }} invited, {{ item.checked_in }} checked in</p>
+        {% if item.orders %}
+        <p>📦 Orders: {% for order in item.orders %}#{{ order.id }} (₹{{ order.total }}, {{ order.status }}){% if not loop.last %}, {% endif %}{% endfor %}</p>
+        {% endif %}
+        {% if item.event.status == 'Scheduled' %}
+        <form method="POST" style="display: inline;">
+            <input type="hidden" name="action" value="cancel">
+            <input type="hidden" name="event_id" value="{{ item.event.id }}">
+            <button type="submit" class="btn btn-danger" onclick="return confirm('Cancel this event and release the venue?')">✖ Cancel Event</button>
+        </form>
+        {% endif %}
+    </div>
+    {% endfor %}
+    {% else %}
+    <p style="color: #999; text-align: center; padding: 40px;">No events booked yet.</p>
+    {% endif %}
     """)
     
-    return render_template_string(template, guests=my_guests)
+    return render_template_string(template, events=my_events, errors=errors, form=request.form)
 
 
 @app.route('/user/profile', methods=['GET', 'POST'])
@@ -2423,7 +6528,9 @@ if __name__ == '__main__':
     
     # Load saved data
     print("\n💾 Loading saved data...")
-    load_all_data()
+    load_all_data(lazy=LAZY_LOADING)
+    for step, seconds in startup_report:
+        print(f"   {step:32s} {seconds * 1000:9.1f} ms")
     
     # Verify critical routes
     print("\n🔍 Verifying Routes...")
@@ -2456,4 +6563,9 @@ if __name__ == '__main__':
     print("   • Data persistence (saves automatically)")
     print("\n" + "=" * 80)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if GEVENT:
+        from gevent.pywsgi import WSGIServer
+        print("   (serving with gevent)")
+        WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file